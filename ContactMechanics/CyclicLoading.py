@@ -0,0 +1,185 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+
+"""
+Ordered loading-unloading cycles of plastic contact systems
+"""
+
+import numpy as np
+
+
+class CyclicLoading(object):
+    """
+    Loading-unloading cycles of a plastic contact system. Contrary to the
+    unordered steps of `ContactMechanics.PipelineFunction`, the steps of a
+    loading path are solved in order, such that the plastic displacements
+    accumulate over the full loading history. Each step is warm-started from
+    the forces of the previous step.
+
+    After every cycle, only the plastic displacements of pixels that flowed
+    plastically during the cycle are stored (as flat indices and values).
+    The full plastic displacement field after any cycle can be reconstructed
+    from these changes with `plastic_displacement`.
+
+    Attributes
+    ----------
+    cycles : list of dict
+        Summary of each cycle with the entries
+
+        offsets, normal_forces, contact_areas, plastic_areas : np.ndarray
+            Offset, normal force, contact area and plastic area at each step
+            of the cycle.
+        residual_depth : float
+            Maximum depth of the plastic displacements after the cycle.
+        hysteresis : float
+            Work :math:`\\int F\\,d\\delta` along the path of the cycle. For
+            closed paths this is the energy dissipated within the cycle.
+        nb_changed : int
+            Number of pixels that flowed plastically during the cycle.
+
+    Example
+    -------
+    >>> cycles = CyclicLoading(system)
+    >>> path = np.concatenate([np.linspace(0, 1e-3, 11), np.linspace(1e-3, 0, 11)[1:]])
+    >>> summaries = cycles.run(path, nb_cycles=10)
+    >>> print([summary['residual_depth'] for summary in summaries])
+    """
+
+    def __init__(self, system):
+        """
+        Parameters
+        ----------
+        system : :obj:`ContactMechanics.PlasticSystemSpecialisations.PlasticNonSmoothContactSystem`
+            Plastic contact system. The plastic displacements of its surface
+            are the initial state of the loading history.
+        """
+        try:
+            plastic_displ = system.surface.plastic_displ
+        except AttributeError:
+            raise ValueError('Cyclic loading requires a plastic contact system.')
+        self.system = system
+        self._initial_plastic_displ = plastic_displ.copy()
+        self._changes = []
+        self._forces = None
+        self.cycles = []
+
+    @property
+    def nb_cycles(self):
+        """Number of cycles that have been run"""
+        return len(self.cycles)
+
+    def run(self, path, nb_cycles=1, control='offset', warm_start=True, **kwargs):
+        """
+        Run loading-unloading cycles. The history continues from previous
+        calls.
+
+        Parameters
+        ----------
+        path : array_like
+            Offsets (or external forces) of the steps of a single cycle, e.g.
+            loading up to a maximum and unloading.
+        nb_cycles : int, optional
+            Number of times the path is traversed. (Default: 1)
+        control : str, optional
+            Quantity prescribed along the path, 'offset' or 'force'.
+            (Default: 'offset')
+        warm_start : bool, optional
+            Initialize each step with the forces of the previous step.
+            (Default: True)
+        **kwargs
+            Additional arguments for the `minimize_proxy` method of the
+            system.
+
+        Returns
+        -------
+        summaries : list of dict
+            Summaries of the cycles of this call, see `cycles`.
+        """
+        if control not in ('offset', 'force'):
+            raise ValueError(f"Unknown control '{control}'. Possible values are 'offset' and 'force'.")
+        system = self.system
+        reduction = system.reduction
+        plastic_displ = system.surface.plastic_displ
+        summaries = []
+        for cycle in range(nb_cycles):
+            changed = np.zeros(plastic_displ.shape, dtype=bool)
+            offsets = []
+            normal_forces = []
+            contact_areas = []
+            plastic_areas = []
+            for value in path:
+                if control == 'offset':
+                    loading = dict(offset=value)
+                else:
+                    loading = dict(external_force=value)
+                initial_forces = None if self._forces is None or not warm_start else -self._forces
+                result = system.minimize_proxy(initial_forces=initial_forces, **loading, **kwargs)
+                if not result.success:
+                    raise RuntimeError(f'Contact calculation in cycle {self.nb_cycles} at {control} {value} did not '
+                                       f'converge: {result.message}')
+                self._forces = result.jac
+                changed |= result.plastic
+                offsets += [system.offset]
+                normal_forces += [system.compute_normal_force()]
+                contact_areas += [system.compute_contact_area()]
+                plastic_areas += [system.surface.plastic_area]
+
+            indices = np.flatnonzero(changed)
+            self._changes += [(indices, plastic_displ.ravel()[indices])]
+
+            offsets = np.array(offsets)
+            normal_forces = np.array(normal_forces)
+            summary = dict(offsets=offsets,
+                           normal_forces=normal_forces,
+                           contact_areas=np.array(contact_areas),
+                           plastic_areas=np.array(plastic_areas),
+                           residual_depth=-reduction.min(plastic_displ),
+                           hysteresis=np.sum((normal_forces[1:] + normal_forces[:-1]) * np.diff(offsets)) / 2,
+                           nb_changed=reduction.sum(len(indices)))
+            self.cycles += [summary]
+            summaries += [summary]
+        return summaries
+
+    def plastic_displacement(self, cycle=-1):
+        """
+        Reconstruct the (local) plastic displacements after a cycle.
+
+        Parameters
+        ----------
+        cycle : int, optional
+            Index of the cycle. Negative indices count from the last cycle.
+            (Default: -1)
+
+        Returns
+        -------
+        plastic_displ : np.ndarray
+            Plastic displacements after the cycle.
+        """
+        cycle = range(self.nb_cycles)[cycle]
+        plastic_displ = self._initial_plastic_displ.copy()
+        flat_plastic_displ = plastic_displ.reshape(-1)
+        for indices, values in self._changes[:cycle + 1]:
+            flat_plastic_displ[indices] = values
+        return plastic_displ
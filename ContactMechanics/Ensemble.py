@@ -0,0 +1,322 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Contact mechanics of ensembles of topographies, e.g. statistically
+equivalent realizations of a random surface
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from SurfaceTopography import read_topography
+
+from .FFTElasticHalfSpace import FreeFFTElasticHalfSpace, PeriodicFFTElasticHalfSpace
+from .PipelineFunction import check_contact_mechanics_arguments, contact_mechanics_steps
+from .Tools.ResultCache import CacheKey, hardness_key
+from .Tools.common import process_pool
+
+# Results of contact_mechanics that are averaged over the ensemble
+_quantities = 'mean_pressure', 'total_contact_area', 'mean_displacement', 'mean_gap'
+
+# File in the checkpoint directory that identifies the steps and parameters
+_checkpoint_spec = 'spec.txt'
+
+# Maximum number of substrates that are kept by every worker
+_max_nb_substrates = 4
+
+# Substrates of each worker (process or thread), keyed by boundary
+# conditions, grid and physical size
+_worker_state = threading.local()
+
+
+class RunningStatistics(object):
+    """
+    Running mean and variance of a series of arrays (Welford's algorithm)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self._m2 = None
+
+    def update(self, values):
+        """Add an array to the series"""
+        values = np.asarray(values, dtype=float)
+        if self.mean is None:
+            self.mean = np.zeros_like(values)
+            self._m2 = np.zeros_like(values)
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (values - self.mean)
+
+    @property
+    def variance(self):
+        """Sample variance"""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def standard_error(self):
+        """Standard error of the mean"""
+        return np.sqrt(self.variance / self.count)
+
+
+def _member_key(member):
+    """Identify a member by its file or by its heights and physical sizes"""
+    if isinstance(member, (str, os.PathLike)):
+        stat = os.stat(member)
+        return CacheKey('file', os.path.abspath(member), stat.st_size, stat.st_mtime_ns).hexdigest()
+    return CacheKey('topography', np.asarray(member.heights(), dtype=float), member.physical_sizes,
+                    member.is_periodic).hexdigest()
+
+
+def _ensemble_member(spec, member):
+    """
+    Run the contact mechanics calculation of a single member. The substrate
+    is reused for subsequent members with the same grid and physical size.
+    """
+    topography = read_topography(os.fspath(member)) if isinstance(member, (str, os.PathLike)) else member
+    substrate = check_contact_mechanics_arguments(topography, spec['substrate'], None, spec['offsets'],
+                                                  spec['pressures'], spec['contact_areas'])
+    try:
+        substrates = _worker_state.substrates
+    except AttributeError:
+        substrates = _worker_state.substrates = {}
+    key = substrate, tuple(topography.nb_grid_pts), tuple(topography.physical_sizes)
+    if key not in substrates:
+        if len(substrates) >= _max_nb_substrates:
+            substrates.clear()
+        half_space = PeriodicFFTElasticHalfSpace if substrate == 'periodic' else FreeFFTElasticHalfSpace
+        substrates[key] = half_space(topography.nb_grid_pts, 1.0, topography.physical_sizes)
+
+    steps = list(contact_mechanics_steps(topography, substrate=substrates[key], offsets=spec['offsets'],
+                                         pressures=spec['pressures'], contact_areas=spec['contact_areas'],
+                                         hardness=spec['hardness'], maxiter=spec['maxiter'],
+                                         optimizer_kwargs=spec['optimizer_kwargs']))
+    values = np.array([[getattr(step, name) for step in steps] for name in _quantities])
+    converged = np.array([step.converged for step in steps])
+    return values, converged
+
+
+class Ensemble(object):
+    """
+    Contact mechanics calculations on an ensemble of topographies with the
+    same load steps, and running statistics of the results over the
+    ensemble.
+
+    Members are scheduled on a local process pool. Every worker keeps the
+    substrates (and hence the Green's functions) of members with the same
+    grid and physical size. If a checkpoint directory is given, the results
+    of every member are stored in a file of their own as soon as they are
+    available; an interrupted calculation resumes with the members that have
+    not been computed yet.
+
+    Attributes
+    ----------
+    statistics : dict of :obj:`RunningStatistics`
+        Statistics over the members of `mean_pressure`,
+        `total_contact_area`, `mean_displacement` and `mean_gap` at each
+        step.
+    results : dict
+        Results of the individual members, as arrays of the above
+        quantities (shape: number of quantities x number of steps) and
+        convergence information, keyed by the identity of the member.
+
+    Example
+    -------
+    >>> def realizations(nb_members):
+    ...     for seed in range(nb_members):
+    ...         np.random.seed(seed)
+    ...         yield fourier_synthesis((1024, 1024), (1., 1.), 0.8, rms_slope=0.1)
+    >>> ensemble = Ensemble(pressures=np.logspace(-3, -1, 10), checkpoint='ensemble-checkpoint')
+    >>> statistics = ensemble.run(realizations(100), nb_workers=8)
+    >>> statistics['total_contact_area'].mean, statistics['total_contact_area'].standard_error
+    """
+
+    def __init__(self, substrate=None, offsets=None, pressures=None, contact_areas=None, hardness=None,
+                 maxiter=100, optimizer_kwargs={}, checkpoint=None):
+        """
+        Parameters
+        ----------
+        substrate : str, optional
+            'periodic' or 'nonperiodic'. Chosen according to the periodicity
+            of each member if set to None. (Default: None)
+        offsets : list of floats, optional
+            List with offsets. (Default: None)
+        pressures : list of floats, optional
+            List with pressures in units of E*. (Default: None)
+        contact_areas : list of floats, optional
+            List with target fractional contact areas. (Default: None)
+        hardness : float or array_like, optional
+            Hardness in units of E*. (Default: None)
+        maxiter : int, optional
+            Maximum number of interations. (Default: 100)
+        optimizer_kwargs : dict, optional
+            Optional arguments passed on to the optimizer. (Default: {})
+        checkpoint : str, optional
+            Directory that stores the results of every member computed so
+            far in a file of its own. (Default: None)
+        """
+        steps = [value for value in (offsets, pressures, contact_areas) if value is not None]
+        if len(steps) != 1:
+            raise ValueError('Please specify exactly one of `offsets`, `pressures` and `contact_areas`; the steps '
+                             'need to be identical for all members of the ensemble.')
+        self._spec = dict(substrate=substrate, offsets=offsets, pressures=pressures, contact_areas=contact_areas,
+                          hardness=hardness, maxiter=maxiter, optimizer_kwargs=optimizer_kwargs)
+        self._spec_key = CacheKey(substrate, offsets, pressures, contact_areas, hardness_key(hardness), maxiter,
+                                  optimizer_kwargs).hexdigest()
+        self.checkpoint = checkpoint
+        self.results = {}
+        self.statistics = {name: RunningStatistics() for name in _quantities}
+        if checkpoint is not None:
+            self._open_checkpoint()
+
+    @property
+    def nb_members(self):
+        """Number of members computed"""
+        return len(self.results)
+
+    def _add(self, key, values, converged):
+        self.results[key] = values, converged
+        for name, value in zip(_quantities, values):
+            self.statistics[name].update(value)
+
+    def _open_checkpoint(self):
+        os.makedirs(self.checkpoint, exist_ok=True)
+        spec_filename = os.path.join(self.checkpoint, _checkpoint_spec)
+        if not os.path.exists(spec_filename):
+            self._write_atomic(spec_filename, lambda f: f.write(self._spec_key.encode()))
+            return
+        with open(spec_filename) as f:
+            if f.read() != self._spec_key:
+                raise ValueError(f"Checkpoint '{self.checkpoint}' was written for a calculation with different "
+                                 "steps or parameters.")
+        for fn in sorted(os.listdir(self.checkpoint)):
+            if fn.endswith('.npz'):
+                with np.load(os.path.join(self.checkpoint, fn)) as data:
+                    self._add(fn[:-len('.npz')], data['values'], data['converged'])
+
+    def _write_atomic(self, filename, write):
+        # Write to a temporary file and rename, such that an interruption
+        # never leaves a corrupt file in the checkpoint
+        fd, tmp_filename = tempfile.mkstemp(dir=self.checkpoint, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_filename, filename)
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+
+    def _write_checkpoint(self, key, values, converged):
+        self._write_atomic(os.path.join(self.checkpoint, f'{key}.npz'),
+                           lambda f: np.savez(f, values=values, converged=converged))
+
+    def _completed(self, key, values, converged, callback):
+        self._add(key, values, converged)
+        if self.checkpoint is not None:
+            self._write_checkpoint(key, values, converged)
+        if callback is not None:
+            callback(key, dict(zip(_quantities, values)), converged)
+
+    def run(self, topographies, nb_workers=None, executor=None, callback=None):
+        """
+        Run the calculations of all members that have not been computed yet.
+
+        Parameters
+        ----------
+        topographies : iterable or str
+            Iterable (e.g. a generator) of topographies or of names of
+            topography files, or a directory that contains topography files.
+            Members are only drawn from the iterable as workers become
+            available.
+        nb_workers : int, optional
+            Number of worker processes. Members are computed in this process
+            if neither `nb_workers` nor `executor` are given. Workers are
+            started from a fresh interpreter, i.e. scripts need an
+            `if __name__ == '__main__':` guard. (Default: None)
+        executor : :obj:`concurrent.futures.Executor`, optional
+            Executor that runs the members instead of a process pool created
+            for this call. (Default: None)
+        callback : func, optional
+            Function called as `callback(key, values, converged)` when a
+            member has been computed, where `values` is a dictionary of the
+            results at each step. (Default: None)
+
+        Returns
+        -------
+        statistics : dict of :obj:`RunningStatistics`
+            Statistics over all members.
+        """
+        if nb_workers is not None and executor is not None:
+            raise ValueError("Both of `nb_workers` and `executor` are given. Please specify only one.")
+        if isinstance(topographies, (str, os.PathLike)):
+            if not os.path.isdir(topographies):
+                raise ValueError(f"'{topographies}' is not a directory.")
+            topographies = [os.path.join(topographies, fn) for fn in sorted(os.listdir(topographies))
+                            if os.path.isfile(os.path.join(topographies, fn))]
+
+        if nb_workers is None and executor is None:
+            for member in topographies:
+                key = _member_key(member)
+                if key not in self.results:
+                    self._completed(key, *_ensemble_member(self._spec, member), callback)
+            return self.statistics
+
+        own_executor = executor is None
+        if own_executor:
+            executor = process_pool(nb_workers)
+        # Number of members that are submitted ahead of the available workers
+        max_nb_pending = 2 * (nb_workers or os.cpu_count() or 1)
+        pending = {}
+
+        def collect():
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._completed(pending.pop(future), *future.result(), callback)
+
+        try:
+            for member in topographies:
+                key = _member_key(member)
+                if key in self.results or key in pending.values():
+                    continue
+                pending[executor.submit(_ensemble_member, self._spec, member)] = key
+                if len(pending) >= max_nb_pending:
+                    collect()
+            while len(pending) > 0:
+                collect()
+        finally:
+            # Members that have not started are dropped if one of them failed
+            for future in pending:
+                future.cancel()
+            if own_executor:
+                executor.shutdown()
+        return self.statistics
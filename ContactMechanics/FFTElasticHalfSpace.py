@@ -253,6 +253,8 @@ class PeriodicFFTElasticHalfSpace(ElasticSubstrate):
             "real-space", 1)
         self.fourier_buffer = self.fftengine.register_fourier_space_field(
             "fourier-space", 1)
+        # Buffers for stacks of fields, allocated on first use
+        self._batch_buffers = {}
 
         self.greens_function = None
         self.surface_stiffness = None
@@ -500,11 +502,56 @@ class PeriodicFFTElasticHalfSpace(ElasticSubstrate):
             1. / self.greens_function[self.greens_function != 0]
         return surface_stiffness
 
+    def _get_batch_buffers(self, nb_components):
+        """
+        Real and Fourier space buffers for stacks of up to `nb_components`
+        fields. Buffers (and FFT plans) are allocated on first use and have a
+        capacity that is a power of two. Stacks that shrink over time (e.g.
+        in a batched solver) hence only allocate a logarithmic number of
+        buffers.
+        """
+        capacity = 1 << (nb_components - 1).bit_length()
+        try:
+            return self._batch_buffers[capacity]
+        except KeyError:
+            buffers = (self.fftengine.register_real_space_field(f"real-space-{capacity}", capacity),
+                       self.fftengine.register_fourier_space_field(f"fourier-space-{capacity}", capacity))
+            self._batch_buffers[capacity] = buffers
+            return buffers
+
+    def _evaluate_batch(self, fields, kernel):
+        """
+        Convolve a stack of fields (first index enumerates fields) with a
+        kernel in Fourier space. All fields are transformed by a single
+        multi-component FFT.
+        """
+        nb_components = fields.shape[0]
+        real_buffer, fourier_buffer = self._get_batch_buffers(nb_components)
+        capacity = real_buffer.nb_components
+        # Views with the fields enumerated by the first index
+        real_array = real_buffer.array().reshape((capacity,) + fields.shape[1:])
+        fourier_array = fourier_buffer.array().reshape((capacity,) + kernel.shape)
+        real_array[:nb_components] = fields
+        real_array[nb_components:] = 0
+        self.fftengine.fft(real_buffer, fourier_buffer)
+        fourier_array *= kernel
+        self.fftengine.ifft(fourier_buffer, real_buffer)
+        # Copy to C-order, such that the fields are contiguous in memory
+        return np.ascontiguousarray(real_array[:nb_components].real) * self.fftengine.normalisation
+
+    def _is_batch(self, array):
+        """Check whether an array is a stack of fields on the subdomain"""
+        return array.ndim == self.dim + 1 and array.shape[1:] == self.nb_subdomain_grid_pts
+
     def evaluate_disp(self, forces):
         """ Computes the displacement due to a given force array
         Keyword Arguments:
-        forces   -- a numpy array containing point forces (*not* pressures)
+        forces   -- a numpy array containing point forces (*not* pressures).
+                    A stack of force arrays (first index enumerates the
+                    arrays) is transformed in a single multi-component FFT.
         """
+        if self._is_batch(forces):
+            return self._evaluate_batch(-forces, self.greens_function) / self.area_per_pt
         if forces.shape != self.nb_subdomain_grid_pts:
             raise self.Error(
                 ("force array has a different shape ({0}) than this "
@@ -522,8 +569,12 @@ class PeriodicFFTElasticHalfSpace(ElasticSubstrate):
         array.
 
         Keyword Arguments:
-        disp   -- a numpy array containing point displacements
+        disp   -- a numpy array containing point displacements. A stack of
+                  displacement arrays (first index enumerates the arrays) is
+                  transformed in a single multi-component FFT.
         """
+        if self._is_batch(disp):
+            return -self._evaluate_batch(disp, self.surface_stiffness) * self.area_per_pt
         if disp.shape != self.nb_subdomain_grid_pts:
             raise self.Error(
                 ("displacements array has a different shape ({0}) than "
@@ -974,8 +1025,11 @@ class FreeFFTElasticHalfSpace(PeriodicFFTElasticHalfSpace):
         if running in serial one can give the force array with or without the
         padded region
 
+        a stack of force arrays on the subdomain (first index enumerates the
+        arrays) is transformed in a single multi-component FFT
+
         """
-        if forces.shape == self.nb_subdomain_grid_pts:
+        if forces.shape == self.nb_subdomain_grid_pts or self._is_batch(forces):
             return super().evaluate_disp(forces)
 
         elif self.nb_subdomain_grid_pts == self.nb_domain_grid_pts:
@@ -28,11 +28,13 @@
 Implements a convenient Factory function for Contact System creation
 """
 
-from SurfaceTopography import open_topography
+import numpy as np
+
+from SurfaceTopography import PlasticTopography, open_topography
 from SurfaceTopography.IO import ReaderBase
 
-from .PlasticSystemSpecialisations import PlasticNonSmoothContactSystem
-from .Systems import NonSmoothContactSystem
+from .PlasticSystemSpecialisations import PhaseHardness, PlasticNonSmoothContactSystem
+from .Systems import NonSmoothContactSystem, SmoothContactSystem
 from .FFTElasticHalfSpace import PeriodicFFTElasticHalfSpace, FreeFFTElasticHalfSpace
 
 from NuMPI import MPI
@@ -109,7 +111,7 @@ def _make_system_args(substrate, surface, communicator=MPI.COMM_WORLD,
     return substrate, surface
 
 
-def make_system(*args, **kwargs):
+def make_system(*args, interaction=None, **kwargs):
     """
     Factory function for contact systems. Checks the compatibility between the
     substrate, interaction method and surface and returns an object of the
@@ -121,6 +123,9 @@ def make_system(*args, **kwargs):
     substrate   -- An instance of HalfSpace. Defines the solid mechanics in
                    the substrate
     surface     -- An instance of SurfaceTopography, defines the profile.
+    interaction -- (default None) An instance of
+                   ContactMechanics.Interactions.Potential. Hard-wall
+                   (non-adhesive) contact if None.
 
     Returns
     -------
@@ -128,10 +133,12 @@ def make_system(*args, **kwargs):
 
     substrate, surface = _make_system_args(*args, **kwargs)
 
+    if interaction is not None:
+        return SmoothContactSystem(substrate=substrate, interaction=interaction, surface=surface)
     return NonSmoothContactSystem(substrate=substrate, surface=surface)
 
 
-def make_plastic_system(*args, **kwargs):
+def make_plastic_system(*args, hardness=None, **kwargs):
     """
     Factory function for contact systems. Checks the compatibility between the
     substrate, interaction method and surface and returns an object of the
@@ -143,6 +150,10 @@ def make_plastic_system(*args, **kwargs):
     substrate   -- An instance of HalfSpace. Defines the solid mechanics in
                    the substrate
     surface     -- An instance of SurfaceTopography, defines the profile.
+    hardness    -- (default None) Hardness of the surface. Can be a scalar,
+                   a per-pixel array (of the local or of the global domain)
+                   or a PhaseHardness. Arrays are stored as PhaseHardness.
+                   The surface needs to be a PlasticTopography if None.
 
     Returns
     -------
@@ -150,4 +161,23 @@ def make_plastic_system(*args, **kwargs):
 
     substrate, surface = _make_system_args(*args, **kwargs)
 
+    if hardness is not None:
+        if np.ndim(hardness) > 0 and not isinstance(hardness, PhaseHardness):
+            hardness = np.asarray(hardness)
+            if hardness.shape != tuple(surface.nb_subdomain_grid_pts):
+                # Global array, extract local subdomain
+                hardness = hardness[surface.subdomain_slices]
+            hardness = PhaseHardness.from_array(hardness)
+        if isinstance(hardness, PhaseHardness):
+            # PlasticTopography only validates scalar hardnesses
+            if hardness.values.min() < 0:
+                raise ValueError('Hardness must be positive.')
+            if not isinstance(surface, PlasticTopography):
+                surface = PlasticTopography(surface, 0.)
+            surface._hardness = hardness
+        elif isinstance(surface, PlasticTopography):
+            surface.hardness = hardness
+        else:
+            surface = PlasticTopography(surface, hardness)
+
     return PlasticNonSmoothContactSystem(substrate=substrate, surface=surface)
@@ -0,0 +1,205 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Writing of solver output on a background thread
+"""
+
+import os
+import queue
+import threading
+
+import numpy as np
+
+
+class AsyncWriter(object):
+    """
+    Writes output (NetCDF frames, text files) on a background thread, such
+    that the solver can continue with the next step while the previous one
+    is written to disk.
+
+    Jobs are executed in the order of submission. The queue of pending jobs
+    is bounded; submitting blocks while it is full, which limits the memory
+    held by outstanding output when the disk is slower than the solver.
+    Arrays are copied on submission, hence the solver may reuse its buffers
+    immediately.
+
+    Containers passed to the writer must not be accessed from other threads
+    until `flush` or `close` returns, since the underlying NetCDF/HDF5
+    libraries are not thread-safe. If writing fails, all further jobs are
+    skipped and the exception is raised by every subsequent call to
+    `submit`, `flush` or `close`.
+
+    Example
+    -------
+    >>> with AsyncWriter() as writer:
+    ...     for offset in offsets:
+    ...         result = system.minimize_proxy(offset=offset)
+    ...         writer.write_frame(container, offset=offset, forces=result.jac)
+    ...         writer.savetxt(f'pressure-{offset}.out', result.jac / system.area_per_pt)
+    """
+
+    def __init__(self, max_pending=4, fsync=False):
+        """
+        Parameters
+        ----------
+        max_pending : int, optional
+            Maximum number of jobs waiting to be written. (Default: 4)
+        fsync : bool, optional
+            Force text files and containers to stable storage (`os.fsync`)
+            after writing them, not just to the operating system.
+            (Default: False)
+        """
+        if max_pending < 1:
+            raise ValueError('The number of pending jobs must be positive.')
+        self.fsync = fsync
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._containers = []
+        self._exception = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='AsyncWriter', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if self._exception is None:
+                    function, args, kwargs = job
+                    function(*args, **kwargs)
+            except Exception as e:
+                # Skip all further jobs, the exception is raised on the
+                # calling thread
+                self._exception = e
+            finally:
+                self._queue.task_done()
+
+    def _raise(self):
+        if self._exception is not None:
+            raise self._exception
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Call a function on the writer thread. Blocks while the queue of
+        pending jobs is full. Arguments are not copied.
+
+        Parameters
+        ----------
+        function : callable
+            Function to execute.
+        *args, **kwargs
+            Arguments of the function.
+        """
+        if self._closed:
+            raise RuntimeError('Cannot submit to a closed writer.')
+        self._raise()
+        self._queue.put((function, args, kwargs))
+
+    def write_frame(self, container, **fields):
+        """
+        Append a frame to a container.
+
+        Parameters
+        ----------
+        container : :obj:`ContactMechanics.IO.NetCDF.NetCDFContainer`
+            Container that receives the frame.
+        **fields
+            Scalars and arrays stored in the frame.
+        """
+        if not any(container is c for c in self._containers):
+            self._containers += [container]
+        self.submit(self._write_frame, container,
+                    {name: np.array(value) if isinstance(value, np.ndarray) else value
+                     for name, value in fields.items()})
+
+    @staticmethod
+    def _write_frame(container, fields):
+        frame = container.get_next_frame()
+        for name, value in fields.items():
+            frame[name] = value
+
+    def savetxt(self, fn, array, **kwargs):
+        """
+        Write an array to a text file, see `numpy.savetxt`.
+
+        Parameters
+        ----------
+        fn : str
+            Name of the file.
+        array : np.ndarray
+            Array to write.
+        **kwargs
+            Additional arguments for `numpy.savetxt`.
+        """
+        self.submit(self._savetxt, fn, np.array(array), kwargs)
+
+    def _savetxt(self, fn, array, kwargs):
+        with open(fn, 'w') as f:
+            np.savetxt(f, array, **kwargs)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _sync(self):
+        for container in self._containers:
+            container.sync()
+            if self.fsync:
+                fd = os.open(container.get_filename(), os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    def flush(self):
+        """
+        Block until all submitted jobs have been written and all containers
+        have been synchronized to disk.
+        """
+        if not self._closed:
+            self.submit(self._sync)
+            self._queue.join()
+        self._raise()
+
+    def close(self):
+        """
+        Flush all pending output and stop the writer thread. The containers
+        themselves are not closed.
+        """
+        if self._closed:
+            self._raise()
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
@@ -28,18 +28,82 @@ database.
 """
 
 import numbers
+from collections import OrderedDict
 from math import sqrt
 
 import numpy as np
 
+from NuMPI import MPI
+
 try:
+    import netCDF4
     from netCDF4 import Dataset
 
     __have_netcdf4__ = True
+    # Quantization requires netCDF4-python 1.6.0 or later built against
+    # netCDF-C 4.9.0 or later
+    __have_quantization__ = bool(getattr(netCDF4, '__has_quantization_support__', False))
 except ImportError:
     from pupynere import NetCDFFile
 
     __have_netcdf4__ = False
+    __have_quantization__ = False
+
+
+class LazyField(object):
+    """
+    Field of a single frame that is only read from the file when indexed.
+    Slicing reads just the requested window from disk, unless the frame is
+    already in the frame cache of the container.
+
+    Example
+    -------
+    >>> pressure = container[10].lazy('pressure')
+    >>> window = pressure[100:200, 50:150]
+    """
+
+    def __init__(self, frame, name):
+        self._frame = frame
+        self._name = frame._mangle_name(name)
+        self._variable = frame._parent._data.variables[self._name]
+
+    def __repr__(self):
+        return 'LazyField({0!r}, frame={1}, shape={2})'.format(self._name, self._frame.index, self.shape)
+
+    @property
+    def shape(self):
+        parent = self._frame._parent
+        if parent._is_parallel:
+            return tuple(parent._subdomain_shape2[('nx', 'ny').index(dimension)] if dimension in ('nx', 'ny') else n
+                         for dimension, n in zip(self._variable.dimensions[1:], self._variable.shape[1:]))
+        if parent._is_amber:
+            return tuple(parent._shape) + (3,)
+        return tuple(self._variable.shape[1:])
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return self._frame._parent._decode(self._variable, np.empty(0, dtype=self._variable.dtype)).dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        parent = self._frame._parent
+        fields = parent._frame_cache.get(self._frame.index)
+        if parent._is_parallel or parent._is_amber or (fields is not None and self._name in fields):
+            # Index into the full (subdomain) field
+            return parent._read_field(self._frame.index, self._name)[index]
+        if not isinstance(index, tuple):
+            index = (index,)
+        return self._frame._parent._decode(self._variable, self._variable[(self._frame.index,) + index])
+
+    def __array__(self, dtype=None):
+        value = np.asarray(self._frame._parent._read_field(self._frame.index, self._name))
+        return value if dtype is None else value.astype(dtype)
 
 
 class NetCDFContainerFrame(object):
@@ -50,40 +114,40 @@ class NetCDFContainerFrame(object):
             self._i += len(parent)
 
     def _create_if_missing(self, name, value, shape=None):
-        if name not in self._parent._data.variables:
+        parent = self._parent
+        if name not in parent._data.variables:
             if isinstance(value, numbers.Integral):
-                self._parent._data.createVariable(name, 'i4', ('frame',))
+                parent._create_variable(name, 'i4', ('frame',))
             elif isinstance(value, numbers.Real):
-                self._parent._data.createVariable(name, 'f8', ('frame',))
+                parent._create_variable(name, 'f8', ('frame',))
             elif isinstance(value, np.ndarray):
                 if shape is None:
                     shape = value.shape
+                # Masks are stored as bytes
+                dtype = 'i1' if value.dtype == bool else parent._float_str
+                # Fields are passed as local subdomains, which equal the full
+                # grid for serial files
                 if shape == ():
-                    self._parent._data.createVariable(name, 'f8', ('frame',))
-                elif len(shape) == len(self._parent._shape) and np.all(
-                        np.array(shape) == np.array(self._parent._shape)):
-                    if len(self._parent._shape) == 3:
-                        self._parent._data.createVariable(
-                            name,
-                            self._parent._float_str,
-                            ('frame', 'ndof', 'nx', 'ny',)
-                        )
+                    parent._create_variable(name, 'f8', ('frame',))
+                elif len(shape) == len(parent._subdomain_shape) and np.all(
+                        np.array(shape) == np.array(parent._subdomain_shape)):
+                    if len(parent._shape) == 3:
+                        parent._create_variable(name, dtype, ('frame', 'ndof', 'nx', 'ny',))
                     else:
-                        self._parent._data.createVariable(
-                            name,
-                            self._parent._float_str,
-                            ('frame', 'nx', 'ny',)
-                        )
+                        parent._create_variable(name, dtype, ('frame', 'nx', 'ny',))
                 elif len(shape) == 2 and np.all(
-                        np.array(shape) == np.array(self._parent._shape2)):
-                    self._parent._data.createVariable(name,
-                                                      self._parent._float_str,
-                                                      ('frame', 'nx', 'ny',))
+                        np.array(shape) == np.array(parent._subdomain_shape2)):
+                    parent._create_variable(name, dtype, ('frame', 'nx', 'ny',))
                 else:
                     raise RuntimeError('Not sure how to guess NetCDF type for '
                                        'field "{0}" which is a numpy ndarray '
                                        'with type {1} and shape {2}.'
                                        .format(name, value.dtype, value.shape))
+                if value.dtype == bool:
+                    # CF flags, masks are converted back to bool on reading
+                    variable = parent._data.variables[name]
+                    variable.flag_values = np.array([0, 1], dtype='i1')
+                    variable.flag_meanings = 'false true'
             else:
                 raise RuntimeError('Not sure how to guess NetCDF type for '
                                    'field "{0}" with type {1}.'
@@ -102,14 +166,7 @@ class NetCDFContainerFrame(object):
         if name[0] == '_':
             return self.__dict__[name]
 
-        name = self._mangle_name(name)
-
-        attr = self._parent._data.variables[name][self._i]
-        # Reshape
-        if self._parent._is_amber:
-            nx, ny = self._parent._shape
-            attr.shape = (nx, ny, 3)
-        return attr
+        return self._parent._read_field(self._i, self._mangle_name(name))
 
     def __setattr__(self, name, value):
         if name[0] == '_':
@@ -119,7 +176,9 @@ class NetCDFContainerFrame(object):
         name = self._mangle_name(name)
         self._create_if_missing(name, value)
 
-        self._parent._data.variables[name][self._i] = value
+        variable = self._parent._data.variables[name]
+        variable[(self._i,) + self._parent._subdomain_index(variable.dimensions[1:])] = value
+        self._parent._invalidate_field(self._i, name)
 
     def __getitem__(self, name):
         return self.__getattr__(name)
@@ -127,6 +186,22 @@ class NetCDFContainerFrame(object):
     def __setitem__(self, name, value):
         return self.__setattr__(name, value)
 
+    def lazy(self, name):
+        """
+        Return a field of this frame without reading it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field.
+
+        Returns
+        -------
+        field : LazyField
+            Proxy that reads the field (or a window of it) on indexing.
+        """
+        return LazyField(self, name)
+
     def get_index(self):
         return self._i
 
@@ -143,6 +218,9 @@ class NetCDFContainerFrame(object):
         can be smaller than the dimensions in the file. Padding region is then
         set to undefined.
         """
+        if self._parent._is_parallel:
+            raise RuntimeError('Grids with offsets cannot be written to parallel files; assign the subdomain field '
+                               'instead.')
 
         name = self._mangle_name(name)
         self._create_if_missing(name, value, shape=self._parent._shape)
@@ -151,6 +229,7 @@ class NetCDFContainerFrame(object):
         # print x0, y0, x0+nx, y0+ny
         self._parent._data.variables[name][self._i, x0:x0 + nx, y0:y0 + ny] = \
             value
+        self._parent._invalidate_field(self._i, name)
 
     def sync(self):
         self._parent.sync()
@@ -158,12 +237,81 @@ class NetCDFContainerFrame(object):
 
 class NetCDFContainer(object):
     def __init__(self, fn, frame=0, double=False, store_force=False,
-                 mode='r', format='NETCDF4'):
+                 mode='r', format='NETCDF4', communicator=None,
+                 subdomain_locations=None, nb_subdomain_grid_pts=None,
+                 collective=True, storage=None, cache_size=0):
+        """
+        Parameters
+        ----------
+        fn : str
+            Name of the NetCDF file.
+        frame : int, optional
+            Initial position of the cursor. (Default: 0)
+        double : bool, optional
+            Store fields in double precision. (Default: False)
+        store_force : bool, optional
+            (Default: False)
+        mode : str, optional
+            File mode. (Default: 'r')
+        format : str, optional
+            NetCDF format. (Default: 'NETCDF4')
+        communicator : mpi4py communicator or NuMPI stub communicator, optional
+            Communicator of the domain decomposition. If it has more than one
+            process, the file is opened for parallel (MPI-IO) access and
+            every process reads and writes the hyperslab of its subdomain.
+            Fields are then passed and returned as local subdomain arrays,
+            while the shape of the file (see `set_shape`) is the global one.
+            All processes must call the methods of the container in the
+            same order. (Default: None)
+        subdomain_locations : tuple of int, optional
+            Location of the local subdomain within the global grid. Required
+            for parallel access. (Default: None)
+        nb_subdomain_grid_pts : tuple of int, optional
+            Number of grid points of the local subdomain. Required for
+            parallel access. (Default: None)
+        collective : bool, optional
+            Use collective instead of independent I/O for parallel access.
+            (Default: True)
+        storage : dict, optional
+            Default chunking and compression of all fields, see
+            `set_storage`. Options for individual variables are set with
+            `set_storage`. (Default: None)
+        cache_size : int, optional
+            Number of recently accessed frames whose fields are kept in
+            memory. With a cache, repeated accesses to a field return the
+            same read-only array; copy it before modifying it. Without a
+            cache, every access reads a fresh array. (Default: 0)
+        """
         self._fn = fn
         self._data = None
+        self._communicator = communicator
+        self._is_parallel = communicator is not None and communicator.size > 1
+        if self._is_parallel:
+            if subdomain_locations is None or nb_subdomain_grid_pts is None:
+                raise ValueError('Parallel access requires the location and number of grid points of the local '
+                                 'subdomain.')
+            if not __have_netcdf4__:
+                raise RuntimeError('Parallel access requires the netCDF4 module.')
+            self._subdomain_slices = tuple(slice(location, location + n) for location, n
+                                           in zip(subdomain_locations, nb_subdomain_grid_pts))
+            # Chunks of the size of the largest subdomain coincide with the
+            # subdomains for even decompositions, such that every process
+            # writes whole chunks
+            self._chunk_grid_pts = tuple(communicator.allreduce(n, op=MPI.MAX) for n in nb_subdomain_grid_pts)
+        else:
+            self._subdomain_slices = (slice(None), slice(None))
+            self._chunk_grid_pts = None
+        self._nb_subdomain_grid_pts = None if nb_subdomain_grid_pts is None else tuple(nb_subdomain_grid_pts)
+        self._collective = collective
+        self._storage = {None: {}}
+        self._cache_size = cache_size
+        self._frame_cache = OrderedDict()
         try:
             if __have_netcdf4__:
-                self._data = Dataset(fn, mode, format=format)
+                if self._is_parallel:
+                    self._data = Dataset(fn, mode, format=format, parallel=True, comm=communicator)
+                else:
+                    self._data = Dataset(fn, mode, format=format)
             else:
                 if mode == 'ws':
                     mode = 'w'
@@ -184,6 +332,8 @@ class NetCDFContainer(object):
             self._data.program = 'PyCo'
             self._data.programVersion = 'N/A'
             self._is_defined = False
+            if storage is not None:
+                self.set_storage(**storage)
         else:
             if 'nx' in self._data.dimensions and 'ny' in self._data.dimensions:
                 try:
@@ -204,6 +354,10 @@ class NetCDFContainer(object):
             else:
                 raise RuntimeError('Unknown NetCDF convention used for file '
                                    '%s.' % fn)
+            self._set_subdomain_shape()
+            if self._is_parallel:
+                for variable in self._data.variables.values():
+                    variable.set_collective(collective)
 
             self._is_defined = True
 
@@ -216,6 +370,171 @@ class NetCDFContainer(object):
         if self._data is not None:
             self._data.close()
 
+    def _set_subdomain_shape(self):
+        """Shapes of local (subdomain) fields"""
+        if self._is_parallel:
+            self._subdomain_shape = tuple(self._shape[:-2]) + self._nb_subdomain_grid_pts
+            self._subdomain_shape2 = self._nb_subdomain_grid_pts
+        else:
+            self._subdomain_shape = tuple(self._shape)
+            self._subdomain_shape2 = tuple(self._shape2)
+
+    def _subdomain_index(self, dimensions):
+        """Index of the local subdomain into a variable with these dimensions"""
+        return tuple(self._subdomain_slices[0] if dimension == 'nx' else
+                     (self._subdomain_slices[1] if dimension == 'ny' else slice(None))
+                     for dimension in dimensions)
+
+    @staticmethod
+    def _decode(variable, value):
+        """Convert values read from a variable to the type that was written"""
+        if getattr(variable, 'flag_meanings', None) == 'false true':
+            return value.astype(bool)
+        return value
+
+    def _read_field(self, i, name):
+        """Read the (local) field of a frame, through the frame cache"""
+        fields = self._frame_cache.get(i)
+        if fields is not None:
+            self._frame_cache.move_to_end(i)
+            if name in fields:
+                return fields[name]
+
+        variable = self._data.variables[name]
+        value = self._decode(variable, variable[(i,) + self._subdomain_index(variable.dimensions[1:])])
+        # Reshape
+        if self._is_amber:
+            nx, ny = self._shape
+            value.shape = (nx, ny, 3)
+
+        if self._cache_size > 0:
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            if fields is None:
+                fields = self._frame_cache[i] = {}
+                while len(self._frame_cache) > self._cache_size:
+                    self._frame_cache.popitem(last=False)
+            fields[name] = value
+        return value
+
+    def _invalidate_field(self, i, name):
+        """Remove a field that has been written from the frame cache"""
+        fields = self._frame_cache.get(i)
+        if fields is not None:
+            fields.pop(name, None)
+
+    def read_frames(self, name, frames=None, window=None):
+        """
+        Read a field for a range of frames into a single array. This is a
+        single read from the file, independent of the frame cache.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field (or scalar).
+        frames : slice or sequence of int, optional
+            Frames to read. (Default: all frames)
+        window : tuple of slice, optional
+            Window of the (local) field to read. (Default: full field)
+
+        Returns
+        -------
+        values : np.ndarray
+            Array with the frames along the first axis.
+        """
+        if frames is None:
+            frames = slice(None)
+        elif not isinstance(frames, slice):
+            frames = np.asarray(frames, dtype=int)
+            frames = np.where(frames < 0, frames + len(self), frames)
+        if window is None:
+            window = ()
+        elif not isinstance(window, tuple):
+            window = (window,)
+        variable = self._data.variables[name]
+        if self._is_parallel or self._is_amber:
+            values = self._decode(variable, variable[(frames,) + self._subdomain_index(variable.dimensions[1:])])
+            if self._is_amber:
+                nx, ny = self._shape
+                values.shape = (len(values), nx, ny, 3)
+            return values[(slice(None),) + window]
+        return self._decode(variable, variable[(frames,) + window])
+
+    def _create_variable(self, name, dtype, dimensions):
+        """
+        Create a variable with the storage options registered for it (see
+        `set_storage`). Fields are chunked frame by frame; for parallel files
+        the default chunks are aligned with the decomposition and variables
+        are accessed collectively.
+        """
+        is_field = 'nx' in dimensions and 'ny' in dimensions
+        storage = self._storage.get(name, self._storage[None] if is_field else {})
+        kwargs = {}
+        chunk_grid_pts = storage.get('chunk_shape', self._shape2 if self._chunk_grid_pts is None
+                                     else self._chunk_grid_pts)
+        if is_field:
+            kwargs['chunksizes'] = tuple(
+                1 if dimension == 'frame' else
+                (min(chunk_grid_pts[0], len(self._data.dimensions[dimension])) if dimension == 'nx' else
+                 (min(chunk_grid_pts[1], len(self._data.dimensions[dimension])) if dimension == 'ny' else
+                  len(self._data.dimensions[dimension])))
+                for dimension in dimensions)
+        complevel = storage.get('complevel', 0)
+        if complevel > 0:
+            kwargs.update(zlib=True, complevel=complevel, shuffle=storage.get('shuffle', True))
+        significant_digits = storage.get('significant_digits')
+        if significant_digits is not None and np.dtype(dtype).kind == 'f':
+            kwargs['significant_digits'] = significant_digits
+        if not __have_netcdf4__:
+            # Classic files have no chunking and compression
+            kwargs = {}
+        variable = self._data.createVariable(name, dtype, dimensions, **kwargs)
+        if self._is_parallel:
+            variable.set_collective(self._collective)
+        return variable
+
+    def set_storage(self, name=None, chunk_shape=None, complevel=0, shuffle=True, significant_digits=None):
+        """
+        Set chunking and compression of a variable. The options take effect
+        when the variable is created, i.e. on its first assignment.
+
+        Parameters
+        ----------
+        name : str, optional
+            Name of the variable. Options for name None are the defaults for
+            all fields (variables on the grid) without options of their own.
+            (Default: None)
+        chunk_shape : tuple of int, optional
+            Number of grid points of a chunk of a single frame. Chunks of
+            fields always contain a single frame. (Default: full grid, or the
+            largest subdomain for parallel files)
+        complevel : int, optional
+            Level of zlib compression between 1 and 9. No compression if 0.
+            (Default: 0)
+        shuffle : bool, optional
+            Apply the HDF5 shuffle filter before compression, which helps for
+            smooth fields. (Default: True)
+        significant_digits : int, optional
+            Quantize floating-point values to this number of significant
+            decimal digits, which makes them compress much better. Values
+            are stored losslessly if None. Requires netCDF4-python 1.6.0 or
+            later. (Default: None)
+        """
+        if significant_digits is not None and not __have_quantization__:
+            raise RuntimeError('Quantization (`significant_digits`) requires netCDF4-python 1.6.0 or later, built '
+                               'against netCDF-C 4.9.0 or later.')
+        if name is not None and name in self._data.variables:
+            raise RuntimeError('Cannot change the storage of variable "{0}" '
+                               'which already exists.'.format(name))
+        if chunk_shape is not None and len(chunk_shape) != 2:
+            raise ValueError('Chunk shape must have two entries, but is {0}.'.format(chunk_shape))
+        if complevel < 0 or complevel > 9:
+            raise ValueError('Compression level must be between 0 and 9, but is {0}.'.format(complevel))
+        storage = dict(complevel=complevel, shuffle=shuffle, significant_digits=significant_digits)
+        if chunk_shape is not None:
+            storage['chunk_shape'] = tuple(chunk_shape)
+        self._storage[name] = storage
+
     def _define_file_structure(self, shape):
         # print 'defining file structure, shape = {0}'.format(shape)
         self._shape = shape
@@ -237,6 +556,7 @@ class NetCDFContainer(object):
         if 'ny' not in self._data.dimensions:
             self._data.createDimension('ny', ny)
 
+        self._set_subdomain_shape()
         self._data.sync()
 
         self._is_defined = True
@@ -271,6 +591,7 @@ class NetCDFContainer(object):
         return length
 
     def close(self):
+        self._frame_cache.clear()
         if self._data is not None:
             self._data.close()
             self._is_defined = False
@@ -280,6 +601,14 @@ class NetCDFContainer(object):
         return 'h' in self._data.variables
 
     def set_rigid_surface(self, h, ndof=None):
+        if self._is_parallel:
+            # The rigid surface is decomposed like all other fields, the
+            # (global) shape must have been set before
+            if 'h' not in self._data.variables:
+                self._create_variable('h', 'f8', ('nx', 'ny',))
+            self._data.variables['h'][self._subdomain_slices] = h
+            return
+
         self.set_shape(h, ndof=ndof)
         nx, ny = self._shape2
         hnx, hny = h.shape
@@ -290,10 +619,10 @@ class NetCDFContainer(object):
                     self._data.createDimension('rigid_nx', hnx)
                 if 'rigid_ny' not in self._data.dimensions:
                     self._data.createDimension('rigid_ny', hny)
-                self._data.createVariable('h', 'f8', ('rigid_nx',
-                                                      'rigid_ny',))
+                self._create_variable('h', 'f8', ('rigid_nx',
+                                                  'rigid_ny',))
             else:
-                self._data.createVariable('h', 'f8', ('nx', 'ny',))
+                self._create_variable('h', 'f8', ('nx', 'ny',))
 
         self._data.variables['h'][:, :] = h
 
@@ -302,19 +631,20 @@ class NetCDFContainer(object):
 
     def set_elastic_surface(self, h):
         if 'elastic_surface' not in self._data.variables:
-            self._data.createVariable('elastic_surface', 'f8',
-                                      ('nx', 'ny',)
-                                      )
+            self._create_variable('elastic_surface', 'f8', ('nx', 'ny',))
 
-        self._data.variables['elastic_surface'][:, :] = h
+        self._data.variables['elastic_surface'][self._subdomain_slices] = h
 
     def get_rigid_surface(self):
-        return self._data.variables['h'][:, :]
+        variable = self._data.variables['h']
+        return variable[self._subdomain_index(variable.dimensions)]
 
     # Backward compatibility
     get_h = get_rigid_surface
 
     def get_elastic_surface(self):
+        if self._is_parallel:
+            return self._data.variables['elastic_surface'][self._subdomain_slices]
         return self._data.variables['elastic_surface']
 
     def get_filename(self):
@@ -336,7 +666,10 @@ class NetCDFContainer(object):
             return self.__dict__[name]
 
         if name in self._data.variables:
-            return self._data.variables[name][...]
+            variable = self._data.variables[name]
+            if self._is_parallel:
+                return variable[self._subdomain_index(variable.dimensions)]
+            return variable[...]
 
         return self._data.__getattr__(name)
 
@@ -346,16 +679,16 @@ class NetCDFContainer(object):
 
         if isinstance(value, np.ndarray) and value.shape != ():
             if name not in self._data.variables:
-                if len(value.shape) == len(self._shape) and \
-                        np.all(np.array(value.shape) == np.array(self._shape)):
-                    self._data.createVariable(name, 'f8', ('nx', 'ny',))
+                if len(value.shape) == len(self._subdomain_shape) and \
+                        np.all(np.array(value.shape) == np.array(self._subdomain_shape)):
+                    self._create_variable(name, 'f8', ('nx', 'ny',))
                 else:
                     raise RuntimeError('Not sure how to guess NetCDF type for '
                                        'field "{0}" which is a numpy ndarray '
                                        'with type {1} and shape {2}.'
                                        .format(name, value.dtype, value.shape))
 
-            self._data.variables[name][:, :] = value
+            self._data.variables[name][self._subdomain_slices] = value
             return
 
         return self._data.__setattr__(name, value)
@@ -22,5 +22,5 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-
+from .AsyncWriter import AsyncWriter  # noqa: F401
 from .NetCDF import NetCDFContainer  # noqa: F401
@@ -0,0 +1,305 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Interaction potentials (energy per area as a function of the gap) for
+adhesive (soft-wall) contact systems
+"""
+
+import abc
+
+import numpy as np
+
+
+class Potential(object, metaclass=abc.ABCMeta):
+    """
+    Interaction energy per area :math:`V(g)` as a function of the local gap
+    :math:`g`. Potentials without repulsive core require a hard wall, i.e.
+    the constraint :math:`g \\geq 0`.
+
+    Potentials are evaluated by vectorized kernels that write into
+    preallocated arrays, such that repeated evaluations (e.g. within an
+    optimizer) do not allocate memory.
+    """
+
+    #: Potential requires the non-penetration constraint g >= 0
+    hard_wall = True
+
+    def evaluate(self, gap, potential=True, gradient=False, curvature=False, out=None):
+        """
+        Evaluate the potential and its derivatives with respect to the gap.
+
+        Parameters
+        ----------
+        gap : np.ndarray
+            Local gap.
+        potential : bool, optional
+            Evaluate the energy per area :math:`V`. (Default: True)
+        gradient : bool, optional
+            Evaluate :math:`\\partial V/\\partial g`. (Default: False)
+        curvature : bool, optional
+            Evaluate :math:`\\partial^2 V/\\partial g^2`. (Default: False)
+        out : tuple of np.ndarray, optional
+            Arrays of the shape of the gap for energy, gradient and curvature.
+            Entries are only written to if the respective quantity is
+            requested. New arrays are allocated if not given. (Default: None)
+
+        Returns
+        -------
+        potential : np.ndarray or None
+            Energy per area.
+        gradient : np.ndarray or None
+            First derivative of the energy per area.
+        curvature : np.ndarray or None
+            Second derivative of the energy per area.
+        """
+        if out is None:
+            out = (None, None, None)
+        out = tuple(np.empty_like(gap, dtype=float) if requested and buffer is None else buffer
+                    for requested, buffer in zip((potential, gradient, curvature), out))
+        self._evaluate(gap,
+                       out[0] if potential else None,
+                       out[1] if gradient else None,
+                       out[2] if curvature else None)
+        return (out[0] if potential else None,
+                out[1] if gradient else None,
+                out[2] if curvature else None)
+
+    def _work_arrays(self, gap, nb_arrays):
+        """Scratch arrays of the shape of the gap, reused between evaluations"""
+        work = getattr(self, '_work', None)
+        if work is None or work[0].shape != gap.shape:
+            work = self._work = [np.empty(gap.shape) for i in range(nb_arrays)]
+        return work
+
+    @abc.abstractmethod
+    def _evaluate(self, gap, potential, gradient, curvature):
+        """Write the requested quantities (arrays that are not None) in place"""
+        raise NotImplementedError
+
+    @property
+    @abc.abstractmethod
+    def work_of_adhesion(self):
+        """Energy per area required to separate the surfaces from contact"""
+        raise NotImplementedError
+
+
+class Exponential(Potential):
+    """
+    Purely attractive exponential potential
+
+    .. math ::
+
+        V(g) = -w \\exp(-g/\\rho)
+
+    with work of adhesion :math:`w` and interaction range :math:`\\rho`,
+    combined with a hard wall.
+    """
+
+    def __init__(self, work_of_adhesion, interaction_range):
+        """
+        Parameters
+        ----------
+        work_of_adhesion : float
+            Work of adhesion :math:`w`.
+        interaction_range : float
+            Decay length :math:`\\rho`.
+        """
+        self._work_of_adhesion = work_of_adhesion
+        self.interaction_range = interaction_range
+
+    def __repr__(self):
+        return f'Exponential(work_of_adhesion={self._work_of_adhesion}, ' \
+               f'interaction_range={self.interaction_range})'
+
+    @property
+    def work_of_adhesion(self):
+        return self._work_of_adhesion
+
+    def _evaluate(self, gap, potential, gradient, curvature):
+        w, rho = self._work_of_adhesion, self.interaction_range
+        requested = [(buffer, factor) for buffer, factor in [(potential, -w), (gradient, w / rho),
+                                                             (curvature, -w / rho ** 2)]
+                     if buffer is not None]
+        if len(requested) == 0:
+            return
+        # A single exponential, stored in the last requested array, serves all
+        # quantities
+        e, e_factor = requested[-1]
+        np.multiply(gap, -1 / rho, out=e)
+        np.exp(e, out=e)
+        for buffer, factor in requested[:-1]:
+            np.multiply(e, factor, out=buffer)
+        e *= e_factor
+
+
+class LennardJones93(Potential):
+    """
+    Lennard-Jones-like 9-3 potential with a repulsive core
+
+    .. math ::
+
+        V(g) = \\frac{w}{2} \\left(s^9 - 3 s^3\\right),
+        \\quad s = \\frac{z_0}{g + z_0}
+
+    The minimum of the potential :math:`V(0) = -w` is located at zero gap. No
+    hard wall is required. The potential diverges for
+    :math:`g \\rightarrow -z_0`; below the core gap :math:`g_c` it is
+    therefore continued by its second-order Taylor expansion around
+    :math:`g_c`, such that line searches of optimizers never encounter the
+    singularity.
+    """
+
+    hard_wall = False
+
+    def __init__(self, work_of_adhesion, z0, core_gap=None):
+        """
+        Parameters
+        ----------
+        work_of_adhesion : float
+            Work of adhesion :math:`w`.
+        z0 : float
+            Length scale of the interaction.
+        core_gap : float, optional
+            Gap below which the potential is continued quadratically. Must be
+            larger than :math:`-z_0`. (Default: :math:`-0.3 z_0`)
+        """
+        self._work_of_adhesion = work_of_adhesion
+        self.z0 = z0
+        self.core_gap = -0.3 * z0 if core_gap is None else core_gap
+        if self.core_gap <= -z0:
+            raise ValueError('The core gap must be larger than -z0.')
+        # Gradient and curvature at the core gap
+        s = z0 / (self.core_gap + z0)
+        self._core_gradient = 9 * work_of_adhesion / (2 * z0) * s ** 4 * (1 - s ** 6)
+        self._core_curvature = 9 * work_of_adhesion / (2 * z0 ** 2) * s ** 5 * (10 * s ** 6 - 4)
+
+    def __repr__(self):
+        return f'LennardJones93(work_of_adhesion={self._work_of_adhesion}, z0={self.z0}, core_gap={self.core_gap})'
+
+    @property
+    def work_of_adhesion(self):
+        return self._work_of_adhesion
+
+    def _evaluate(self, gap, potential, gradient, curvature):
+        w, z0 = self._work_of_adhesion, self.z0
+        s, s3, core = self._work_arrays(gap, 3)
+        # Distance into the core (nonpositive)
+        np.subtract(gap, self.core_gap, out=core)
+        np.minimum(core, 0, out=core)
+        # All quantities are polynomials in s = z0 / (gap + z0), evaluated
+        # at the core gap within the core
+        np.maximum(gap, self.core_gap, out=s)
+        s += z0
+        np.divide(z0, s, out=s)
+        np.multiply(s, s, out=s3)
+        s3 *= s
+        if potential is not None:
+            # w/2 s^3 (s^6 - 3)
+            np.multiply(s3, s3, out=potential)
+            potential -= 3
+            potential *= s3
+            potential *= w / 2
+        if gradient is not None:
+            # 9w/(2 z0) s^4 (1 - s^6)
+            np.multiply(s3, s3, out=gradient)
+            np.subtract(1, gradient, out=gradient)
+            gradient *= s3
+            gradient *= s
+            gradient *= 9 * w / (2 * z0)
+        if curvature is not None:
+            # 9w/(2 z0^2) s^5 (10 s^6 - 4)
+            np.multiply(s3, s3, out=curvature)
+            curvature *= 10
+            curvature -= 4
+            curvature *= s3
+            curvature *= s
+            curvature *= s
+            curvature *= 9 * w / (2 * z0 ** 2)
+        # Taylor expansion within the core
+        if gradient is not None:
+            s3[...] = core
+            s3 *= self._core_curvature
+            gradient += s3
+        if potential is not None:
+            # (V'_c + V''_c d / 2) d
+            np.multiply(core, self._core_curvature / 2, out=s3)
+            s3 += self._core_gradient
+            s3 *= core
+            potential += s3
+
+
+class Dugdale(Potential):
+    """
+    Dugdale-Maugis cohesive zone: constant attractive stress :math:`\\sigma_0`
+    up to the critical gap :math:`\\rho`,
+
+    .. math ::
+
+        V(g) = -\\sigma_0 (\\rho - g) \\quad \\text{for} \\quad g < \\rho,
+
+    and zero otherwise, combined with a hard wall. The work of adhesion is
+    :math:`w = \\sigma_0 \\rho`.
+    """
+
+    def __init__(self, work_of_adhesion, interaction_range):
+        """
+        Parameters
+        ----------
+        work_of_adhesion : float
+            Work of adhesion :math:`w`.
+        interaction_range : float
+            Critical gap :math:`\\rho` beyond which the surfaces do not
+            interact.
+        """
+        self._work_of_adhesion = work_of_adhesion
+        self.interaction_range = interaction_range
+
+    def __repr__(self):
+        return f'Dugdale(work_of_adhesion={self._work_of_adhesion}, ' \
+               f'interaction_range={self.interaction_range})'
+
+    @property
+    def work_of_adhesion(self):
+        return self._work_of_adhesion
+
+    @property
+    def cohesive_stress(self):
+        """Attractive stress within the cohesive zone"""
+        return self._work_of_adhesion / self.interaction_range
+
+    def _evaluate(self, gap, potential, gradient, curvature):
+        rho, sigma0 = self.interaction_range, self.cohesive_stress
+        if potential is not None:
+            # -sigma0 * max(rho - g, 0)
+            np.subtract(gap, rho, out=potential)
+            np.minimum(potential, 0, out=potential)
+            potential *= sigma0
+        if gradient is not None:
+            np.less(gap, rho, out=gradient, casting='unsafe')
+            gradient *= sigma0
+        if curvature is not None:
+            # The curvature is a delta function at the critical gap; it is
+            # zero everywhere else
+            curvature[...] = 0
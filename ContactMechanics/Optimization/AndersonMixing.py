@@ -0,0 +1,132 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Anderson acceleration of fixed-point iterations
+"""
+
+import numpy as np
+
+from NuMPI.Tools import Reduction
+
+from SurfaceTopography.Support import doi
+
+
+class AndersonMixing:
+    """
+    Anderson acceleration of the fixed-point iteration x = G(x).
+
+    Simple mixing updates the iterate as x + mix * (G(x) - x). Anderson mixing
+    additionally uses the residuals G(x) - x of the last `history` iterations
+    to extrapolate to the iterate with the smallest residual in the subspace
+    spanned by these iterations. The history is discarded whenever the norm
+    of the residual increases. See: Anderson, J. ACM 12, 547 (1965);
+    Walker, Ni, SIAM J. Numer. Anal. 49, 1715 (2011)
+
+    Example
+    -------
+    >>> mixer = AndersonMixing(mix=0.1)
+    >>> x = x0
+    >>> for it in range(maxiter):
+    ...     x = mixer(x, G(x))
+    """
+
+    def __init__(self, mix=0.1, history=5, reduction=None):
+        """
+        Parameters
+        ----------
+        mix : float, optional
+            Mixing factor of the simple mixing step. (Default: 0.1)
+        history : int, optional
+            Number of previous iterations used for extrapolation. A history of
+            zero yields simple mixing. (Default: 5)
+        reduction : NuMPI.Tools.Reduction, optional
+            Reduction operations across MPI processes for distributed iterates.
+            (Default: serial reduction)
+        """
+        self.mix = mix
+        self.history = history
+        self.reduction = Reduction() if reduction is None else reduction
+        self.reset()
+
+    def reset(self):
+        """Discard the history of previous iterations"""
+        self._last_x = None
+        self._last_residual = None
+        self._last_residual_norm = None
+        self._dx = []
+        self._dresidual = []
+
+    @doi('10.1145/321296.321305',  # Anderson
+         '10.1137/10078356X'  # Walker & Ni
+         )
+    def __call__(self, x, gx, mix=None):
+        """
+        Compute next iterate.
+
+        Parameters
+        ----------
+        x : array_like
+            Current iterate.
+        gx : array_like
+            Fixed-point map G(x) evaluated at the current iterate.
+        mix : float, optional
+            Mixing factor for this step. (Default: mixing factor passed to the
+            constructor)
+
+        Returns
+        -------
+        next_x : np.ndarray
+            Next iterate, same shape as `x`.
+        """
+        if mix is None:
+            mix = self.mix
+        shape = np.shape(x)
+        x = np.array(x, dtype=float).ravel()
+        residual = np.ravel(gx) - x
+
+        residual_norm = np.sqrt(self.reduction.sum(residual * residual))
+        if self._last_x is not None and residual_norm > self._last_residual_norm:
+            # Safeguard: Restart from simple mixing if the residual increases
+            self._dx = []
+            self._dresidual = []
+        elif self._last_x is not None and self.history > 0:
+            self._dx += [x - self._last_x]
+            self._dresidual += [residual - self._last_residual]
+            if len(self._dx) > self.history:
+                self._dx.pop(0)
+                self._dresidual.pop(0)
+        self._last_x = x
+        self._last_residual = residual
+        self._last_residual_norm = residual_norm
+
+        next_x = x + mix * residual
+        if len(self._dresidual) > 0:
+            dresidual = np.array(self._dresidual)
+            # Minimize the norm of the extrapolated residual
+            gram = self.reduction.sum((dresidual @ dresidual.T)[np.newaxis], axis=0)
+            projection = self.reduction.sum((dresidual @ residual)[np.newaxis], axis=0)
+            gamma = np.linalg.lstsq(gram, projection, rcond=None)[0]
+            next_x -= gamma @ (np.array(self._dx) + mix * dresidual)
+        return next_x.reshape(shape)
@@ -0,0 +1,298 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Elementwise kernels of the constrained conjugate gradient iteration.
+
+The kernels operate on the local (MPI subdomain) data only and return local
+partial sums or maxima; reduction across processes is left to the caller.
+The NumPy backend evaluates the kernels as sequences of array expressions. The
+Numba backend fuses each kernel into a single, multithreaded pass over memory
+and is only available if Numba is installed.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+class NumpyKernels:
+    """Kernels implemented with NumPy array expressions"""
+
+    name = 'numpy'
+
+    @staticmethod
+    def masked_sq_norm(mask, g):
+        """Local sum of mask * g * g"""
+        return np.sum(mask * g * g)
+
+    @staticmethod
+    def conjugate_direction(mask, g, t, beta):
+        """
+        Conjugate search direction mask * (g + beta * t) and the local sum of
+        mask * g * t of the new direction t.
+        """
+        t = mask * (g + beta * t)
+        return t, np.sum(mask * g * t)
+
+    @staticmethod
+    def masked_dot(mask, a, b):
+        """Local sum of mask * a * b"""
+        return np.sum(mask * a * b)
+
+    @staticmethod
+    def update_forces(f, tau, mask, t):
+        """In-place update f += tau * mask * t"""
+        f += tau * mask * t
+
+    @staticmethod
+    def project_forces(f, hardness=None, truncate=False):
+        """
+        Determine tensile (f >= 0) and flowing (f <= -hardness) pixels and the
+        largest violation of either bound. Tensile forces are set to zero in
+        place, flowing forces are set to the hardness if `truncate` is true.
+
+        Returns
+        -------
+        mask_tensile : np.ndarray of bool
+            Pixels with tensile force.
+        mask_flowing : np.ndarray of bool or None
+            Pixels at or above the hardness. None if no hardness is given.
+        max_tensile : float
+            Largest local tensile force (zero if there is none).
+        max_flowing : float
+            Largest local excess of compressive force over the hardness (zero
+            if there is none).
+        """
+        mask_tensile = f >= 0.0
+        max_tensile = np.max(f[mask_tensile], initial=0.0)
+        mask_flowing = None
+        max_flowing = 0.0
+        if hardness is not None:
+            mask_flowing = f <= -hardness
+            if np.ndim(hardness) == 0:
+                flowing_hardness = hardness
+            else:
+                flowing_hardness = hardness[mask_flowing]
+            max_flowing = np.max(-(f[mask_flowing] + flowing_hardness), initial=0.0)
+        f[mask_tensile] = 0.0
+        if truncate and hardness is not None:
+            f[mask_flowing] = -flowing_hardness
+        return mask_tensile, mask_flowing, max_tensile, max_flowing
+
+    @staticmethod
+    def max_abs_difference(a, b):
+        """Local maximum of abs(a - b)"""
+        return np.max(abs(a - b), initial=0.0)
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _masked_sq_norm(mask, g):
+        s = 0.0
+        for i in prange(g.size):
+            if mask[i]:
+                s += g[i] * g[i]
+        return s
+
+    @njit(parallel=True, cache=True)
+    def _conjugate_direction(mask, g, t, beta, t_out):
+        s = 0.0
+        for i in prange(g.size):
+            if mask[i]:
+                ti = g[i] + beta * t[i]
+                t_out[i] = ti
+                s += g[i] * ti
+            else:
+                t_out[i] = 0.0
+        return s
+
+    @njit(parallel=True, cache=True)
+    def _masked_dot(mask, a, b):
+        s = 0.0
+        for i in prange(a.size):
+            if mask[i]:
+                s += a[i] * b[i]
+        return s
+
+    @njit(parallel=True, cache=True)
+    def _update_forces(f, tau, mask, t):
+        for i in prange(f.size):
+            if mask[i]:
+                f[i] += tau * t[i]
+
+    @njit(parallel=True, cache=True)
+    def _project_forces(f, hardness, truncate, mask_tensile, mask_flowing):
+        max_tensile = 0.0
+        max_flowing = 0.0
+        for i in prange(f.size):
+            fi = f[i]
+            tensile = fi >= 0.0
+            flowing = fi <= -hardness
+            mask_tensile[i] = tensile
+            mask_flowing[i] = flowing
+            if tensile:
+                max_tensile = max(max_tensile, fi)
+                f[i] = 0.0
+            if flowing:
+                max_flowing = max(max_flowing, -(fi + hardness))
+                if truncate:
+                    f[i] = -hardness
+        return max_tensile, max_flowing
+
+    @njit(parallel=True, cache=True)
+    def _project_forces_per_pixel(f, hardness, truncate, mask_tensile, mask_flowing):
+        max_tensile = 0.0
+        max_flowing = 0.0
+        for i in prange(f.size):
+            fi = f[i]
+            hi = hardness[i]
+            tensile = fi >= 0.0
+            flowing = fi <= -hi
+            mask_tensile[i] = tensile
+            mask_flowing[i] = flowing
+            if tensile:
+                max_tensile = max(max_tensile, fi)
+                f[i] = 0.0
+            if flowing:
+                max_flowing = max(max_flowing, -(fi + hi))
+                if truncate:
+                    f[i] = -hi
+        return max_tensile, max_flowing
+
+    @njit(parallel=True, cache=True)
+    def _max_abs_difference(a, b):
+        m = 0.0
+        for i in prange(a.size):
+            m = max(m, abs(a[i] - b[i]))
+        return m
+
+
+def _flat_views(*arrays):
+    """
+    Return one-dimensional views of arrays that share the same memory layout,
+    or None if no such views exist. (Note that muFFT returns Fortran-ordered
+    arrays while the masks created by the solver may be C-ordered.)
+    """
+    if all(a.flags.c_contiguous for a in arrays):
+        return [a.reshape(-1, order='C') for a in arrays]
+    if all(a.flags.f_contiguous for a in arrays):
+        return [a.reshape(-1, order='F') for a in arrays]
+    return None
+
+
+class NumbaKernels:
+    """
+    Kernels compiled with Numba. Each kernel is a single multithreaded pass
+    over memory. Arguments with incompatible memory layouts are handed to the
+    NumPy kernels.
+    """
+
+    name = 'numba'
+
+    @staticmethod
+    def masked_sq_norm(mask, g):
+        views = _flat_views(mask, g)
+        if views is None:
+            return NumpyKernels.masked_sq_norm(mask, g)
+        return _masked_sq_norm(*views)
+
+    @staticmethod
+    def conjugate_direction(mask, g, t, beta):
+        t_out = np.empty_like(g)
+        views = _flat_views(mask, g, t, t_out)
+        if views is None:
+            return NumpyKernels.conjugate_direction(mask, g, t, beta)
+        mask_v, g_v, t_v, t_out_v = views
+        return t_out, _conjugate_direction(mask_v, g_v, t_v, float(beta), t_out_v)
+
+    @staticmethod
+    def masked_dot(mask, a, b):
+        views = _flat_views(mask, a, b)
+        if views is None:
+            return NumpyKernels.masked_dot(mask, a, b)
+        return _masked_dot(*views)
+
+    @staticmethod
+    def update_forces(f, tau, mask, t):
+        views = _flat_views(f, mask, t)
+        if views is None:
+            return NumpyKernels.update_forces(f, tau, mask, t)
+        f_v, mask_v, t_v = views
+        _update_forces(f_v, float(tau), mask_v, t_v)
+
+    @staticmethod
+    def project_forces(f, hardness=None, truncate=False):
+        mask_tensile = np.empty_like(f, dtype=bool)
+        mask_flowing = np.empty_like(f, dtype=bool)
+        if np.ndim(hardness) > 0:
+            views = _flat_views(f, hardness, mask_tensile, mask_flowing)
+            if views is None:
+                return NumpyKernels.project_forces(f, hardness, truncate)
+            max_tensile, max_flowing = _project_forces_per_pixel(views[0], views[1], truncate, views[2], views[3])
+            return mask_tensile, mask_flowing, max_tensile, max_flowing
+        views = _flat_views(f, mask_tensile, mask_flowing)
+        if views is None:
+            return NumpyKernels.project_forces(f, hardness, truncate)
+        max_tensile, max_flowing = _project_forces(views[0], np.inf if hardness is None else float(hardness),
+                                                   truncate, views[1], views[2])
+        if hardness is None:
+            mask_flowing = None
+        return mask_tensile, mask_flowing, max_tensile, max_flowing
+
+    @staticmethod
+    def max_abs_difference(a, b):
+        views = _flat_views(a, b)
+        if views is None:
+            return NumpyKernels.max_abs_difference(a, b)
+        return _max_abs_difference(*views)
+
+
+def get_kernels(backend='numpy'):
+    """
+    Return the kernels for a specific backend.
+
+    Parameters
+    ----------
+    backend : str, optional
+        'numpy', 'numba' or 'auto'. 'auto' selects Numba if it is installed
+        and NumPy otherwise. (Default: 'numpy')
+
+    Returns
+    -------
+    kernels : class
+        Class with the kernels as static methods.
+    """
+    if backend == 'numpy':
+        return NumpyKernels
+    elif backend == 'numba':
+        if njit is None:
+            raise ImportError("The 'numba' backend requires Numba to be installed.")
+        return NumbaKernels
+    elif backend == 'auto':
+        return NumpyKernels if njit is None else NumbaKernels
+    raise ValueError(f"Unknown backend '{backend}'. Use either 'numpy', 'numba' or 'auto'.")
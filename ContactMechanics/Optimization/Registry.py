@@ -0,0 +1,174 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Registry of solvers for non-smooth contact problems
+"""
+
+
+class Solver:
+    """
+    Solver registered for non-smooth contact problems, together with its
+    capabilities.
+
+    The solver function is called as
+
+        function(system, offset=None, external_force=None, **kwargs)
+
+    and must return a normalized result, i.e. a `scipy.optimize.OptimizeResult`
+    with the fields
+
+        success : bool
+            Whether the solver converged.
+        message : str
+            Description of the cause of termination.
+        nit : int
+            Number of iterations.
+        offset : float
+            Offset of the rigid surface.
+        disp : np.ndarray
+            Displacements of the substrate.
+        forces : np.ndarray
+            Pixel forces, positive for compressive (repulsive) contact.
+        gap : np.ndarray
+            Gap between substrate and rigid surface.
+        solver : str
+            Name of the solver.
+        solver_result : scipy.optimize.OptimizeResult
+            Result in the native convention of the underlying algorithm.
+    """
+
+    def __init__(self, name, function, mpi=False, hardness=False, force_control=False, nonperiodic=False,
+                 priority=0):
+        """
+        Parameters
+        ----------
+        name : str
+            Name of the solver.
+        function : callable
+            Solver function.
+        mpi : bool, optional
+            Solver supports domain decomposition. (Default: False)
+        hardness : bool, optional
+            Solver supports plastic systems (with a hardness). (Default: False)
+        force_control : bool, optional
+            Solver supports a prescribed external force. (Default: False)
+        nonperiodic : bool, optional
+            Solver supports nonperiodic (free) boundary conditions.
+            (Default: False)
+        priority : float, optional
+            Rank of the solver for automatic selection. Among all applicable
+            solvers, the one with the highest priority is chosen,
+            irrespective of the size of the problem. (Default: 0)
+        """
+        self.name = name
+        self.function = function
+        self.mpi = mpi
+        self.hardness = hardness
+        self.force_control = force_control
+        self.nonperiodic = nonperiodic
+        self.priority = priority
+
+    def __repr__(self):
+        return f"Solver('{self.name}')"
+
+    def is_applicable(self, mpi=False, hardness=False, force_control=False, nonperiodic=False):
+        """Check whether the solver can handle a problem with these requirements"""
+        return (self.mpi or not mpi) and (self.hardness or not hardness) and \
+            (self.force_control or not force_control) and (self.nonperiodic or not nonperiodic)
+
+    def __call__(self, system, offset=None, external_force=None, **kwargs):
+        return self.function(system, offset=offset, external_force=external_force, **kwargs)
+
+
+_solvers = {}
+
+
+def register_solver(name, function, **capabilities):
+    """
+    Register a solver for non-smooth contact problems. See `Solver` for the
+    signature of the solver function and the possible capabilities. An
+    existing solver of the same name is replaced.
+
+    Parameters
+    ----------
+    name : str
+        Name of the solver.
+    function : callable
+        Solver function.
+    **capabilities
+        Capabilities and priority of the solver.
+
+    Returns
+    -------
+    solver : Solver
+        The registered solver.
+    """
+    solver = Solver(name, function, **capabilities)
+    _solvers[name] = solver
+    return solver
+
+
+def registered_solvers():
+    """Return a dictionary of all registered solvers"""
+    return dict(_solvers)
+
+
+def get_solver(name, mpi=False, hardness=False, force_control=False, nonperiodic=False):
+    """
+    Return a solver for a problem with specific requirements.
+
+    Parameters
+    ----------
+    name : str
+        Name of the solver. 'auto' selects the applicable solver with the
+        highest priority.
+    mpi : bool, optional
+        Problem is domain decomposed. (Default: False)
+    hardness : bool, optional
+        Problem is plastic. (Default: False)
+    force_control : bool, optional
+        Problem prescribes the external force. (Default: False)
+    nonperiodic : bool, optional
+        Problem has nonperiodic boundary conditions. (Default: False)
+
+    Returns
+    -------
+    solver : Solver
+        Solver for the problem.
+    """
+    requirements = dict(mpi=mpi, hardness=hardness, force_control=force_control, nonperiodic=nonperiodic)
+    if name == 'auto':
+        applicable = [solver for solver in _solvers.values() if solver.is_applicable(**requirements)]
+        if len(applicable) == 0:
+            raise ValueError(f'No registered solver can handle a problem with requirements {requirements}.')
+        return max(applicable, key=lambda solver: solver.priority)
+    try:
+        solver = _solvers[name]
+    except KeyError:
+        raise ValueError(f"Unknown solver '{name}'. Registered solvers are: {', '.join(_solvers)}.")
+    if not solver.is_applicable(**requirements):
+        missing = [key for key, value in requirements.items() if value and not getattr(solver, key)]
+        raise ValueError(f"Solver '{name}' does not support: {', '.join(missing)}.")
+    return solver
@@ -29,3 +29,7 @@ Optimization algorithms
 
 from .ConstrainedConjugateGradients import \
     constrained_conjugate_gradients  # noqa: F401
+from .ConstrainedConjugateGradients import \
+    lockstep_constrained_conjugate_gradients  # noqa: F401
+from .AndersonMixing import AndersonMixing  # noqa: F401
+from .Registry import get_solver, register_solver, registered_solvers  # noqa: F401
@@ -23,20 +23,97 @@
 #
 
 import logging
+import os
+import threading
 
 import numpy as np
 
-from SurfaceTopography import PlasticTopography
+from SurfaceTopography import Topography
+
 from SurfaceTopography.HeightContainer import UniformTopographyInterface
 
 from .FFTElasticHalfSpace import PeriodicFFTElasticHalfSpace, FreeFFTElasticHalfSpace
 from .Factory import make_system, make_plastic_system
+from .PlasticSystemSpecialisations import PhaseHardness
+from .Tools.AreaControl import ContactAreaControl
+from .Tools.ResultCache import CacheKey, hardness_key
+from .Tools.common import process_pool
 
 _log = logging.getLogger(__name__)
 
 
-def _contact_calculation(system, offset=None, external_force=None, history=None, pentol=None, maxiter=None,
-                         optimizer_kwargs={}):
+class ContactStep(object):
+    """
+    Result of a single step of a contact mechanics calculation. Scalar
+    results are available immediately, spatially resolved fields are
+    computed on first access (and only if accessed).
+
+    Attributes
+    ----------
+    index : int
+        Number of the step.
+    mean_displacement : float
+        Displacement (offset) of the rigid surface.
+    mean_gap : float
+        Mean gap between the surfaces.
+    mean_pressure : float
+        Mean pressure.
+    total_contact_area : float
+        Fractional contact area.
+    converged : bool
+        Whether the calculation converged.
+    """
+
+    def __init__(self, index, mean_displacement, mean_gap, mean_pressure, total_contact_area, converged,
+                 displacements, forces, heights, area_per_pt):
+        self.index = index
+        self.mean_displacement = mean_displacement
+        self.mean_gap = mean_gap
+        self.mean_pressure = mean_pressure
+        self.total_contact_area = total_contact_area
+        self.converged = converged
+        self._displacements = displacements
+        self._forces = forces
+        self._heights = heights
+        self._area_per_pt = area_per_pt
+        # Fields derived from the above, computed on first access
+        self._pressure = self._gap = self._contact = None
+
+    def __repr__(self):
+        return f'ContactStep(index={self.index}, mean_displacement={self.mean_displacement}, ' \
+               f'mean_pressure={self.mean_pressure}, total_contact_area={self.total_contact_area})'
+
+    @property
+    def displacement(self):
+        """Displacement field of the substrate surface"""
+        return self._displacements[:self._forces.shape[0], :self._forces.shape[1]]
+
+    @property
+    def pressure(self):
+        """Pressure field"""
+        if self._pressure is None:
+            self._pressure = self._forces / self._area_per_pt
+        return self._pressure
+
+    @property
+    def gap(self):
+        """Gap between the surfaces"""
+        if self._gap is None:
+            gap = self.displacement - self._heights - self.mean_displacement
+            gap[gap < 0.0] = 0.0
+            self._gap = gap
+        return self._gap
+
+    @property
+    def contact(self):
+        """Mask of the contacting points"""
+        if self._contact is None:
+            self._contact = self._forces > 0
+        return self._contact
+
+
+def _contact_calculation(system, offset=None, external_force=None, contact_area=None, history=None, pentol=None,
+                         maxiter=None, optimizer_kwargs={}, area_control=None):
     """
     Run a full contact calculation at a given external load.
 
@@ -48,96 +125,91 @@ def _contact_calculation(system, offset=None, external_force=None, history=None,
         Offset between the two surfaces. (Default: None)
     external_force : float, optional
         The force pushing the surfaces together. (Default: None)
+    contact_area : float, optional
+        Target fractional contact area. (Default: None)
     history : tuple
         History returned by past calls to next_step
+    optimizer_kwargs : dict, optional
+        Optional arguments passed on to the optimizer. (Default: {})
+    area_control : :obj:`ContactMechanics.Tools.AreaControl.ContactAreaControl`, optional
+        Records all calculations and solves for target contact areas.
+        (Default: None)
 
     Returns
     -------
-    displacements : numpy.ndarray
-        Current surface displacement field.
-    forces : numpy.ndarray
-        Current surface pressure field.
-    displacement : float
-        Current displacement of the rigid surface
-    load : float
-        Current load.
-    area : float
-        Current fractional contact area.
+    step : ContactStep
+        Result of the contact calculation.
     history : tuple
         History of contact calculations.
-    optimizer_kwargs : dict, optional
-        Optional arguments passed on to the optimizer. (Default: {})
     """
 
     topography = system.surface
     substrate = system.substrate
 
-    # Get the profile as a numpy array
-    heights = topography.heights()
-
-    # Find max, min and mean heights
-    middle = np.mean(heights)
+    # Mean height before the calculation
+    middle = np.mean(topography.heights())
 
     if history is None:
-        mean_displacements = []
-        mean_gaps = []
-        mean_pressures = []
-        total_contact_areas = []
-        converged = np.array([], dtype=bool)
-    if history is not None:
-        mean_displacements, mean_gaps, mean_pressures, total_contact_areas, converged = history
-
-    opt = system.minimize_proxy(offset=offset, external_force=external_force, pentol=pentol, maxiter=maxiter,
-                                **optimizer_kwargs)
+        history = [], [], [], [], []
+    mean_displacements, mean_gaps, mean_pressures, total_contact_areas, converged = history
+
+    if contact_area is not None:
+        if area_control is None:
+            area_control = ContactAreaControl(system)
+        opt = area_control.minimize_proxy(contact_area=contact_area, pentol=pentol, maxiter=maxiter,
+                                          **optimizer_kwargs)
+    else:
+        minimize_proxy = system.minimize_proxy if area_control is None else area_control.minimize_proxy
+        opt = minimize_proxy(offset=offset, external_force=external_force, pentol=pentol, maxiter=maxiter,
+                             **optimizer_kwargs)
     force_xy = opt.jac
     displacement_xy = opt.x[:force_xy.shape[0], :force_xy.shape[1]]
-    mean_displacements = np.append(mean_displacements, [opt.offset])
-    mean_gaps = np.append(mean_gaps, [np.mean(displacement_xy) - middle - opt.offset])
+
+    mean_gap = np.mean(displacement_xy) - middle - opt.offset
     mean_load = force_xy.sum() / np.prod(topography.physical_sizes)
-    mean_pressures = np.append(mean_pressures, [mean_load])
     total_contact_area = (force_xy > 0).sum() / np.prod(topography.nb_grid_pts)
-    total_contact_areas = np.append(total_contact_areas, [total_contact_area])
-    converged = np.append(converged, np.array([opt.success], dtype=bool))
 
-    area_per_pt = substrate.area_per_pt
-    pressure_xy = force_xy / area_per_pt
-    gap_xy = displacement_xy - topography.heights() - opt.offset
-    gap_xy[gap_xy < 0.0] = 0.0
+    step = ContactStep(len(mean_displacements), opt.offset, mean_gap, mean_load, total_contact_area, opt.success,
+                       opt.x, force_xy, topography.heights(), substrate.area_per_pt)
 
-    contacting_points_xy = force_xy > 0
+    # The history grows by appending to lists, i.e. without copying it
+    mean_displacements.append(opt.offset)
+    mean_gaps.append(mean_gap)
+    mean_pressures.append(mean_load)
+    total_contact_areas.append(total_contact_area)
+    converged.append(opt.success)
 
-    return displacement_xy, gap_xy, pressure_xy, contacting_points_xy, opt.offset, mean_load, total_contact_area, \
-        (mean_displacements, mean_gaps, mean_pressures, total_contact_areas, converged)
+    return step, history
 
 
-def _next_contact_step(system, history=None, pentol=None, maxiter=None, optimizer_kwargs={}):
+def _next_contact_step(system, nsteps, history=None, pentol=None, maxiter=None, optimizer_kwargs={},
+                       area_control=None):
     """
-    Run a full contact calculation. Try to guess displacement such that areas
-    are equally spaced on a log scale.
+    Run a full contact calculation. The first two steps bound the range of
+    contact areas: The rigid surface is placed at its mean height and just
+    below its highest point. The remaining steps solve for target contact
+    areas that are equally spaced on a log scale between these bounds.
 
     Parameters
     ----------
     system : ContactMechanics.Systems.SystemBase
         The contact mechanical system.
+    nsteps : int
+        Total number of steps.
     history : tuple
         History returned by past calls to next_step
+    optimizer_kwargs : dict, optional
+        Optional arguments passed on to the optimizer. (Default: {})
+    area_control : :obj:`ContactMechanics.Tools.AreaControl.ContactAreaControl`, optional
+        Solver for target contact areas, which should be shared between
+        the steps. (Default: None)
 
     Returns
     -------
-    displacements : numpy.ndarray
-        Current surface displacement field.
-    forces : numpy.ndarray
-        Current surface pressure field.
-    displacement : float
-        Current displacement of the rigid surface
-    load : float
-        Current load.
-    area : float
-        Current fractional contact area.
+    step : ContactStep
+        Result of the contact calculation.
     history : tuple
         History of contact calculations.
-    optimizer_kwargs : dict, optional
-        Optional arguments passed on to the optimizer. (Default: {})
     """
 
     # Get topography object from contact system
@@ -146,7 +218,8 @@ def _next_contact_step(system, history=None, pentol=None, maxiter=None, optimize
     try:
         # Reset plastic displacement if this is a plastic calculation. We need to do this because the individual steps
         # are not in order, i.e. the contact is not continuously formed or lifted. Each calculation needs to compute
-        # a fresh plastic displacement.
+        # a fresh plastic displacement. Ordered loading histories are handled by
+        # `ContactMechanics.CyclicLoading`.
         topography.plastic_displ = np.zeros_like(topography.plastic_displ)
     except AttributeError:
         pass
@@ -154,10 +227,9 @@ def _next_contact_step(system, history=None, pentol=None, maxiter=None, optimize
     # Get the profile as a numpy array
     heights = topography.heights()
 
-    # Find max, min and mean heights
+    # Find max and mean heights
     top = np.max(heights)
     middle = np.mean(heights)
-    bot = np.min(heights)
 
     if history is None:
         step = 0
@@ -166,168 +238,669 @@ def _next_contact_step(system, history=None, pentol=None, maxiter=None, optimize
         step = len(mean_displacements)
 
     if step == 0:
-        mean_displacement = -middle
+        return _contact_calculation(system, offset=-middle, pentol=pentol, maxiter=maxiter, history=history,
+                                    optimizer_kwargs=optimizer_kwargs, area_control=area_control)
     elif step == 1:
-        mean_displacement = -top + 0.01 * (top - middle)
+        return _contact_calculation(system, offset=-top + 0.01 * (top - middle), pentol=pentol, maxiter=maxiter,
+                                    history=history, optimizer_kwargs=optimizer_kwargs, area_control=area_control)
+
+    # Target areas equally spaced on a log scale (regularized by the area
+    # of a single pixel) between the first two steps
+    pixel_area = 1 / np.prod(topography.nb_grid_pts)
+    log_max_area, log_min_area = np.log(np.array(total_contact_areas[:2]) + pixel_area)
+    contact_area = np.exp(log_min_area + (step - 1) / (nsteps - 1) * (log_max_area - log_min_area)) - pixel_area
+    return _contact_calculation(system, contact_area=contact_area, pentol=pentol, maxiter=maxiter, history=history,
+                                optimizer_kwargs=optimizer_kwargs, area_control=area_control)
+
+
+# Contact system of each worker (process or thread), cached together with
+# the name of the shared memory block holding the heights
+_worker_state = threading.local()
+
+
+def _parallel_contact_step(spec, offset=None, external_force=None, fields=False):
+    """
+    Run a single, independent contact calculation in a worker process. The
+    contact system is built on first use and cached for subsequent steps on
+    the same topography; the heights are mapped from shared memory.
+
+    Parameters
+    ----------
+    spec : dict
+        Description of the contact system (shared memory block, shape,
+        physical sizes, boundary conditions, hardness) and solver parameters.
+    offset : float, optional
+        Offset between the two surfaces. (Default: None)
+    external_force : float, optional
+        The force pushing the surfaces together. (Default: None)
+    fields : bool, optional
+        Return the spatially resolved fields. (Default: False)
+
+    Returns
+    -------
+    scalars : tuple
+        Mean displacement, mean gap, mean pressure, total contact area and
+        convergence of the step.
+    fields : tuple or None
+        Displacement, gap, pressure and contact fields.
+    """
+    name = spec['name']
+    if getattr(_worker_state, 'name', None) == name:
+        system = _worker_state.system
     else:
-        # Intermediate sort by area
-        sorted_disp, sorted_area = np.transpose(
-            sorted(zip(mean_displacements, total_contact_areas), key=lambda x: x[1]))
-
-        ref_area = np.log10(np.array(sorted_area + 1 / np.prod(topography.nb_grid_pts)))
-        darea = np.append(ref_area[1:] - ref_area[:-1], -ref_area[-1])
-        i = np.argmax(darea)
-        if i == step - 1:
-            mean_displacement = bot + 2 * (sorted_disp[-1] - bot)
+        # The system of the last topography is released; its shared memory
+        # is unmapped once the heights are no longer referenced
+        _worker_state.name = _worker_state.shared_memory = _worker_state.system = None
+        from multiprocessing.shared_memory import SharedMemory
+        shared_memory = SharedMemory(name=name)
+        heights = np.ndarray(spec['shape'], dtype=float, buffer=shared_memory.buf)
+        topography = Topography(heights, spec['physical_sizes'], periodic=spec['periodic'])
+        half_space_factory = dict(periodic=PeriodicFFTElasticHalfSpace,
+                                  nonperiodic=FreeFFTElasticHalfSpace)
+        substrate = half_space_factory[spec['substrate']](topography.nb_grid_pts, 1.0, topography.physical_sizes)
+        if spec['hardness'] is None:
+            system = make_system(substrate, topography)
         else:
-            mean_displacement = (sorted_disp[i] + sorted_disp[i + 1]) / 2
+            system = make_plastic_system(substrate, topography, hardness=spec['hardness'])
+        _worker_state.name, _worker_state.shared_memory, _worker_state.system = name, shared_memory, system
 
-    return _contact_calculation(system, offset=mean_displacement, pentol=pentol, maxiter=maxiter, history=history,
-                                optimizer_kwargs=optimizer_kwargs)
+    try:
+        # Steps are independent, each one starts from the undeformed topography
+        system.surface.plastic_displ[...] = 0
+    except AttributeError:
+        pass
 
+    step, history = _contact_calculation(system, offset=offset, external_force=external_force,
+                                         pentol=spec['pentol'], maxiter=spec['maxiter'],
+                                         optimizer_kwargs=spec['optimizer_kwargs'])
+    scalars = step.mean_displacement, step.mean_gap, step.mean_pressure, step.total_contact_area, step.converged
+    if fields:
+        return scalars, (step.displacement, step.gap, step.pressure, step.contact)
+    return scalars, None
 
-def contact_mechanics(self, substrate=None, nsteps=None, offsets=None, pressures=None, hardness=None, maxiter=100,
-                      results_callback=None, optimizer_kwargs={}):
+
+def _parallel_contact_mechanics(topography, substrate, offsets, external_forces, hardness, pentol, maxiter,
+                                report, optimizer_kwargs, nb_workers, executor):
     """
-    Carry out an automated contact mechanics calculations. The pipeline
-    function return thermodynamic data (averages over the contact area,
-    e.g. the total force or the total area). Spatially resolved data
-    (pressure maps, displacement maps, etc.) are passed to the callback
-    function. If this data is reqired, the callback function needs to take
-    care of analyzing or storing it.
+    Run independent contact calculations on a pool of processes. The heights
+    are placed in shared memory that all workers map. Results are collected
+    (and reported, see `_make_report`) in the order of the steps.
+    """
+    # Shared memory is only available from Python 3.8 on
+    from multiprocessing.shared_memory import SharedMemory
+    heights = np.ascontiguousarray(topography.heights(), dtype=float)
+    shared_memory = SharedMemory(create=True, size=max(heights.nbytes, 1))
+    own_executor = executor is None
+    if own_executor:
+        executor = process_pool(nb_workers)
+    futures = []
+    try:
+        np.ndarray(heights.shape, dtype=float, buffer=shared_memory.buf)[...] = heights
+        spec = dict(name=shared_memory.name, shape=heights.shape, physical_sizes=topography.physical_sizes,
+                    periodic=topography.is_periodic, substrate=substrate, hardness=hardness, pentol=pentol,
+                    maxiter=maxiter, optimizer_kwargs=optimizer_kwargs)
+        fields = report is not None
+        if offsets is not None:
+            futures = [executor.submit(_parallel_contact_step, spec, offset=offset, fields=fields)
+                       for offset in offsets]
+        else:
+            futures = [executor.submit(_parallel_contact_step, spec, external_force=external_force, fields=fields)
+                       for external_force in external_forces]
+
+        results = []
+        for future in futures:
+            scalars, step_fields = future.result()
+            results += [scalars]
+            if fields:
+                report(*step_fields, *scalars)
+    finally:
+        # Steps that have not started are dropped if one of them failed
+        for future in futures:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+        shared_memory.close()
+        shared_memory.unlink()
+
+    mean_displacement, mean_gap, mean_pressure, total_contact_area, converged = \
+        [np.array(values) for values in zip(*results)]
+    return mean_pressure, total_contact_area, mean_displacement, mean_gap, converged.astype(bool)
+
+
+def check_contact_mechanics_arguments(topography, substrate, nsteps, offsets, pressures, contact_areas=None):
+    """
+    Check the specification of the steps of a contact mechanics calculation
+    and choose the substrate from the periodicity of the topography, if not
+    given. Exactly one of `nsteps`, `offsets`, `pressures` and
+    `contact_areas` must be given.
 
     Parameters
     ----------
-    self : :obj:`SurfaceTopography.UniformTopographyInterface`
+    topography : :obj:`SurfaceTopography.UniformTopographyInterface`
         Topography on which to carry out the contact calculation.
-    substrate : str, optional
-        Specifies whether substrate should be 'periodic' or 'nonperiodic'. If
-        set to None, it will be chosen according to whether the topography is
-        periodic or nonperiodic.
-        (Default: None)
-    nsteps : int, optional
-        Number of contact steps. (Default: 10)
-    offsets : list of floats, optional
-        List with offsets. Can only be set if `nsteps` and `pressures` is
-        set to None. (Default: None)
-    pressures : list of floats, optional
-        List with pressures in units of E*. Can only be set if `nsteps` and
-        `offsets` is set to None. (Default: None)
-    hardness : float, optional
-        Hardness in units of E*. Calculation is fully elastic if set to None.
-        (Default: None)
-    maxiter : int, optional
-        Maximum number of interations. (Default: 100)
-    results_callback : func, optional
-        Callback function receiving displacement, pressure, etc. fields.
-        (Default: None)
-    optimizer_kwargs : dict, optional
-        Optional arguments passed on to the optimizer. (Default: {})
+    substrate : str or :obj:`ContactMechanics.Substrates.ElasticSubstrate`
+        'periodic', 'nonperiodic', an elastic half space or None.
+    nsteps : int
+        Number of automatic contact steps, or None.
+    offsets : list of floats
+        Offsets, or None.
+    pressures : list of floats
+        Pressures, or None.
+    contact_areas : list of floats, optional
+        Target fractional contact areas, or None. (Default: None)
 
     Returns
     -------
-    mean_pressure : np.ndarray
-        Array with mean pressure for each calculation step.
-    total_contact_area : np.ndarray
-        Array with total area for each calculation step.
-    mean_displacement : np.ndarray
-        Array with mean displacement for each calculation step.
-    mean_gap : np.ndarray
-        Array with mean gap for each calculation step.
-    converged : np.ndarray
-        Convergence information for each calculation step. Unconverged
-        results are still returned but should be interpreted with care.
+    substrate : str or :obj:`ContactMechanics.Substrates.ElasticSubstrate`
+        'periodic' or 'nonperiodic' if no substrate or a string was given,
+        otherwise the elastic half space.
     """
-
     #
     # Choose substrate from 'is_periodic' flag, if not given
     #
     if substrate is None:
-        substrate = 'periodic' if self.is_periodic else 'nonperiodic'
+        substrate = 'periodic' if topography.is_periodic else 'nonperiodic'
 
-    if self.is_periodic != (substrate == 'periodic'):
+    periodic = substrate == 'periodic' if isinstance(substrate, str) else substrate.is_periodic()
+    if topography.is_periodic != periodic:
         alert_message = 'Topography is '
-        if self.is_periodic:
+        if topography.is_periodic:
             alert_message += 'periodic, but the analysis is configured for free boundaries.'
         else:
             alert_message += 'not periodic, but the analysis is configured for periodic boundaries.'
         _log.warning(alert_message)
 
     #
-    # Check whether either pressures or nsteps is given, but not both
+    # Check that exactly one of nsteps, offsets, pressures and contact areas is given
     #
-    if (nsteps is None) and (offsets is None) and (pressures is None):
-        raise ValueError("Either `nsteps`, `offsets` or `pressures` must be given for a contact mechanics calculation.")
-    elif (nsteps is not None) and (offsets is not None) and (pressures is not None):
-        raise ValueError("All of `nsteps`, `offsets` and `pressures` are given. There can only be one.")
-    elif (nsteps is not None) and (offsets is not None):
-        raise ValueError("Both of `nsteps` and `offsets` are given. Please specify only one.")
-    elif (nsteps is not None) and (pressures is not None):
-        raise ValueError("Both of `nsteps` and `pressures` are given. Please specify only one.")
-    elif (offsets is not None) and (pressures is not None):
-        raise ValueError("Both of `offsets` and `pressures` are given. Please specify only one.")
+    given = [f'`{name}`' for name, value in [('nsteps', nsteps), ('offsets', offsets), ('pressures', pressures),
+                                             ('contact_areas', contact_areas)] if value is not None]
+    if len(given) == 0:
+        raise ValueError("Either `nsteps`, `offsets`, `pressures` or `contact_areas` must be given for a contact "
+                         "mechanics calculation.")
+    elif len(given) > 1:
+        raise ValueError(f"{', '.join(given[:-1])} and {given[-1]} are given. Please specify only one.")
 
-    # Conversion of force units
-    force_conv = np.prod(self.physical_sizes)
+    return substrate
 
-    #
-    # Some constants
-    #
+
+def _penetration_tolerance(topography):
+    """
+    Heuristics for the possible tolerance on penetration. This is necessary
+    because numbers can vary greatly depending on the system of units.
+    """
     min_pentol = 1e-12  # lower bound for the penetration tolerance
+    rms_height = topography.rms_height_from_area()
+    pentol = rms_height / (10 * np.mean(topography.nb_grid_pts))
+    return max(pentol, min_pentol)
 
-    if (hardness is not None) and (hardness > 0):
-        topography = PlasticTopography(self, hardness)
-    else:
-        topography = self
+
+def _is_plastic(hardness):
+    """
+    Per-pixel hardness maps are always plastic, a scalar hardness only if it
+    is positive
+    """
+    return (hardness is not None) and (np.ndim(hardness) > 0 or hardness > 0)
+
+
+def _contact_mechanics_steps(topography, substrate, nsteps, offsets, pressures, hardness, maxiter,
+                             optimizer_kwargs, continuation, contact_areas=None):
+    """
+    Generator running the steps of a contact mechanics calculation. The
+    substrate is either 'periodic' or 'nonperiodic', or an elastic half
+    space (of unit contact modulus) that is reused.
+    """
+    # Conversion of force units
+    force_conv = np.prod(topography.physical_sizes)
+
+    pentol = _penetration_tolerance(topography)
 
     half_space_factory = dict(periodic=PeriodicFFTElasticHalfSpace,
                               nonperiodic=FreeFFTElasticHalfSpace)
 
     half_space_kwargs = {}
 
-    substrate = half_space_factory[substrate](topography.nb_grid_pts, 1.0, topography.physical_sizes,
-                                              **half_space_kwargs)
+    if isinstance(substrate, str):
+        substrate = half_space_factory[substrate](topography.nb_grid_pts, 1.0, topography.physical_sizes,
+                                                  **half_space_kwargs)
 
-    if (hardness is not None) and (hardness > 0):
-        system = make_plastic_system(substrate, topography)
+    if _is_plastic(hardness):
+        system = make_plastic_system(substrate, topography, hardness=hardness)
     else:
         system = make_system(substrate, topography)
 
-    # Heuristics for the possible tolerance on penetration.
-    # This is necessary because numbers can vary greatly
-    # depending on the system of units.
-    rms_height = topography.rms_height_from_area()
-    pentol = rms_height / (10 * np.mean(topography.nb_grid_pts))
-    pentol = max(pentol, min_pentol)
-
     if pressures is not None:
         nsteps = len(pressures)
     if offsets is not None:
         nsteps = len(offsets)
+    if contact_areas is not None:
+        nsteps = len(contact_areas)
+
+    # Target contact areas are found from all previous calculations
+    area_control = ContactAreaControl(system)
 
     history = None
     for i in range(nsteps):
+        step_pentol = pentol
+        step_kwargs = optimizer_kwargs
+        if continuation is not None:
+            tolerances = continuation.tolerances(i, nsteps, pentol,
+                                                 forcetol=optimizer_kwargs.get('forcetol', 1e-5),
+                                                 thermotol=optimizer_kwargs.get('thermotol', 1e-6))
+            step_pentol = tolerances.pop('pentol')
+            step_kwargs = {**optimizer_kwargs, **tolerances}
+            # Seed the calculation with the solution of the last step
+            if system.disp is not None:
+                step_kwargs['initial_displacements'] = system.disp
+
         if offsets is not None:
-            displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure, \
-                total_contact_area, history = _contact_calculation(
-                    system, offset=offsets[i], history=history, pentol=pentol, maxiter=maxiter,
-                    optimizer_kwargs=optimizer_kwargs)
+            step, history = _contact_calculation(
+                system, offset=offsets[i], history=history, pentol=step_pentol, maxiter=maxiter,
+                optimizer_kwargs=step_kwargs)
         elif pressures is not None:
-            displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure, \
-                total_contact_area, history = _contact_calculation(
-                    system, external_force=pressures[i] * force_conv, history=history, pentol=pentol, maxiter=maxiter,
-                    optimizer_kwargs=optimizer_kwargs)
+            step, history = _contact_calculation(
+                system, external_force=pressures[i] * force_conv, history=history, pentol=step_pentol,
+                maxiter=maxiter, optimizer_kwargs=step_kwargs)
+        elif contact_areas is not None:
+            step, history = _contact_calculation(
+                system, contact_area=contact_areas[i], history=history, pentol=step_pentol, maxiter=maxiter,
+                optimizer_kwargs=step_kwargs, area_control=area_control)
         else:
-            displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure, \
-                total_contact_area, history = _next_contact_step(
-                    system, history=history, pentol=pentol, maxiter=maxiter, optimizer_kwargs=optimizer_kwargs)
+            step, history = _next_contact_step(
+                system, nsteps, history=history, pentol=step_pentol, maxiter=maxiter, optimizer_kwargs=step_kwargs,
+                area_control=area_control)
+        if continuation is not None:
+            continuation.record(i, step.converged)
+        yield step
+
+
+def contact_mechanics_steps(self, substrate=None, nsteps=None, offsets=None, pressures=None, hardness=None,
+                            maxiter=100, optimizer_kwargs={}, continuation=None, contact_areas=None):
+    """
+    Carry out an automated contact mechanics calculation step by step. This
+    is an iterator that yields the result of each step as soon as it has
+    been computed, such that analysis or storage of the results can proceed
+    while later steps are computed. Spatially resolved fields of a step are
+    only computed when accessed.
+
+    Parameters
+    ----------
+    self : :obj:`SurfaceTopography.UniformTopographyInterface`
+        Topography on which to carry out the contact calculation.
+    substrate : str or :obj:`ContactMechanics.Substrates.ElasticSubstrate`, optional
+        Specifies whether substrate should be 'periodic' or 'nonperiodic'. If
+        set to None, it will be chosen according to whether the topography is
+        periodic or nonperiodic. An elastic half space (of unit contact
+        modulus and the grid of the topography) can be given instead, which
+        is then reused, e.g. for many topographies of the same size.
+        (Default: None)
+    nsteps : int, optional
+        Number of contact steps. (Default: 10)
+    offsets : list of floats, optional
+        List with offsets. Can only be set if `nsteps` and `pressures` is
+        set to None. (Default: None)
+    pressures : list of floats, optional
+        List with pressures in units of E*. Can only be set if `nsteps` and
+        `offsets` is set to None. (Default: None)
+    hardness : float or array_like, optional
+        Hardness in units of E*, see `contact_mechanics`. (Default: None)
+    maxiter : int, optional
+        Maximum number of interations. (Default: 100)
+    optimizer_kwargs : dict, optional
+        Optional arguments passed on to the optimizer. (Default: {})
+    continuation : :obj:`ContactMechanics.Tools.Continuation.ToleranceContinuation`, optional
+        Tolerance schedule for the individual steps, see
+        `contact_mechanics`. (Default: None)
+    contact_areas : list of floats, optional
+        List with target fractional contact areas, see
+        `contact_mechanics`. (Default: None)
+
+    Returns
+    -------
+    steps : iterator of :obj:`ContactStep`
+        Results of the individual steps.
+
+    Example
+    -------
+    >>> for step in topography.contact_mechanics_steps(pressures=np.logspace(-3, -1, 10)):
+    ...     print(step.mean_pressure, step.total_contact_area, step.pressure.max())
+    """
+    substrate = check_contact_mechanics_arguments(self, substrate, nsteps, offsets, pressures, contact_areas)
+    return _contact_mechanics_steps(self, substrate, nsteps, offsets, pressures, hardness, maxiter,
+                                    optimizer_kwargs, continuation, contact_areas)
+
 
-        # Report results via callback
+class _StepOutput(object):
+    """
+    Write every step of a contact mechanics calculation to a NetCDF
+    container as soon as it has been computed. Scalar results are stored
+    as series over frames, fields as one frame per step.
+    """
+
+    field_names = 'displacement', 'gap', 'pressure', 'contact'
+
+    def __init__(self, output, topography, fields, storage=None):
+        unknown_fields = set(fields) - set(self.field_names)
+        if len(unknown_fields) > 0:
+            raise ValueError(f'Unknown output fields: {", ".join(sorted(unknown_fields))}')
+        self.fields = fields
+        self._own_container = isinstance(output, (str, os.PathLike))
+        if self._own_container:
+            from .IO.NetCDF import NetCDFContainer
+            output = NetCDFContainer(os.fspath(output), mode='w', double=True, storage=storage)
+        elif storage is not None:
+            raise ValueError('The storage of an existing container is set with its `set_storage` method.')
+        self.container = output
+        output.set_shape(topography.nb_grid_pts)
+        if self._own_container:
+            output.set_rigid_surface(topography.heights())
+
+    def __call__(self, displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_gap,
+                 mean_pressure, total_contact_area, converged):
+        frame = self.container.get_next_frame()
+        frame.mean_displacement = float(mean_displacement)
+        frame.mean_gap = float(mean_gap)
+        frame.mean_pressure = float(mean_pressure)
+        frame.total_contact_area = float(total_contact_area)
+        frame.converged = int(converged)
+        values = dict(displacement=displacement_xy, gap=gap_xy, pressure=pressure_xy, contact=contacting_points_xy)
+        for name in self.fields:
+            frame[name] = values[name]
+        self.container.sync()
+
+    def close(self):
+        """Close the container if it was opened for this calculation"""
+        if self._own_container:
+            self.container.close()
+
+
+def _make_report(results_callback, output):
+    """
+    Combine the results callback and the output into a single function that
+    receives the fields and all scalar results of a step
+    """
+    if results_callback is None and output is None:
+        return None
+
+    def report(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_gap,
+               mean_pressure, total_contact_area, converged):
+        if output is not None:
+            output(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_gap,
+                   mean_pressure, total_contact_area, converged)
         if results_callback is not None:
             results_callback(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement,
                              mean_pressure, total_contact_area)
 
-    mean_displacement, mean_gap, mean_pressure, total_contact_area, converged = history
+    return report
+
+
+# Scalar results of a step stored in a result cache, in the order in which
+# they are returned by `contact_mechanics`
+_cached_scalars = 'mean_pressure', 'total_contact_area', 'mean_displacement', 'mean_gap', 'converged'
+
+
+def _cached_contact_mechanics(topography, cache, substrate, nsteps, offsets, pressures, hardness, maxiter,
+                              report, optimizer_kwargs, nb_workers, executor, contact_areas):
+    """
+    Serve the steps of a contact mechanics calculation from a result cache
+    and compute (and store) only the missing steps. Steps that are
+    independent of each other (elastic steps at given offsets or pressures,
+    or any steps on a process pool) are stored individually, such that
+    overlapping step sequences share entries. Steps that depend on the
+    previous ones are stored under a key that includes all previous steps.
+    """
+    from ContactMechanics import __version__
+
+    if topography.is_domain_decomposed:
+        raise ValueError("Caching of results requires a topography that is not domain decomposed.")
+
+    parallel = nb_workers is not None or executor is not None
+    plastic = _is_plastic(hardness)
+    if nsteps is not None:
+        # The target areas of the steps depend on the total number of steps
+        control, values = ('nsteps', nsteps), list(range(nsteps))
+    elif offsets is not None:
+        control, values = 'offsets', list(offsets)
+    elif pressures is not None:
+        control, values = 'pressures', list(pressures)
+    else:
+        control, values = 'contact_areas', list(contact_areas)
+
+    # Plastic steps on a process pool start from the undeformed topography,
+    # sequential plastic steps from the plastic displacements of the
+    # previous step. Offsets for target contact areas are found from the
+    # previous steps.
+    independent = nsteps is None and contact_areas is None and (not plastic or parallel)
+    key = CacheKey(__version__, np.asarray(topography.heights(), dtype=float), topography.physical_sizes,
+                   substrate, hardness_key(hardness), plastic and parallel, maxiter, optimizer_kwargs, control)
+    if independent:
+        keys = [key.copy().update(value).hexdigest() for value in values]
+    else:
+        keys = [key.update(value).hexdigest() for value in values]
+
+    fields = report is not None
+    entries = [cache.get(k) for k in keys]
+    missing = [i for i, entry in enumerate(entries) if entry is None or (fields and 'pressure' not in entry)]
+    if not independent and len(missing) > 0:
+        missing = list(range(len(values)))
+
+    if len(missing) > 0:
+        computed_fields = []
+
+        def record(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure,
+                   total_contact_area):
+            computed_fields.append(dict(displacement=displacement_xy, gap=gap_xy, pressure=pressure_xy,
+                                        contact=contacting_points_xy))
+
+        steps = {'nsteps': len(missing)} if nsteps is not None else {control: [values[i] for i in missing]}
+        results = contact_mechanics(topography, substrate=substrate, hardness=hardness, maxiter=maxiter,
+                                    results_callback=record if fields else None, optimizer_kwargs=optimizer_kwargs,
+                                    nb_workers=nb_workers, executor=executor, **steps)
+        for j, i in enumerate(missing):
+            entry = dict(zip(_cached_scalars, (values[j] for values in results)))
+            if fields:
+                entry.update(computed_fields[j])
+            cache.put(keys[i], entry)
+            entries[i] = entry
+
+    if fields:
+        for entry in entries:
+            report(entry['displacement'], entry['gap'], entry['pressure'], entry['contact'],
+                   float(entry['mean_displacement']), float(entry['mean_gap']), float(entry['mean_pressure']),
+                   float(entry['total_contact_area']), bool(entry['converged']))
+
+    mean_pressure, total_contact_area, mean_displacement, mean_gap, converged = \
+        [np.array([entry[name] for entry in entries]) for name in _cached_scalars]
+    return mean_pressure, total_contact_area, mean_displacement, mean_gap, converged.astype(bool)
+
+
+def contact_mechanics(self, substrate=None, nsteps=None, offsets=None, pressures=None, hardness=None, maxiter=100,
+                      results_callback=None, optimizer_kwargs={}, continuation=None, nb_workers=None,
+                      executor=None, cache=None, contact_areas=None, output=None,
+                      output_fields=('displacement', 'gap', 'pressure'), output_storage=None):
+    """
+    Carry out an automated contact mechanics calculations. The pipeline
+    function return thermodynamic data (averages over the contact area,
+    e.g. the total force or the total area). Spatially resolved data
+    (pressure maps, displacement maps, etc.) are passed to the callback
+    function. If this data is reqired, the callback function needs to take
+    care of analyzing or storing it.
+
+    Steps are solved one after another. Elastic load-area curves of small
+    topographies (up to about 64 x 64 grid points) are computed faster with
+    :func:`ContactMechanics.Optimization.lockstep_constrained_conjugate_gradients`.
+
+    Parameters
+    ----------
+    self : :obj:`SurfaceTopography.UniformTopographyInterface`
+        Topography on which to carry out the contact calculation.
+    substrate : str, optional
+        Specifies whether substrate should be 'periodic' or 'nonperiodic'. If
+        set to None, it will be chosen according to whether the topography is
+        periodic or nonperiodic.
+        (Default: None)
+    nsteps : int, optional
+        Number of contact steps. The first two steps place the rigid
+        surface at its mean height and just below its highest point; the
+        remaining steps solve for contact areas that are equally spaced on a
+        log scale between the areas of the first two steps. (Default: 10)
+    offsets : list of floats, optional
+        List with offsets. Can only be set if `nsteps` and `pressures` is
+        set to None. (Default: None)
+    pressures : list of floats, optional
+        List with pressures in units of E*. Can only be set if `nsteps` and
+        `offsets` is set to None. (Default: None)
+    hardness : float or array_like, optional
+        Hardness in units of E*. Per-pixel hardness maps can be given as
+        arrays or as
+        :obj:`ContactMechanics.PlasticSystemSpecialisations.PhaseHardness`.
+        Calculation is fully elastic if set to None. (Default: None)
+    maxiter : int, optional
+        Maximum number of interations. (Default: 100)
+    results_callback : func, optional
+        Callback function receiving displacement, pressure, etc. fields.
+        (Default: None)
+    optimizer_kwargs : dict, optional
+        Optional arguments passed on to the optimizer. (Default: {})
+    continuation : :obj:`ContactMechanics.Tools.Continuation.ToleranceContinuation`, optional
+        Tolerance schedule for the individual steps. If given, each step is
+        initialized with the solution of the previous step and steps that
+        are not requested as outputs are solved to loose tolerances. Which
+        steps reached the final tolerances is recorded in the continuation
+        object. (Default: None)
+    nb_workers : int, optional
+        Number of worker processes. If given, the steps (which need to be
+        specified by `offsets` or `pressures`) are solved as independent
+        calculations on a process pool. Each worker keeps its own substrate
+        and maps the heights from shared memory. Plastic steps start from the
+        undeformed topography rather than from the plastic displacements of
+        the previous step. Results are identical for any number of workers
+        and are reported in order. Workers are started from a fresh
+        interpreter, i.e. scripts need an `if __name__ == '__main__':`
+        guard. Requires Python 3.8 or later. (Default: None)
+    executor : :obj:`concurrent.futures.Executor`, optional
+        Executor (on the local machine) that runs the independent steps
+        instead of a process pool created for this call. (Default: None)
+    cache : :obj:`ContactMechanics.Tools.ResultCache.ResultCache`, optional
+        Cache for the results of the individual steps, keyed by a hash of
+        the heights, physical sizes, substrate, hardness, step
+        specification and solver parameters. Only steps that are not found
+        in the cache are computed. Independent steps (elastic steps at given
+        offsets or pressures, or steps on a process pool) are reused by any
+        calculation that contains them. If a `results_callback` is given,
+        fields are stored as well. Cannot be combined with a
+        `continuation`. (Default: None)
+    contact_areas : list of floats, optional
+        List with target fractional contact areas. The offsets are found by
+        secant updates from all previous calculations (see
+        :obj:`ContactMechanics.Tools.AreaControl.ContactAreaControl`), the
+        contact areas are reached within 5%. Can only be set if `nsteps`,
+        `offsets` and `pressures` are set to None. (Default: None)
+    output : str or :obj:`ContactMechanics.IO.NetCDF.NetCDFContainer`, optional
+        NetCDF file (that is created) or container (that is appended to)
+        receiving a frame per step. Each step is written to disk as soon as
+        it has been computed. Frames contain the scalar results
+        `mean_displacement`, `mean_gap`, `mean_pressure`,
+        `total_contact_area` and `converged`, and the fields given by
+        `output_fields`. (Default: None)
+    output_fields : tuple of str, optional
+        Fields written to the output for every step. Possible values are
+        'displacement', 'gap', 'pressure' and 'contact'. The contact map is
+        stored as bytes and read back as a boolean array by
+        :obj:`ContactMechanics.IO.NetCDF.NetCDFContainer`.
+        (Default: ('displacement', 'gap', 'pressure'))
+    output_storage : dict, optional
+        Chunking and compression of the fields of an output file, e.g.
+        `dict(complevel=4, significant_digits=6)`. See
+        :obj:`ContactMechanics.IO.NetCDF.NetCDFContainer.set_storage` for
+        the options. Fields are always chunked frame by frame. Can only be
+        given if `output` is a file name. (Default: None)
+
+    Returns
+    -------
+    mean_pressure : np.ndarray
+        Array with mean pressure for each calculation step.
+    total_contact_area : np.ndarray
+        Array with total area for each calculation step.
+    mean_displacement : np.ndarray
+        Array with mean displacement for each calculation step.
+    mean_gap : np.ndarray
+        Array with mean gap for each calculation step.
+    converged : np.ndarray
+        Convergence information for each calculation step. Unconverged
+        results are still returned but should be interpreted with care.
+    """
+
+    substrate = check_contact_mechanics_arguments(self, substrate, nsteps, offsets, pressures, contact_areas)
+
+    parallel = nb_workers is not None or executor is not None
+    if parallel:
+        if nb_workers is not None and executor is not None:
+            raise ValueError("Both of `nb_workers` and `executor` are given. Please specify only one.")
+        if nsteps is not None or contact_areas is not None:
+            raise ValueError("Parallel execution requires `offsets` or `pressures`; the steps chosen for `nsteps` "
+                             "or `contact_areas` depend on the previous steps.")
+        if continuation is not None:
+            raise ValueError("Parallel execution cannot be combined with a `continuation`, which seeds each step "
+                             "with the previous one.")
+        if self.is_domain_decomposed:
+            raise ValueError("Parallel execution on a process pool requires a topography that is not domain "
+                             "decomposed.")
+
+    if cache is not None and continuation is not None:
+        raise ValueError("Caching of results cannot be combined with a `continuation`, which records the "
+                         "tolerances of the steps that are computed.")
+
+    if output is not None:
+        output = _StepOutput(output, self, output_fields, output_storage)
+    try:
+        return _run_contact_mechanics(self, substrate, nsteps, offsets, pressures, hardness, maxiter,
+                                      _make_report(results_callback, output), optimizer_kwargs, continuation,
+                                      nb_workers, executor, cache, contact_areas)
+    finally:
+        if output is not None:
+            output.close()
+
+
+def _run_contact_mechanics(self, substrate, nsteps, offsets, pressures, hardness, maxiter, report, optimizer_kwargs,
+                           continuation, nb_workers, executor, cache, contact_areas):
+    """Run a checked contact mechanics calculation on the appropriate path"""
+    parallel = nb_workers is not None or executor is not None
+    if cache is not None:
+        # Cached steps are not computed in sequence, a continuation cannot be
+        # applied to them
+        if continuation is not None:
+            raise ValueError("Caching of results cannot be combined with a `continuation`.")
+        return _cached_contact_mechanics(self, cache, substrate, nsteps, offsets, pressures, hardness, maxiter,
+                                         report, optimizer_kwargs, nb_workers, executor, contact_areas)
+
+    if parallel:
+        plastic = _is_plastic(hardness)
+        if plastic and np.ndim(hardness) > 0 and not isinstance(hardness, PhaseHardness):
+            # Hardness maps are sent to the workers in compact form
+            hardness = PhaseHardness.from_array(hardness)
+        external_forces = None if pressures is None else np.asarray(pressures) * np.prod(self.physical_sizes)
+        return _parallel_contact_mechanics(
+            self, substrate, offsets, external_forces, hardness if plastic else None, _penetration_tolerance(self),
+            maxiter, report, optimizer_kwargs, nb_workers, executor)
+
+    mean_pressure = []
+    total_contact_area = []
+    mean_displacement = []
+    mean_gap = []
+    converged = []
+    for step in _contact_mechanics_steps(self, substrate, nsteps, offsets, pressures, hardness, maxiter,
+                                         optimizer_kwargs, continuation, contact_areas):
+        mean_pressure.append(step.mean_pressure)
+        total_contact_area.append(step.total_contact_area)
+        mean_displacement.append(step.mean_displacement)
+        mean_gap.append(step.mean_gap)
+        converged.append(step.converged)
+
+        # Report results via callback and output
+        if report is not None:
+            report(step.displacement, step.gap, step.pressure, step.contact, step.mean_displacement, step.mean_gap,
+                   step.mean_pressure, step.total_contact_area, step.converged)
 
     mean_pressure = np.array(mean_pressure)
     total_contact_area = np.array(total_contact_area)
@@ -340,3 +913,4 @@ def contact_mechanics(self, substrate=None, nsteps=None, offsets=None, pressures
 
 # Register analysis functions from this module
 UniformTopographyInterface.register_function('contact_mechanics', contact_mechanics)
+UniformTopographyInterface.register_function('contact_mechanics_steps', contact_mechanics_steps)
@@ -27,6 +27,8 @@
 implements plastic mapping algorithms for contact systems
 """
 
+import copy
+
 import numpy as np
 
 import ContactMechanics
@@ -34,9 +36,98 @@ import SurfaceTopography
 from ContactMechanics.Systems import NonSmoothContactSystem
 
 
+class PhaseHardness(object):
+    """
+    Per-pixel hardness of a multi-phase material. The hardness map is stored
+    compactly as an array of phase indices (of the smallest sufficient
+    integer type) and a lookup table with the hardness of each phase.
+
+    The object behaves like a (read-only) array of hardnesses where
+    required: `numpy.asarray` expands the map to floating point values, and
+    multiplication with a scalar (e.g. conversion to force units) scales the
+    lookup table only.
+
+    Example
+    -------
+    >>> hardness = PhaseHardness(grains, [1.2, 3.5])
+    >>> system = make_plastic_system(substrate, topography, hardness=hardness)
+    """
+
+    def __init__(self, phases, values):
+        """
+        Parameters
+        ----------
+        phases : array_like of int
+            Phase index of each pixel of the local subdomain.
+        values : array_like of float
+            Hardness of each phase.
+        """
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 1 or len(values) == 0:
+            raise ValueError('The hardness of the phases must be given as a one-dimensional array.')
+        phases = np.asarray(phases)
+        if not np.issubdtype(phases.dtype, np.integer):
+            raise ValueError('Phase indices must be integers.')
+        if phases.size > 0 and (phases.min() < 0 or phases.max() >= len(values)):
+            raise ValueError(f'Phase indices must lie between 0 and {len(values) - 1}.')
+        self.phases = phases.astype(np.min_scalar_type(len(values) - 1), copy=False)
+        self.values = values
+
+    @classmethod
+    def from_array(cls, hardness):
+        """
+        Compress a per-pixel hardness array. Each distinct value becomes a
+        phase.
+
+        Parameters
+        ----------
+        hardness : array_like of float
+            Hardness of each pixel of the local subdomain.
+
+        Returns
+        -------
+        hardness : PhaseHardness
+            Compressed hardness map.
+        """
+        hardness = np.asarray(hardness, dtype=float)
+        values, phases = np.unique(hardness, return_inverse=True)
+        return cls(phases.reshape(hardness.shape), values)
+
+    def __repr__(self):
+        return f'PhaseHardness(nb_phases={self.nb_phases}, shape={self.shape})'
+
+    @property
+    def nb_phases(self):
+        """Number of phases"""
+        return len(self.values)
+
+    @property
+    def shape(self):
+        return self.phases.shape
+
+    @property
+    def ndim(self):
+        return self.phases.ndim
+
+    def __array__(self, dtype=None):
+        hardness = self.values[self.phases]
+        return hardness if dtype is None else hardness.astype(dtype, copy=False)
+
+    def __mul__(self, other):
+        if np.ndim(other) != 0:
+            return NotImplemented
+        # The phase indices are shared, only the lookup table is scaled
+        scaled = copy.copy(self)
+        scaled.values = self.values * other
+        return scaled
+
+    __rmul__ = __mul__
+
+
 class PlasticNonSmoothContactSystem(NonSmoothContactSystem):
     """
-    This system implements a simple penetration hardness model.
+    This system implements a simple penetration hardness model. The hardness
+    of the surface is a scalar or a per-pixel :obj:`PhaseHardness`.
     """
 
     @staticmethod
@@ -66,5 +157,9 @@ class PlasticNonSmoothContactSystem(NonSmoothContactSystem):
         hardness = self.surface.hardness * self.surface.area_per_pt
         opt = super().minimize_proxy(hardness=hardness, **kwargs)
         if opt.success:
-            self.surface.plastic_displ += np.where(opt.plastic, self.compute_gap(self.disp, self.offset), 0.)
+            # Only pixels that flow plastically change; the gap is evaluated
+            # on those pixels only
+            plastic = opt.plastic
+            self.surface.plastic_displ[plastic] += \
+                self.disp[self.comp_slice][plastic] - self._heights(self.offset)[plastic]
         return opt
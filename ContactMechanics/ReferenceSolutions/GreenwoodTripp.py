@@ -32,6 +32,8 @@ from scipy.interpolate import interp1d
 from scipy.optimize import brentq
 from scipy.special import ellipe, ellipk
 
+from ..Optimization.AndersonMixing import AndersonMixing
+
 
 # Note on notation in paper and scipy: K(x) = ellipk(x**2), E(x) = ellipe(x**2)
 
@@ -98,7 +100,7 @@ def ξ(s, s1=1e-5, s2=1e5):
 
 
 def GreenwoodTripp(d, μ, rhomax=5, n=100, eps=1e-6, tol=1e-6, mix=0.1,
-                   maxiter=1000):
+                   maxiter=1000, mixing='simple', callback=None):
     """
     Greenwood-Tripp solution for the contact of rough spheres.
     See: Greenwood, Tripp, J. Appl. Mech. 34, 153 (1967)
@@ -123,6 +125,13 @@ def GreenwoodTripp(d, μ, rhomax=5, n=100, eps=1e-6, tol=1e-6, mix=0.1,
         Max difference between displacements in consecutive solutions.
     mix : float
         Mixing of solution between consecutive steps.
+    maxiter : int
+        Maximum number of iterations.
+    mixing : str
+        Mixing scheme. 'simple' mixes consecutive solutions, 'anderson'
+        additionally extrapolates from the previous steps.
+    callback : callable(int iteration, array_like p), optional
+        Called after each iteration.
 
     Returns
     -------
@@ -134,6 +143,13 @@ def GreenwoodTripp(d, μ, rhomax=5, n=100, eps=1e-6, tol=1e-6, mix=0.1,
     rho : array
           Radial coordinate in units of sqrt(2 B σ)
     """
+    if mixing == 'simple':
+        mixer = AndersonMixing(mix, history=0)
+    elif mixing == 'anderson':
+        mixer = AndersonMixing(mix)
+    else:
+        raise ValueError(f"Unknown mixing scheme '{mixing}'. Use either 'simple' or 'anderson'.")
+
     ρ = np.linspace(0, rhomax, n)
     w = np.zeros_like(ρ)
     w0 = 0
@@ -145,7 +161,7 @@ def GreenwoodTripp(d, μ, rhomax=5, n=100, eps=1e-6, tol=1e-6, mix=0.1,
             raise RuntimeError('Maximum number of iterations (={}) '
                                'exceeded.'.format(maxiter))
         pold = p.copy()
-        p = mix * μ * Fn(d + ρ ** 2 + w - w0, 3 / 2) + (1 - mix) * p
+        p = mixer(p, μ * Fn(d + ρ ** 2 + w - w0, 3 / 2))
         pint = interp1d(ρ, p)
         w0 = simps(p, x=ρ)
         w = np.zeros_like(ρ)
@@ -156,5 +172,7 @@ def GreenwoodTripp(d, μ, rhomax=5, n=100, eps=1e-6, tol=1e-6, mix=0.1,
                 ξ = np.linspace(0, (rhomax - eps) / _ρ, n)
                 w[i] = simps(_ρ * pint(_ρ * ξ), x=s(ξ))
         it += 1
+        if callback is not None:
+            callback(it, p)
     p = μ * Fn(d + ρ ** 2 + w - w0, 3 / 2)
     return w - w0, p, ρ
@@ -0,0 +1,226 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Incremental sliding of a rigid topography over an elastic substrate
+"""
+
+import numpy as np
+
+from SurfaceTopography import Topography
+
+from .Systems import NonSmoothContactSystem
+
+
+class SlidingContact(object):
+    """
+    Quasistatic sliding of a rigid topography over a periodic elastic
+    substrate, optionally in contact with a second, stationary topography
+    (the compound height field is the sum of both).
+
+    The spectrum of the moving topography is computed once. Translations
+    (including sub-pixel translations) are applied as Fourier phase shifts
+    in the FFT buffers of the substrate, and the height field of a single
+    contact system is updated in place. Each step is warm-started from the
+    forces of the previous step, which also carry over the active set.
+
+    Example
+    -------
+    >>> sliding = SlidingContact(substrate, moving, stationary)
+    >>> translations = np.stack([np.linspace(0, 1, 1001), np.zeros(1001)], axis=1)
+    >>> normal_forces, contact_areas = sliding.run(translations, offset=0.01, container=container)
+    """
+
+    def __init__(self, substrate, moving_topography, stationary_topography=None):
+        """
+        Parameters
+        ----------
+        substrate : :obj:`ContactMechanics.PeriodicFFTElasticHalfSpace`
+            Periodic elastic substrate.
+        moving_topography : :obj:`SurfaceTopography.Topography`
+            Topography that slides over the substrate. Must be decomposed
+            like the substrate.
+        stationary_topography : :obj:`SurfaceTopography.Topography`, optional
+            Topography that does not move. (Default: None)
+        """
+        if not substrate.is_periodic():
+            raise ValueError('Sliding contact requires a periodic substrate, since translations are applied as '
+                             'Fourier phase shifts.')
+        if substrate.dim != 2:
+            raise ValueError('Sliding contact is only implemented for two-dimensional substrates.')
+        self.substrate = substrate
+        self._pixel_sizes = np.array(substrate.physical_sizes) / np.array(substrate.nb_grid_pts)
+
+        # Spectrum of the moving topography
+        engine = substrate.fftengine
+        substrate.real_buffer.array()[...] = moving_topography.heights()
+        engine.fft(substrate.real_buffer, substrate.fourier_buffer)
+        self._spectrum = substrate.fourier_buffer.array().copy()
+        self._frequencies = engine.fftfreq
+        self._phase_angle = np.empty(self._spectrum.shape)
+        self._phase = np.empty_like(self._spectrum)
+
+        self._stationary_heights = None if stationary_topography is None else stationary_topography.heights()
+
+        # Height field of the compound topography, updated in place. Must be
+        # initialised: Topography copies (masks) arrays that contain NaNs.
+        self._heights = np.zeros(substrate.nb_subdomain_grid_pts)
+        communicator = substrate.communicator
+        if communicator is None or communicator.size == 1:
+            topography = Topography(self._heights, substrate.physical_sizes, periodic=True)
+        else:
+            topography = Topography(self._heights, substrate.physical_sizes, periodic=True,
+                                    decomposition='subdomain',
+                                    nb_grid_pts=substrate.nb_grid_pts,
+                                    subdomain_locations=substrate.subdomain_locations,
+                                    communicator=communicator)
+        self.system = NonSmoothContactSystem(substrate, topography)
+        self.translation = None
+        self.translate((0, 0))
+
+    @property
+    def topography(self):
+        """Compound topography at the current translation"""
+        return self.system.surface
+
+    def translate(self, translation):
+        """
+        Translate the moving topography (relative to its initial position).
+
+        Parameters
+        ----------
+        translation : tuple of float
+            Translation vector in physical units. Arbitrary (sub-pixel)
+            translations are possible.
+        """
+        self.translation = tuple(translation)
+        # Phase exp(-2 pi i f.s), f in cycles per pixel and s in pixels
+        angle = self._phase_angle
+        angle[...] = 0
+        for frequency, shift in zip(self._frequencies, np.array(translation) / self._pixel_sizes):
+            angle -= frequency * shift
+        angle *= 2 * np.pi
+        np.cos(angle, out=self._phase.real)
+        np.sin(angle, out=self._phase.imag)
+
+        substrate = self.substrate
+        np.multiply(self._spectrum, self._phase, out=substrate.fourier_buffer.array())
+        substrate.fftengine.ifft(substrate.fourier_buffer, substrate.real_buffer)
+        np.multiply(substrate.real_buffer.array(), substrate.fftengine.normalisation, out=self._heights)
+        if self._stationary_heights is not None:
+            self._heights += self._stationary_heights
+
+    def steps(self, translations, offset=None, external_force=None, initial_forces=None, warm_start=True,
+              **kwargs):
+        """
+        Solve the contact problem for a sequence of translations. This is a
+        generator, results are yielded after each step.
+
+        Parameters
+        ----------
+        translations : array_like
+            Sequence of translation vectors.
+        offset : float, optional
+            Offset of the rigid surface. (Default: None)
+        external_force : float, optional
+            External force. (Default: None)
+        initial_forces : np.ndarray, optional
+            Forces (positive for repulsion) that initialize the first step.
+            (Default: None)
+        warm_start : bool, optional
+            Initialize each step with the forces of the previous step. This
+            pays off for translations that are small compared to the pixel
+            size; for large increments a cold start can converge faster.
+            (Default: True)
+        **kwargs
+            Additional arguments for `NonSmoothContactSystem.minimize_proxy`.
+
+        Yields
+        ------
+        result : scipy.optimize.OptimizeResult
+            Result of `NonSmoothContactSystem.minimize_proxy`, with the
+            additional field `translation`.
+        """
+        forces = initial_forces
+        for translation in translations:
+            self.translate(translation)
+            result = self.system.minimize_proxy(offset=offset, external_force=external_force,
+                                                initial_forces=None if forces is None else -forces, **kwargs)
+            if not result.success:
+                raise RuntimeError(f'Contact calculation at translation {self.translation} did not converge: '
+                                   f'{result.message}')
+            forces = result.jac if warm_start else None
+            result.translation = self.translation
+            yield result
+
+    def run(self, translations, offset=None, external_force=None, container=None, fields=('forces',),
+            **kwargs):
+        """
+        Slide the topography through a sequence of translations and write
+        every step to a container.
+
+        Parameters
+        ----------
+        translations : array_like
+            Sequence of translation vectors.
+        offset : float, optional
+            Offset of the rigid surface. (Default: None)
+        external_force : float, optional
+            External force. (Default: None)
+        container : :obj:`ContactMechanics.IO.NetCDF.NetCDFContainer`, optional
+            Container that receives a frame per step with the translation,
+            offset, normal force and contact area. (Default: None)
+        fields : tuple of str, optional
+            Fields written to the container for every step. Possible values
+            are 'forces', 'displacements' and 'heights'. (Default: ('forces',))
+        **kwargs
+            Additional arguments for `steps`.
+
+        Returns
+        -------
+        normal_forces : np.ndarray
+            Normal force for each step.
+        contact_areas : np.ndarray
+            Contact area for each step.
+        """
+        unknown_fields = set(fields) - {'forces', 'displacements', 'heights'}
+        if len(unknown_fields) > 0:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown_fields))}')
+        system = self.system
+        normal_forces = []
+        contact_areas = []
+        for result in self.steps(translations, offset=offset, external_force=external_force, **kwargs):
+            normal_forces += [system.compute_normal_force()]
+            contact_areas += [system.compute_contact_area()]
+            if container is not None:
+                frame = container.get_next_frame()
+                for i, t in enumerate(result.translation):
+                    frame[f'translation_{"xyz"[i]}'] = t
+                frame.offset = result.offset
+                frame.normal_force = normal_forces[-1]
+                frame.contact_area = contact_areas[-1]
+                values = {'forces': result.jac, 'displacements': result.x, 'heights': self.topography.heights()}
+                for field in fields:
+                    frame[field] = values[field]
+        return np.array(normal_forces), np.array(contact_areas)
@@ -29,6 +29,7 @@ Defines the interface for contact mechanics systems
 """
 
 import abc
+from contextlib import contextmanager
 
 import numpy as np
 import scipy
@@ -38,13 +39,25 @@ from NuMPI.Tools import Reduction
 import ContactMechanics
 import SurfaceTopography
 from ContactMechanics.Optimization import constrained_conjugate_gradients
+from ContactMechanics.Optimization.Registry import get_solver, register_solver
 from ContactMechanics.Tools import compare_containers
+from ContactMechanics.Tools.ContactMorphology import ContactIslands
 
 from NuMPI.Optimization import ccg_without_restart, ccg_with_restart
 
 import scipy.optimize as optim
 
 
+def _dot(reduction, a, b):
+    """
+    Scalar product of two arrays of identical shape, reduced over all MPI
+    processes. No temporary arrays are created if both arrays share the same
+    memory layout.
+    """
+    order = 'F' if a.flags.f_contiguous and b.flags.f_contiguous else 'C'
+    return reduction.dot(np.ravel(a, order=order), np.ravel(b, order=order))
+
+
 class IncompatibleFormulationError(Exception):
     # pylint: disable=missing-docstring
     pass
@@ -72,6 +85,8 @@ class SystemBase(object, metaclass=abc.ABCMeta):
         self.substrate = substrate
         self.area_per_pt = self.substrate.area_per_pt
         self.surface = surface
+        # Heights that are fixed during a solve, see `_fixed_heights`
+        self._fixed = None
         self.dim = None
         self.gap = None
         self.disp = None
@@ -82,6 +97,34 @@ class SystemBase(object, metaclass=abc.ABCMeta):
 
     _proxyclass = False
 
+    def _heights(self, offset=0):
+        """
+        Local heights of the topography shifted by the offset (read-only).
+        The heights are evaluated from the topography unless they have been
+        fixed for this offset by `_fixed_heights`.
+        """
+        if self._fixed is not None and self._fixed[0] == offset:
+            return self._fixed[1]
+        heights = self.surface.heights() + offset
+        heights.flags.writeable = False
+        return heights
+
+    @contextmanager
+    def _fixed_heights(self, offset, heights):
+        """
+        Fix the heights for the given offset while an objective is evaluated.
+        Objectives evaluate the heights once when they are created, such that
+        derived topographies (e.g. detrended or plastic topographies) are not
+        reevaluated at every function evaluation. Nothing is kept afterwards,
+        i.e. subsequent changes of the topography are always seen.
+        """
+        previous = self._fixed
+        self._fixed = offset, heights
+        try:
+            yield heights
+        finally:
+            self._fixed = previous
+
     @abc.abstractmethod
     def evaluate(self, disp, offset, pot=True, forces=False):
         """
@@ -128,13 +171,11 @@ class SystemBase(object, metaclass=abc.ABCMeta):
         evaluate the gap between surface and substrate. Convention is that
         non-penetrating contact has gap >= 0
         """
-        if self.dim == 1:
-            return (disp[self.comp_slice] -  # TODO: Check 1D Compatibility
+        if profile_args or profile_kwargs:
+            return (disp[self.comp_slice] -
                     (self.surface.heights(*profile_args, **profile_kwargs) +
                      offset))
-        return (disp[self.comp_slice] -
-                (self.surface.heights(*profile_args, **profile_kwargs) +
-                 offset))
+        return disp[self.comp_slice] - self._heights(offset)
 
     @abc.abstractmethod
     def compute_normal_force(self):
@@ -199,26 +240,40 @@ class SystemBase(object, metaclass=abc.ABCMeta):
         raise IncompatibleResolutionError()
 
     def _reshape_bounds(self, lbounds=None, ubounds=None):
-        bnds = None
-        if lbounds is not None and ubounds is not None:
-            ubounds = self.shape_minimisation_input(ubounds)
-            lbounds = self.shape_minimisation_input(lbounds)
-            bnds = tuple(zip(lbounds.tolist(), ubounds.tolist()))
-        elif lbounds is not None:
-            lbounds = self.shape_minimisation_input(lbounds)
-            bnds = tuple(
-                zip(lbounds.tolist(), [None for i in range(len(lbounds))]))
-        elif ubounds is not None:
-            ubounds = self.shape_minimisation_input(ubounds)
-            bnds = tuple(
-                zip([None for i in range(len(ubounds))], ubounds.tolist()))
-        return bnds
+        """
+        Convert nodal bounds to bounds of the (flattened) minimisation input.
+        Missing and masked bounds are converted to infinite bounds.
+
+        Parameters
+        ----------
+        lbounds : array_like, optional
+            Lower bounds. (Default: None)
+        ubounds : array_like, optional
+            Upper bounds. (Default: None)
+
+        Returns
+        -------
+        bounds : scipy.optimize.Bounds or None
+            Bounds backed by NumPy arrays, or None if neither lower nor upper
+            bounds are given.
+        """
+        if lbounds is None and ubounds is None:
+            return None
+        nb_pts = np.prod(self.substrate.nb_subdomain_grid_pts)
+
+        def flat_bounds(bounds, fill_value):
+            if bounds is None:
+                return np.full(nb_pts, fill_value)
+            bounds = np.ma.filled(self.shape_minimisation_input(bounds), fill_value)
+            return np.asarray(bounds, dtype=float).ravel()
+
+        return optim.Bounds(flat_bounds(lbounds, -np.inf), flat_bounds(ubounds, np.inf))
 
     def _lbounds_from_heights(self, offset):
 
         lbounds = np.ma.masked_all(self.substrate.nb_subdomain_grid_pts)
         lbounds.mask[self.substrate.local_topography_subdomain_slices] = False
-        lbounds[self.substrate.local_topography_subdomain_slices] = self.surface.heights() + offset
+        lbounds[self.substrate.local_topography_subdomain_slices] = self._heights(offset)
 
         lbounds.set_fill_value(-np.inf)
 
@@ -428,10 +483,29 @@ class NonSmoothContactSystem(SystemBase):
     def compute_contact_coordinates(self):
         """
         returns an array of all coordinates, where contact pressure is
-        repulsive. Useful for evaluating the number of contact islands etc.
+        repulsive. Use `compute_contact_islands` for the number, areas and
+        perimeters of contact islands.
         """
         return np.argwhere(self.contact_zone)
 
+    def compute_contact_islands(self):
+        """
+        Label the connected contact islands. Islands are wrapped around the
+        boundaries of periodic substrates and merged across MPI processes.
+
+        Returns
+        -------
+        islands : :obj:`ContactMechanics.Tools.ContactMorphology.ContactIslands`
+            Labels, number, areas, perimeters and size distribution of the
+            contact islands.
+        """
+        return ContactIslands(self.contact_zone[self.comp_slice],
+                              periodic=self.substrate.is_periodic(),
+                              physical_sizes=self.surface.physical_sizes,
+                              nb_domain_grid_pts=self.surface.nb_grid_pts,
+                              subdomain_locations=self.substrate.topography_subdomain_locations,
+                              communicator=self.substrate.communicator)
+
     def logger_input(self):
         """
         Describes the current state of the system (during minimization)
@@ -491,18 +565,21 @@ class NonSmoothContactSystem(SystemBase):
         """
         # pylint: disable=arguments-differ
         res = self.substrate.nb_subdomain_grid_pts
+        heights = self._heights(offset)
         if gradient:
             def fun(disp):
                 # pylint: disable=missing-docstring
                 try:
-                    self.evaluate(disp.reshape(res), offset, forces=True, logger=logger)
+                    with self._fixed_heights(offset, heights):
+                        self.evaluate(disp.reshape(res), offset, forces=True, logger=logger)
                 except ValueError as err:
                     raise ValueError("{}: disp.shape: {}, res: {}".format(err, disp.shape, res))
                 return (self.energy, -self.force.reshape(-1))
         else:
             def fun(disp):
                 # pylint: disable=missing-docstring
-                return self.evaluate(disp.reshape(res), offset, forces=False, logger=logger)[0]
+                with self._fixed_heights(offset, heights):
+                    return self.evaluate(disp.reshape(res), offset, forces=False, logger=logger)[0]
 
         return fun
 
@@ -565,11 +642,51 @@ class NonSmoothContactSystem(SystemBase):
             self.substrate.check()
         return result
 
+    def solve(self, offset=None, external_force=None, solver='auto', **kwargs):
+        """
+        Solve the contact problem with a registered solver (see
+        `ContactMechanics.Optimization.Registry`). All solvers return a
+        normalized result, irrespective of whether the underlying algorithm
+        operates on displacements, gaps or forces.
+
+        Parameters
+        ----------
+        offset : float, optional
+            Offset of the rigid surface. (Default: None)
+        external_force : float, optional
+            External force. The offset is determined by the solver if
+            specified. (Default: None)
+        solver : str, optional
+            Name of the solver. 'auto' selects the registered solver with the
+            highest priority that supports the problem, i.e. its boundary
+            conditions, domain decomposition, plasticity and force control.
+            Priorities are static; the size of the problem is not taken into
+            account. (Default: 'auto')
+        **kwargs
+            Additional arguments passed to the solver.
+
+        Returns
+        -------
+        result : scipy.optimize.OptimizeResult
+            Normalized result with fields `success`, `message`, `nit`,
+            `offset`, `disp` (displacements), `forces` (pixel forces,
+            positive for repulsive contact), `gap`, `solver` (name of the
+            solver) and `solver_result` (result of the underlying algorithm).
+        """
+        communicator = self.substrate.communicator
+        solver = get_solver(solver,
+                            mpi=communicator is not None and communicator.size > 1,
+                            hardness=getattr(self.surface, 'hardness', None) is not None,
+                            force_control=external_force is not None,
+                            nonperiodic=not self.substrate.is_periodic())
+        return solver(self, offset=offset, external_force=external_force, **kwargs)
+
     def primal_objective(self, offset, gradient=True):
         r"""To solve the primal objective using gap as the variable.
         Can be fed directly to standard solvers ex: scipy solvers etc
         and returns the elastic energy and it's gradient (negative of
-        the forces) as a function of the gap.
+        the forces) as a function of the gap. The heights of the topography
+        are evaluated when the objective is created.
 
         Parameters
         __________
@@ -602,12 +719,14 @@ class NonSmoothContactSystem(SystemBase):
         """
 
         res = self.substrate.nb_subdomain_grid_pts
+        heights = self._heights(offset)
         if gradient:
             def fun(gap):
-                disp = gap.reshape(res) + self.surface.heights() + offset
+                disp = gap.reshape(res) + heights
                 try:
-                    self.evaluate(
-                        disp.reshape(res), offset, forces=True)
+                    with self._fixed_heights(offset, heights):
+                        self.evaluate(
+                            disp.reshape(res), offset, forces=True)
                 except ValueError as err:
                     raise ValueError(
                         "{}: gap.shape: {}, res: {}".format(
@@ -615,9 +734,10 @@ class NonSmoothContactSystem(SystemBase):
                 return (self.energy, -self.force.reshape(-1))
         else:
             def fun(gap):
-                disp = gap.reshape(res) + self.surface.heights() + offset
-                return self.evaluate(
-                    disp.reshape(res), offset, forces=False)[0]
+                disp = gap.reshape(res) + heights
+                with self._fixed_heights(offset, heights):
+                    return self.evaluate(
+                        disp.reshape(res), offset, forces=False)[0]
 
         return fun
 
@@ -689,7 +809,7 @@ class NonSmoothContactSystem(SystemBase):
         elif solver == 'l-bfgs-b':
             result = optim.minimize(
                 self.primal_objective(offset, gradient=True),
-                self.init_gap,
+                self.init_gap.ravel(),
                 method='L-BFGS-B', jac=True,
                 bounds=bnds,
                 options=dict(gtol=gtol, ftol=1e-20))
@@ -699,8 +819,7 @@ class NonSmoothContactSystem(SystemBase):
             self.gap = result.x
             self.force = self.substrate.force = result.jac
             self.contact_zone = result.x == 0
-            self.disp = self.gap + offset + self.surface.heights().reshape(
-                self.gap.shape)
+            self.disp = self.gap + self._heights(offset).reshape(self.gap.shape)
 
         return result
 
@@ -709,21 +828,27 @@ class NonSmoothContactSystem(SystemBase):
         Computes the energies and forces in the system for a given displacement
         field
         """
-        disp = self.substrate.evaluate_disp(-press)
+        heights = self._heights(offset)
+        # Displacements are linear in the forces: evaluate_disp(-press) equals
+        # -evaluate_disp(press), which saves a temporary array
+        disp = self.substrate.evaluate_disp(press)
+        np.negative(disp, out=disp)
+
+        self.energy = _dot(self.reduction, press, disp) / 2 - _dot(self.reduction, press, heights)
         if forces:
-            self.gradient = disp - self.surface.heights() - offset
+            # The gap is computed in place
+            disp -= heights
+            self.gradient = disp
         else:
             self.gradient = None
 
-        self.energy = 1 / 2 * np.sum(press * disp) - np.sum(
-            press * (self.surface.heights() + offset))
-
         return (self.energy, self.gradient)
 
     def dual_objective(self, offset, gradient=True):
         r"""Objective function to handle dual objective, i.e. the Legendre
         transformation from displacements as variable to pressures
-        (the Lagrange multiplier) as variable.
+        (the Lagrange multiplier) as variable. The heights of the topography
+        are evaluated when the objective is created.
 
         Parameters
         __________
@@ -757,11 +882,13 @@ class NonSmoothContactSystem(SystemBase):
         """
 
         res = self.substrate.nb_domain_grid_pts
+        heights = self._heights(offset)
         if gradient:
             def fun(pressure):
                 try:
-                    self.evaluate_dual(
-                        pressure.reshape(res), offset, forces=True)
+                    with self._fixed_heights(offset, heights):
+                        self.evaluate_dual(
+                            pressure.reshape(res), offset, forces=True)
                 except ValueError as err:
                     raise ValueError(
                         "{}: gap.shape: {}, res: {}".format(
@@ -838,7 +965,7 @@ class NonSmoothContactSystem(SystemBase):
                 maxiter=maxiter)
         elif solver == 'l-bfgs-b':
             result = optim.minimize(self.dual_objective(offset, gradient=True),
-                                    self.init_force,
+                                    self.init_force.ravel(),
                                     method='L-BFGS-B', jac=True,
                                     bounds=bnds,
                                     options=dict(gtol=gtol, ftol=1e-20))
@@ -848,6 +975,302 @@ class NonSmoothContactSystem(SystemBase):
             self.gap = result.jac
             self.force = self.substrate.force = result.x
             self.contact_zone = result.x > 0
-            self.disp = self.gap + offset + self.surface.heights().reshape(self.gap.shape)
+            self.disp = self.gap + self._heights(offset).reshape(self.gap.shape)
 
         return result
+
+
+class SmoothContactSystem(SystemBase):
+    """
+    Contact system with a smooth (soft-wall) interaction between substrate
+    and rigid surface, e.g. adhesive contact. The total energy is the elastic
+    energy of the substrate plus the integral of the interaction energy per
+    area over the surface,
+
+    .. math ::
+
+        E(u) = E_{el}(u) + A_{pt} \\sum_i V(u_i - h_i - \\delta).
+
+    Potentials without repulsive core (see
+    `ContactMechanics.Interactions.Potential.hard_wall`) are combined with
+    the non-penetration constraint.
+
+    All arrays of the interaction (gap, energy density, forces and
+    curvature) are allocated once and updated in place, and the elastic
+    contributions reuse the FFT buffers of the substrate.
+    """
+
+    # pylint: disable=abstract-method
+
+    def __init__(self, substrate, interaction, surface):
+        """
+        Parameters
+        ----------
+        substrate : ContactMechanics.ElasticSubstrate
+            Defines the solid mechanics in the substrate.
+        interaction : ContactMechanics.Interactions.Potential
+            Interaction energy per area as a function of the gap.
+        surface : SurfaceTopography.Topography
+            Defines the profile.
+        """
+        super().__init__(substrate, surface)
+        if not compare_containers(surface.nb_grid_pts, substrate.nb_grid_pts):
+            raise IncompatibleResolutionError(
+                ("the substrate ({}) and the surface ({}) have incompatible "
+                 "nb_grid_ptss.").format(
+                    substrate.nb_grid_pts, surface.nb_grid_pts))  # nopep8
+        self.interaction = interaction
+        self.dim = len(self.substrate.nb_grid_pts)
+        self.energy = None
+        self.force = None
+        self.interaction_energy = None
+        self.interaction_force = None
+        self.contact_zone = None
+
+        topography_shape = self.substrate.topography_nb_subdomain_grid_pts
+        self._gap = np.empty(topography_shape)
+        self._interaction_buffers = tuple(np.empty(topography_shape) for i in range(3))
+        self._force = np.zeros(self.substrate.nb_subdomain_grid_pts)
+        self._hessp = np.zeros(self.substrate.nb_subdomain_grid_pts)
+        self._curvature_is_current = False
+
+    @staticmethod
+    def handles(substrate_type, surface_type, is_domain_decomposed):
+        """
+        determines whether this class can handle the proposed system
+        composition
+        Keyword Arguments:
+        substrate_type   -- instance of ElasticSubstrate subclass
+        surface_type     --
+        """
+        return issubclass(substrate_type, ContactMechanics.ElasticSubstrate) and \
+            issubclass(surface_type, SurfaceTopography.UniformTopographyInterface)
+
+    @property
+    def nb_grid_pts(self):
+        return self.surface.nb_grid_pts
+
+    def compute_normal_force(self):
+        "computes and returns the normal force, positive for repulsion"
+        return -self.reduction.sum(self.substrate.force)
+
+    def compute_nb_contact_pts(self):
+        """
+        compute and return the number of contact points, i.e. the number of
+        points with nonpositive gap. Note that this is of no physical
+        interest, as it is a purely numerical artefact
+        """
+        return self.reduction.sum(self.contact_zone)
+
+    def logger_input(self):
+        """
+        Describes the current state of the system (during minimization)
+
+        Output is suited to be passed to ContactMechanics.Tools.Logger.Logger
+
+        Returns
+        -------
+        headers: list of strings
+        values: list
+        """
+        return (['energy',
+                 'interaction energy',
+                 'substrate force', ],
+                [self.energy,
+                 self.interaction_energy,
+                 -self.reduction.sum(self.substrate.force), ])
+
+    def evaluate(self, disp, offset, pot=True, forces=False, logger=None):
+        """
+        Compute the energies and forces in the system for a given displacement
+        field
+        """
+        # attention: the substrate may have a higher nb_grid_pts than the gap
+        # and the interaction (e.g. FreeElasticHalfSpace)
+        self.gap = np.subtract(disp[self.comp_slice], self._heights(offset), out=self._gap)
+        self._curvature_is_current = False
+        self.substrate.compute(disp, pot, forces)
+        potential, gradient, curvature = self._interaction_buffers
+        potential, gradient, _ = self.interaction.evaluate(self.gap, potential=pot, gradient=forces,
+                                                           out=(potential, gradient, None))
+
+        if pot:
+            self.interaction_energy = self.area_per_pt * self.reduction.sum(potential)
+            self.energy = self.substrate.energy + self.interaction_energy
+        else:
+            self.interaction_energy = self.energy = None
+        if forces:
+            # Force exerted by the interaction on the substrate
+            gradient *= -self.area_per_pt
+            self.interaction_force = gradient
+            np.copyto(self._force, self.substrate.force)
+            self._force[self.comp_slice] += gradient
+            self.force = self._force
+        else:
+            self.interaction_force = self.force = None
+
+        if logger is not None:
+            logger.st(*self.logger_input())
+
+        return (self.energy, self.force)
+
+    def objective(self, offset, disp0=None, gradient=False, logger=None):
+        """
+        This helper method exposes a scipy.optimize-friendly interface to the
+        evaluate() method. Use this for optimization purposes, it makes sure
+        that the shape of disp is maintained and lets you set the offset and
+        'forces' flag without using scipy's cumbersome argument passing
+        interface. Returns a function of only disp
+        Parameters:
+        -----------
+        offset:
+            determines indentation depth
+        disp0:
+            unused variable, present only for interface compatibility
+            with inheriting classes
+        gradient: (default False)
+            whether the gradient is supposed to be
+            used
+        """
+        # pylint: disable=arguments-differ
+        res = self.substrate.nb_subdomain_grid_pts
+        heights = self._heights(offset)
+        if gradient:
+            def fun(disp):
+                # pylint: disable=missing-docstring
+                try:
+                    with self._fixed_heights(offset, heights):
+                        self.evaluate(disp.reshape(res), offset, forces=True, logger=logger)
+                except ValueError as err:
+                    raise ValueError("{}: disp.shape: {}, res: {}".format(err, disp.shape, res))
+                return (self.energy, -self.force.reshape(-1))
+        else:
+            def fun(disp):
+                # pylint: disable=missing-docstring
+                with self._fixed_heights(offset, heights):
+                    return self.evaluate(disp.reshape(res), offset, forces=False, logger=logger)[0]
+
+        return fun
+
+    def hessian_product(self, disp):
+        """
+        Product of the Hessian of the objective with a displacement field.
+        The curvature of the interaction is taken at the gap of the last
+        evaluation of the system.
+
+        Parameters:
+        -----------
+        disp: float array
+            array of shape nb_subdomain_grid_pts or a flattened version of it
+
+        Returns:
+        --------
+        hessian product of the shape of disp
+        """
+        if self.gap is None:
+            raise RuntimeError('The Hessian product requires a prior evaluation of the system.')
+        if not self._curvature_is_current:
+            self.interaction.evaluate(self.gap, potential=False, curvature=True, out=self._interaction_buffers)
+            self._curvature_is_current = True
+        curvature = self._interaction_buffers[2]
+        res = self.substrate.nb_subdomain_grid_pts
+        disp_res = disp.reshape(res)
+        hessp = np.negative(self.substrate.evaluate_force(disp_res), out=self._hessp)
+        hessp[self.comp_slice] += self.area_per_pt * curvature * disp_res[self.comp_slice]
+        return hessp.reshape(disp.shape)
+
+    def minimize_proxy(self, offset=0, initial_displacements=None, lbounds=None, **kwargs):
+        """
+        Minimize the total energy with scipy's L-BFGS-B (see
+        `SystemBase.minimize_proxy` for all parameters). The non-penetration
+        constraint is imposed automatically (`lbounds='auto'`) for potentials
+        without repulsive core. For soft-wall potentials, the default initial
+        displacements avoid penetration.
+        """
+        if lbounds is None and self.interaction.hard_wall:
+            lbounds = 'auto'
+        if initial_displacements is None and not self.interaction.hard_wall:
+            # Start from a nonnegative gap, since soft-wall potentials can
+            # diverge for penetrating surfaces
+            initial_displacements = np.zeros(self.substrate.nb_subdomain_grid_pts)
+            initial_displacements[self.comp_slice] = np.maximum(self._heights(offset), 0)
+        result = super().minimize_proxy(offset=offset, initial_displacements=initial_displacements,
+                                        lbounds=lbounds, **kwargs)
+        self.contact_zone = self.gap <= 0
+        return result
+
+
+def _normalized_result(solver_result, solver, offset, disp, forces, gap):
+    """Solver result in the normalized convention of `NonSmoothContactSystem.solve`"""
+    result = optim.OptimizeResult()
+    result.success = bool(solver_result.success)
+    result.message = solver_result.message
+    result.nit = solver_result.nit
+    result.offset = offset
+    result.disp = disp
+    result.forces = forces
+    result.gap = gap
+    result.solver = solver
+    result.solver_result = solver_result
+    return result
+
+
+def _solve_polonsky_keer(system, offset=None, external_force=None, **kwargs):
+    """Polonsky-Keer constrained conjugate gradients on the pixel forces"""
+    solver_result = system.minimize_proxy(offset=offset, external_force=external_force, **kwargs)
+    return _normalized_result(solver_result, 'polonsky-keer', solver_result.offset, solver_result.x,
+                              solver_result.jac, system.compute_gap(solver_result.x, solver_result.offset))
+
+
+def _primal_solver(method):
+    """Solver that minimizes the primal objective (gap as variable)"""
+
+    def solve(system, offset=None, external_force=None, init_gap=None, **kwargs):
+        offset = 0 if offset is None else offset
+        if init_gap is None:
+            init_gap = np.zeros(system.substrate.nb_subdomain_grid_pts)
+        solver_result = system.primal_minimize_proxy(offset, init_gap=init_gap, solver=method, **kwargs)
+        gap = solver_result.x.reshape(system.substrate.nb_subdomain_grid_pts)
+        disp = gap + system._heights(offset)
+        # The gradient returned by the solver may be projected onto the
+        # feasible set; forces are evaluated for the final gap instead
+        system.evaluate(disp, offset, forces=True)
+        return _normalized_result(solver_result, 'primal-' + method.replace('_', '-'), offset, disp,
+                                  -system.force, gap)
+
+    return solve
+
+
+def _dual_solver(method):
+    """Solver that minimizes the dual objective (pixel forces as variable)"""
+
+    def solve(system, offset=None, external_force=None, init_force=None, **kwargs):
+        offset = 0 if offset is None else offset
+        if init_force is None:
+            init_force = np.zeros(system.substrate.nb_domain_grid_pts)
+        solver_result = system.dual_minimize_proxy(offset, init_force=init_force, solver=method, **kwargs)
+        forces = solver_result.x.reshape(system.substrate.nb_domain_grid_pts)
+        # The gradient returned by the solver may be projected onto the
+        # feasible set; the gap is evaluated for the final forces instead
+        system.evaluate_dual(forces, offset, forces=True)
+        gap = system.gradient
+        return _normalized_result(solver_result, 'dual-' + method.replace('_', '-'), offset,
+                                  gap + system._heights(offset), forces, gap)
+
+    return solve
+
+
+# Priorities are a static ranking that does not depend on the size of the
+# problem. The constrained conjugate gradient solvers without restart and
+# Polonsky-Keer are preferred; their relative run times depend on the
+# topography and on the convergence criteria, which differ between the
+# solvers. L-BFGS-B is several times slower and the variants with restart
+# frequently fail to converge.
+register_solver('polonsky-keer', _solve_polonsky_keer, mpi=True, hardness=True, force_control=True, nonperiodic=True,
+                priority=2)
+register_solver('dual-ccg-without-restart', _dual_solver('ccg_without_restart'), priority=3)
+register_solver('primal-ccg-without-restart', _primal_solver('ccg_without_restart'), priority=1)
+register_solver('dual-l-bfgs-b', _dual_solver('l-bfgs-b'), priority=0)
+register_solver('primal-l-bfgs-b', _primal_solver('l-bfgs-b'), priority=-1)
+register_solver('dual-ccg-with-restart', _dual_solver('ccg_with_restart'), priority=-2)
+register_solver('primal-ccg-with-restart', _primal_solver('ccg_with_restart'), priority=-3)
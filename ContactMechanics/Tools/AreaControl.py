@@ -0,0 +1,197 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Contact calculations at a prescribed contact area
+"""
+
+import numpy as np
+
+
+class ContactAreaControl:
+    """
+    Solve for the offset at which a contact system reaches a target
+    (fractional) contact area.
+
+    The contact area grows monotonically with the offset. The offset is
+    found by secant updates of the logarithm of the contact area, i.e. from
+    the change of the contact area with offset estimated from the solutions
+    obtained so far. Updates are safeguarded by the bracket of offsets that
+    bound the target area. At the offset at which the rigid surface touches
+    the substrate the contact area vanishes; this bounds the bracket from
+    below without a calculation. All solutions are recorded and used for
+    subsequent targets, such that sequences of target areas require few
+    calculations.
+
+    Plastic displacements are restored before every trial calculation of
+    a target, such that the surface is in the same state as if only the
+    final calculation had been carried out.
+
+    Example
+    -------
+    >>> control = ContactAreaControl(system)
+    >>> for contact_area in np.logspace(-3, -1, 10):
+    ...     result = control.minimize_proxy(contact_area=contact_area)
+    >>> control.nb_solves
+    """
+
+    def __init__(self, system, rtol=0.05, max_solves=10):
+        """
+        Parameters
+        ----------
+        system : :obj:`ContactMechanics.Systems.NonSmoothContactSystem`
+            Contact system.
+        rtol : float, optional
+            Relative tolerance of the contact area. Note that the contact
+            area can only be resolved to single pixels. (Default: 0.05)
+        max_solves : int, optional
+            Maximum number of calculations for a single target area. The
+            last calculation is returned if the target is not reached.
+            (Default: 10)
+        """
+        if rtol <= 0:
+            raise ValueError('The tolerance of the contact area must be positive.')
+        self.system = system
+        self.rtol = rtol
+        self.max_solves = max_solves
+        self.offsets = []
+        self.contact_areas = []
+        self._nb_grid_pts = np.prod(system.surface.nb_grid_pts)
+
+    @property
+    def nb_solves(self):
+        """Total number of calculations carried out"""
+        return len(self.offsets)
+
+    def _log_area(self, contact_area):
+        """Logarithm of the contact area, regularized by the area of a single pixel"""
+        return np.log(np.asarray(contact_area) + 1 / self._nb_grid_pts)
+
+    def _solve(self, **kwargs):
+        result = self.system.minimize_proxy(**kwargs)
+        result.contact_area = self.system.reduction.sum(result.jac > 0) / self._nb_grid_pts
+        self.offsets += [result.offset]
+        self.contact_areas += [result.contact_area]
+        return result
+
+    def _guess(self, target, top, middle):
+        """
+        Offset of the next trial calculation for a target (logarithmic) area.
+        Returns the offset and whether no further improvement is possible.
+        """
+        # The rigid surface touches the substrate at offset -top
+        offsets = np.append(self.offsets, -top)
+        log_areas = np.append(self._log_area(self.contact_areas), self._log_area(0))
+        order = np.argsort(offsets)
+        offsets, log_areas = offsets[order], log_areas[order]
+
+        deviations = np.abs(log_areas - target)
+        if deviations.min() <= np.log(1 + self.rtol):
+            # Recalculate an earlier solution
+            return offsets[np.argmin(deviations)], True
+
+        below = np.nonzero(log_areas < target)[0]
+        above = np.nonzero(log_areas > target)[0]
+        if len(above) == 0:
+            lo = below[-1]
+            if lo == 0:
+                # Only the touching point is known
+                return -middle, False
+            # Extrapolate the area from the two largest offsets, but at most
+            # double the distance from the touching point
+            max_step = offsets[lo] + top
+            areas = np.exp(log_areas[[lo - 1, lo]])
+            if areas[1] <= areas[0]:
+                return offsets[lo] + max_step, False
+            slope = (areas[1] - areas[0]) / (offsets[lo] - offsets[lo - 1])
+            return offsets[lo] + min((np.exp(target) - areas[1]) / slope, max_step), False
+
+        # Bracket, which is not unique if the area is not monotonic (which
+        # can happen for unconverged calculations)
+        hi = above[0]
+        below = below[below < hi]
+        if len(below) == 0:
+            return offsets[hi], True
+        lo = below[-1]
+        width = offsets[hi] - offsets[lo]
+        if width <= np.finfo(float).eps * max(abs(offsets[hi]), abs(top), 1):
+            # The contact area jumps across the target
+            return offsets[lo if target - log_areas[lo] < log_areas[hi] - target else hi], True
+        # Secant within the bracket, kept away from its ends such that the
+        # bracket shrinks in every iteration. The logarithm of the area is
+        # interpolated, unless the bracket extends to the loss of contact
+        # where the area (rather than its logarithm) is linear in the offset.
+        if log_areas[lo] > self._log_area(0):
+            fraction = (target - log_areas[lo]) / (log_areas[hi] - log_areas[lo])
+        else:
+            areas = np.exp(log_areas[[lo, hi]])
+            fraction = (np.exp(target) - areas[0]) / (areas[1] - areas[0])
+        return offsets[lo] + min(max(fraction, 0.1), 0.9) * width, False
+
+    def minimize_proxy(self, offset=None, external_force=None, contact_area=None, **kwargs):
+        """
+        Solve the contact problem at a given offset, external force or
+        contact area.
+
+        Parameters
+        ----------
+        offset : float, optional
+            Offset of the rigid surface. (Default: None)
+        external_force : float, optional
+            External force. (Default: None)
+        contact_area : float, optional
+            Target fractional contact area. (Default: None)
+        **kwargs
+            Additional arguments for the `minimize_proxy` method of the
+            system.
+
+        Returns
+        -------
+        result : scipy.optimize.OptimizeResult
+            Result of the (last) calculation, with the additional field
+            `contact_area`.
+        """
+        if contact_area is None:
+            return self._solve(offset=offset, external_force=external_force, **kwargs)
+        if offset is not None or external_force is not None:
+            raise ValueError('Please specify only one of `offset`, `external_force` and `contact_area`.')
+
+        surface = self.system.surface
+        heights = surface.heights()
+        top = self.system.reduction.max(heights)
+        middle = self.system.reduction.sum(heights) / self._nb_grid_pts
+        plastic_displ = getattr(surface, 'plastic_displ', None)
+        if plastic_displ is not None:
+            plastic_displ = plastic_displ.copy()
+
+        target = self._log_area(contact_area)
+        tol = np.log(1 + self.rtol)
+        for i in range(self.max_solves):
+            offset, final = self._guess(target, top, middle)
+            if i > 0 and plastic_displ is not None:
+                surface.plastic_displ[...] = plastic_displ
+            result = self._solve(offset=offset, **kwargs)
+            if final or abs(self._log_area(result.contact_area) - target) <= tol:
+                break
+        return result
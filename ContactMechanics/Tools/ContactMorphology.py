@@ -0,0 +1,240 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Morphology of the contact area: Connected contact islands, their areas and
+perimeters
+"""
+
+import numpy as np
+from scipy.ndimage import label
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from NuMPI import MPI
+
+
+def _allgatherv(communicator, local_values):
+    """Gather rows of integer arrays of varying length from all processes"""
+    if communicator is None or communicator.size == 1:
+        return local_values
+    nb_columns = local_values.shape[1]
+    counts = np.zeros(communicator.size, dtype=np.int64)
+    communicator.Allgather(np.array([len(local_values)], dtype=np.int64), counts)
+    values = np.empty((counts.sum(), nb_columns), dtype=np.int64)
+    communicator.Allgatherv(np.ascontiguousarray(local_values, dtype=np.int64), (values, counts * nb_columns))
+    return values
+
+
+def _allreduce(communicator, local_values):
+    """Element-wise sum of arrays over all processes"""
+    if communicator is None or communicator.size == 1:
+        return local_values
+    values = np.empty_like(local_values)
+    communicator.Allreduce(local_values, values, op=MPI.SUM)
+    return values
+
+
+class ContactIslands(object):
+    """
+    Connected regions (islands) of a contact mask. Pixels are connected to
+    their nearest neighbors; periodic domains are wrapped around.
+
+    Islands are labelled on each MPI process individually. Labels are then
+    merged across subdomain boundaries (and periodic images) by a union-find
+    over the contacting pixels on the faces of the subdomains. Only these
+    faces are exchanged between processes, never the full mask.
+
+    Attributes
+    ----------
+    labels : np.ndarray of int
+        Local (subdomain) array of labels, consistent across processes. Zero
+        denotes pixels out of contact, islands are numbered from 1 to
+        `nb_islands`.
+    nb_islands : int
+        Total number of islands.
+    """
+
+    def __init__(self, mask, periodic=False, physical_sizes=None, nb_domain_grid_pts=None,
+                 subdomain_locations=None, communicator=None):
+        """
+        Parameters
+        ----------
+        mask : np.ndarray of bool
+            Local (subdomain) contact mask.
+        periodic : bool, optional
+            Wrap islands around the domain boundaries. (Default: False)
+        physical_sizes : tuple of float, optional
+            Physical sizes of the domain. Areas and perimeters are given in
+            numbers of pixels and pixel edges if None. (Default: None)
+        nb_domain_grid_pts : tuple of int, optional
+            Number of grid points of the full domain. (Default: shape of the
+            mask)
+        subdomain_locations : tuple of int, optional
+            Location of the local subdomain within the full domain.
+            (Default: origin)
+        communicator : mpi4py communicator or NuMPI stub communicator, optional
+            Communicator of the domain decomposition. (Default: None)
+        """
+        mask = np.asarray(mask, dtype=bool)
+        self.periodic = periodic
+        self.communicator = communicator
+        self.nb_domain_grid_pts = mask.shape if nb_domain_grid_pts is None else tuple(nb_domain_grid_pts)
+        self.subdomain_locations = (0,) * mask.ndim if subdomain_locations is None else tuple(subdomain_locations)
+        if physical_sizes is None:
+            self.pixel_sizes = np.ones(mask.ndim)
+        else:
+            self.pixel_sizes = np.asarray(physical_sizes, dtype=float) / np.asarray(self.nb_domain_grid_pts)
+        self.mask = mask
+
+        # Local labels (nearest neighbor connectivity), made globally unique
+        local_labels, nb_local_islands = label(mask)
+        local_counts = _allgatherv(communicator, np.array([[nb_local_islands]], dtype=np.int64))[:, 0]
+        rank = 0 if communicator is None else communicator.rank
+        label_offset = local_counts[:rank].sum()
+        nb_labels = local_counts.sum()
+
+        # Contacting pixels on the faces of the subdomain with global index,
+        # label and a bit field indicating on which faces they are located
+        faces = np.zeros(mask.shape, dtype=np.int64)
+        for axis in range(mask.ndim):
+            low = [slice(None)] * mask.ndim
+            low[axis] = 0
+            faces[tuple(low)] |= 1 << (2 * axis)
+            high = [slice(None)] * mask.ndim
+            high[axis] = -1
+            faces[tuple(high)] |= 1 << (2 * axis + 1)
+        on_face = np.logical_and(faces != 0, mask)
+        coords = np.nonzero(on_face)
+        global_coords = tuple(c + loc for c, loc in zip(coords, self.subdomain_locations))
+        local_face_pixels = np.stack([np.ravel_multi_index(global_coords, self.nb_domain_grid_pts),
+                                      local_labels[coords] + label_offset,
+                                      faces[coords]], axis=1)
+        face_pixels = _allgatherv(communicator, local_face_pixels)
+        sort_order = np.argsort(face_pixels[:, 0])
+        face_pixels = face_pixels[sort_order]
+        self._face_indices = face_pixels[:, 0]
+
+        # Union-find over labels of neighboring face pixels. All processes
+        # operate on the same data and hence obtain identical labels.
+        all_coords = np.unravel_index(face_pixels[:, 0], self.nb_domain_grid_pts)
+        sources = []
+        targets = []
+        for axis in range(mask.ndim):
+            on_high_face = (face_pixels[:, 2] & (1 << (2 * axis + 1))) != 0
+            neighbors, found = self._lookup_neighbors([c[on_high_face] for c in all_coords], axis, 1)
+            sources += [face_pixels[on_high_face, 1][found]]
+            targets += [face_pixels[neighbors[found], 1]]
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        graph = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)),
+                           shape=(nb_labels + 1, nb_labels + 1))
+        # Background (label 0) is isolated and remains component 0;
+        # components are numbered in the order of their lowest label
+        nb_components, lookup = connected_components(graph, directed=False)
+        self.nb_islands = nb_components - 1
+
+        local_labels[mask] += label_offset
+        self.labels = lookup[local_labels]
+        self._local_face_pixels = local_face_pixels
+
+    def _lookup_neighbors(self, global_coords, axis, direction):
+        """
+        Find the neighbors of pixels (given by their global coordinates) in
+        the gathered face pixels. Returns indices into the sorted face pixels
+        and a mask whether the neighbor is a contacting face pixel.
+        """
+        global_coords = list(global_coords)
+        neighbor = global_coords[axis] + direction
+        nb_grid_pts = self.nb_domain_grid_pts[axis]
+        inside = np.logical_and(neighbor >= 0, neighbor < nb_grid_pts)
+        if self.periodic:
+            neighbor %= nb_grid_pts
+            inside[...] = True
+        else:
+            neighbor = np.clip(neighbor, 0, nb_grid_pts - 1)
+        global_coords[axis] = neighbor
+        indices = np.ravel_multi_index(global_coords, self.nb_domain_grid_pts)
+        positions = np.searchsorted(self._face_indices, indices)
+        positions = np.minimum(positions, len(self._face_indices) - 1)
+        found = np.logical_and(inside, self._face_indices[positions] == indices) \
+            if len(self._face_indices) > 0 else np.zeros(len(indices), dtype=bool)
+        return positions, found
+
+    @property
+    def areas(self):
+        """Areas of the islands"""
+        counts = np.bincount(self.labels.ravel(), minlength=self.nb_islands + 1)[1:]
+        return _allreduce(self.communicator, counts) * np.prod(self.pixel_sizes)
+
+    @property
+    def perimeters(self):
+        """
+        Perimeters of the islands, i.e. the total length of the pixel edges
+        between an island and the non-contacting region. The boundaries of
+        nonperiodic domains count towards the perimeter.
+        """
+        ndim = self.mask.ndim
+        perimeters = np.zeros(self.nb_islands + 1)
+        face_pixels = self._local_face_pixels
+        local_coords = tuple(c - loc for c, loc in
+                             zip(np.unravel_index(face_pixels[:, 0], self.nb_domain_grid_pts),
+                                 self.subdomain_locations))
+        global_coords = np.unravel_index(face_pixels[:, 0], self.nb_domain_grid_pts)
+        for axis in range(ndim):
+            edge_length = np.prod(np.delete(self.pixel_sizes, axis))
+            # Edges within the subdomain
+            low = [slice(None)] * ndim
+            low[axis] = slice(None, -1)
+            high = [slice(None)] * ndim
+            high[axis] = slice(1, None)
+            boundary = self.mask[tuple(low)] != self.mask[tuple(high)]
+            perimeters += edge_length * np.bincount(self.labels[tuple(low)][boundary], minlength=self.nb_islands + 1)
+            perimeters += edge_length * np.bincount(self.labels[tuple(high)][boundary], minlength=self.nb_islands + 1)
+            # Edges across the faces of the subdomain
+            for direction, bit in [(-1, 2 * axis), (1, 2 * axis + 1)]:
+                on_face = (face_pixels[:, 2] & (1 << bit)) != 0
+                _, found = self._lookup_neighbors([c[on_face] for c in global_coords], axis, direction)
+                labels = self.labels[tuple(c[on_face] for c in local_coords)]
+                perimeters += edge_length * np.bincount(labels[np.logical_not(found)],
+                                                        minlength=self.nb_islands + 1)
+        return _allreduce(self.communicator, perimeters[1:])
+
+    def size_distribution(self, bins=10):
+        """
+        Histogram of the island areas.
+
+        Parameters
+        ----------
+        bins : int or sequence of float, optional
+            Number of bins or bin edges, see `numpy.histogram`. (Default: 10)
+
+        Returns
+        -------
+        counts : np.ndarray
+            Number of islands per bin.
+        bin_edges : np.ndarray
+            Edges of the bins.
+        """
+        return np.histogram(self.areas, bins=bins)
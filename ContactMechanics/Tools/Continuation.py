@@ -0,0 +1,147 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Tolerance continuation for sequences of contact calculations
+"""
+
+import numpy as np
+
+
+class ToleranceContinuation:
+    """
+    Schedule of solver tolerances for a sequence of contact calculations
+    (load steps), each of which is initialized with the solution of a
+    previous step.
+
+    Steps that are requested as outputs are solved to the final tolerances.
+    All other steps only serve as seeds for subsequent steps. Their tolerances
+    are loosened by a factor that decreases geometrically from `loosening`
+    for the first step to unity for the last step.
+
+    Example
+    -------
+    >>> continuation = ToleranceContinuation(loosening=100, outputs=[-1])
+    >>> topography.contact_mechanics(nsteps=50, continuation=continuation)
+    >>> continuation.at_final_tolerance
+    """
+
+    def __init__(self, loosening=100, outputs=None):
+        """
+        Parameters
+        ----------
+        loosening : float, optional
+            Factor by which the tolerances of the first seed step are
+            loosened. (Default: 100)
+        outputs : list of int, optional
+            Indices of the steps that need to be solved to the final
+            tolerances. Negative indices count from the last step. All steps
+            are solved to the final tolerance if set to None.
+            (Default: None)
+        """
+        if loosening < 1:
+            raise ValueError('Tolerances can only be loosened, i.e. `loosening` must be at least unity.')
+        self.loosening = loosening
+        self.outputs = outputs
+        self._factors = []
+        self._converged = []
+
+    def is_output(self, step, nsteps):
+        """Return whether a step needs to be solved to the final tolerances"""
+        if self.outputs is None:
+            return True
+        return step in [i % nsteps for i in self.outputs]
+
+    def factor(self, step, nsteps):
+        """Factor by which the tolerances are loosened for a step"""
+        if self.is_output(step, nsteps) or nsteps < 2:
+            return 1.0
+        return self.loosening ** (1 - step / (nsteps - 1))
+
+    def tolerances(self, step, nsteps, pentol, forcetol=1e-5, thermotol=1e-6):
+        """
+        Tolerances for a step. The loosening factor is recorded.
+
+        Parameters
+        ----------
+        step : int
+            Index of the current step.
+        nsteps : int
+            Total number of steps.
+        pentol : float
+            Final tolerance for the penetration. None leaves the choice to
+            the solver.
+        forcetol : float, optional
+            Final tolerance for the force outside the contact region.
+            (Default: 1e-5)
+        thermotol : float, optional
+            Final tolerance for the relative change of the thermodynamic
+            control property. (Default: 1e-6)
+
+        Returns
+        -------
+        tolerances : dict
+            Keyword arguments `pentol`, `forcetol` and `thermotol` for the
+            constrained conjugate gradient solver.
+        """
+        factor = self.factor(step, nsteps)
+        _set_step(self._factors, step, factor, np.nan)
+        return dict(pentol=None if pentol is None else factor * pentol,
+                    forcetol=factor * forcetol,
+                    thermotol=factor * thermotol)
+
+    def record(self, step, converged):
+        """
+        Record whether the solver converged for a step.
+
+        Parameters
+        ----------
+        step : int
+            Index of the step.
+        converged : bool
+            Whether the solver reached the tolerances of the step (e.g.
+            `success` of the result of the optimizer).
+        """
+        _set_step(self._converged, step, bool(converged), False)
+
+    @property
+    def at_final_tolerance(self):
+        """
+        Boolean array indicating which steps were solved to the final
+        tolerances, i.e. which steps were run at the final tolerances and
+        converged. Steps whose convergence was not recorded are reported as
+        not solved to the final tolerances.
+        """
+        factors = np.array(self._factors)
+        converged = np.zeros(len(factors), dtype=bool)
+        nb_recorded = min(len(factors), len(self._converged))
+        converged[:nb_recorded] = self._converged[:nb_recorded]
+        return np.logical_and(factors == 1.0, converged)
+
+
+def _set_step(values, step, value, fill_value):
+    """Set the value of a step in a list, padding it with `fill_value`"""
+    if step >= len(values):
+        values += [fill_value] * (step + 1 - len(values))
+    values[step] = value
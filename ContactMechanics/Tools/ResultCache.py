@@ -0,0 +1,307 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Content-addressed cache for the results of contact mechanics calculations
+"""
+
+import abc
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..PlasticSystemSpecialisations import PhaseHardness
+
+
+def _entry_nbytes(entry):
+    """Memory occupied by the arrays of a cache entry"""
+    return sum(np.asarray(value).nbytes for value in entry.values())
+
+
+class ResultCache(object, metaclass=abc.ABCMeta):
+    """
+    Cache for the results of individual steps of contact mechanics
+    calculations. Entries are dictionaries of scalars and arrays, stored
+    under a key that is a hash of all inputs of the calculation (see
+    `ContactMechanics.PipelineFunction.contact_mechanics`). Least recently
+    used entries are evicted once the total size of the stored arrays
+    exceeds `max_size`.
+    """
+
+    def __init__(self, max_size=None):
+        """
+        Parameters
+        ----------
+        max_size : int, optional
+            Maximum size of the cache in bytes. Unlimited if set to None.
+            (Default: None)
+        """
+        if max_size is not None and max_size < 0:
+            raise ValueError('The maximum size of the cache must be nonnegative.')
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the entry stored under `key`, or None if there is no such
+        entry. The entry is marked as recently used.
+        """
+        with self._lock:
+            entry = self._get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """Store an entry (dictionary of scalars and arrays) under `key`"""
+        with self._lock:
+            self._put(key, {name: np.array(value) for name, value in entry.items()})
+            if self.max_size is not None:
+                self._evict(self.max_size)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._evict(0)
+
+    @property
+    @abc.abstractmethod
+    def nbytes(self):
+        """Total size of the stored arrays in bytes"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def __len__(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _get(self, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _put(self, key, entry):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _evict(self, max_size):
+        """Remove least recently used entries until the cache fits into `max_size`"""
+        raise NotImplementedError
+
+
+class MemoryCache(ResultCache):
+    """
+    Least-recently-used cache in memory
+    """
+
+    def __init__(self, max_size=None):
+        super().__init__(max_size)
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+    def __repr__(self):
+        return f'MemoryCache(max_size={self.max_size})'
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key, entry):
+        if key in self._entries:
+            self._nbytes -= _entry_nbytes(self._entries.pop(key))
+        self._entries[key] = entry
+        self._nbytes += _entry_nbytes(entry)
+
+    def _evict(self, max_size):
+        while self._nbytes > max_size and len(self._entries) > 0:
+            key, entry = self._entries.popitem(last=False)
+            self._nbytes -= _entry_nbytes(entry)
+
+
+class DirectoryCache(ResultCache):
+    """
+    Cache in a local directory, one `.npz` file per entry. The cache
+    persists between sessions and can be shared between processes. The
+    modification time of the files records their last use.
+    """
+
+    def __init__(self, path, max_size=None):
+        """
+        Parameters
+        ----------
+        path : str
+            Directory that holds the cache. It is created if it does not
+            exist.
+        max_size : int, optional
+            Maximum size of the cache in bytes. Unlimited if set to None.
+            (Default: None)
+        """
+        super().__init__(max_size)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        return f"DirectoryCache('{self.path}', max_size={self.max_size})"
+
+    def _filename(self, key):
+        return os.path.join(self.path, f'{key}.npz')
+
+    def _files(self):
+        """Entries as (last use, size, filename), least recently used first"""
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith('.npz'):
+                filename = os.path.join(self.path, name)
+                try:
+                    stat = os.stat(filename)
+                except FileNotFoundError:
+                    # Removed by another process
+                    continue
+                files += [(stat.st_mtime_ns, stat.st_size, filename)]
+        return sorted(files)
+
+    def __len__(self):
+        return len(self._files())
+
+    @property
+    def nbytes(self):
+        return sum(size for mtime, size, filename in self._files())
+
+    def _get(self, key):
+        filename = self._filename(key)
+        try:
+            with np.load(filename) as data:
+                entry = {name: data[name] for name in data.files}
+            os.utime(filename)
+        except (FileNotFoundError, OSError, ValueError):
+            # Missing, removed by another process or incompletely written
+            return None
+        return entry
+
+    def _put(self, key, entry):
+        # Write to a temporary file and rename, such that other processes
+        # never see partially written entries
+        fd, tmp_filename = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **entry)
+            os.replace(tmp_filename, self._filename(key))
+        except BaseException:
+            os.remove(tmp_filename)
+            raise
+
+    def _evict(self, max_size):
+        files = self._files()
+        nbytes = sum(size for mtime, size, filename in files)
+        for mtime, size, filename in files:
+            if nbytes <= max_size:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            nbytes -= size
+
+
+def hardness_key(hardness):
+    """
+    Normalize a hardness for use in cache keys, such that equivalent
+    specifications of the same hardness yield the same key.
+
+    Parameters
+    ----------
+    hardness : float, array_like, :obj:`ContactMechanics.PlasticSystemSpecialisations.PhaseHardness` or None
+        Hardness of a contact mechanics calculation.
+
+    Returns
+    -------
+    key : None, np.ndarray or PhaseHardness
+        None for elastic calculations (no or nonpositive scalar hardness),
+        the phase hardness map or the hardness as an array of floats.
+    """
+    if isinstance(hardness, PhaseHardness):
+        return hardness
+    if hardness is None or (np.ndim(hardness) == 0 and hardness <= 0):
+        return None
+    return np.asarray(hardness, dtype=float)
+
+
+class CacheKey(object):
+    """
+    Incremental construction of cache keys from the inputs of a calculation.
+    Arrays and phase hardness maps are hashed by their content, dictionaries
+    independent of the order of their items.
+
+    Example
+    -------
+    >>> key = CacheKey(topography.heights(), topography.physical_sizes)
+    >>> step_keys = [key.copy().update(offset).hexdigest() for offset in offsets]
+    """
+
+    def __init__(self, *values):
+        self._hash = hashlib.sha256()
+        self.update(*values)
+
+    def update(self, *values):
+        for value in values:
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, dict):
+                self.update(*sorted(value.items(), key=lambda item: item[0]))
+            elif isinstance(value, (tuple, list)):
+                self._hash.update(f'{type(value).__name__}{len(value)}'.encode())
+                self.update(*value)
+            elif isinstance(value, np.ndarray):
+                self._hash.update(f'{value.dtype.str}{value.shape}'.encode())
+                self._hash.update(np.ascontiguousarray(value).tobytes())
+            elif isinstance(value, PhaseHardness):
+                self._hash.update(b'PhaseHardness')
+                self.update(np.asarray(value.phases), np.asarray(value.values, dtype=float))
+            else:
+                self._hash.update(f'{type(value).__name__}:{value!r};'.encode())
+        return self
+
+    def copy(self):
+        key = CacheKey()
+        key._hash = self._hash.copy()
+        return key
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
@@ -28,6 +28,9 @@
 Bin for small common helper function and classes
 """
 
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
 
@@ -148,3 +151,23 @@ def get_q_from_lambda(lambda_min, lambda_max):
         q_max = 2 * np.pi / lambda_min
     q_min = 2 * np.pi / lambda_max
     return q_min, q_max
+
+
+def process_pool(nb_workers):
+    """
+    Pool of worker processes. Workers are not forked from this process,
+    since forking is unsafe once threads (e.g. of Numba kernels) have been
+    started.
+
+    Parameters
+    ----------
+    nb_workers : int or None
+        Number of worker processes. (None: number of processors)
+
+    Returns
+    -------
+    executor : concurrent.futures.ProcessPoolExecutor
+        Pool of worker processes.
+    """
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=nb_workers, mp_context=multiprocessing.get_context(start_method))
@@ -37,8 +37,10 @@ import ContactMechanics
 from ContactMechanics import FreeFFTElasticHalfSpace, PeriodicFFTElasticHalfSpace
 from SurfaceTopography import PlasticTopography, open_topography
 from ContactMechanics import make_system, make_plastic_system
+from ContactMechanics.Tools.AreaControl import ContactAreaControl
+from ContactMechanics.Tools.Continuation import ToleranceContinuation
 from ContactMechanics.Tools.Logger import Logger, quiet, screen
-from ContactMechanics.IO.NetCDF import NetCDFContainer
+from ContactMechanics.IO import AsyncWriter, NetCDFContainer
 
 ###
 
@@ -59,11 +61,13 @@ unit_to_meters = {
 
 ###
 
-def next_step(system, surface, history=None, pentol=None, maxiter=None,
-              logger=quiet):
+def next_step(system, surface, nsteps, area_control, history=None, pentol=None, maxiter=None,
+              logger=quiet, optimizer_kwargs={}):
     """
-    Run a full contact calculation. Try to guess displacement such that areas
-    are equally spaced on a log scale.
+    Run a full contact calculation. The first two steps place the rigid
+    surface at its mean height and just below its highest point. The
+    remaining steps solve for areas that are equally spaced on a log scale
+    between the areas of the first two steps.
 
     Parameters
     ----------
@@ -71,8 +75,14 @@ def next_step(system, surface, history=None, pentol=None, maxiter=None,
         The contact mechanical system.
     surface : SurfaceTopography.SurfaceTopography object
         The rigid rough surface.
+    nsteps : int
+        Total number of steps.
+    area_control : ContactMechanics.Tools.AreaControl.ContactAreaControl object
+        Solver for target contact areas, shared between all steps.
     history : tuple
         History returned by past calls to next_step
+    optimizer_kwargs : dict, optional
+        Optional arguments passed on to the optimizer. (Default: {})
 
     Returns
     -------
@@ -93,60 +103,64 @@ def next_step(system, surface, history=None, pentol=None, maxiter=None,
     # Get the profile as a numpy array
     profile = surface.heights()
 
-    # Find max, min and mean heights
+    # Find max and mean heights
     top = np.max(profile)
     middle = np.mean(profile)
-    bot = np.min(profile)
 
     if history is None:
         step = 0
+        disp, gap, load, area, converged = [], [], [], [], []
     else:
         disp, gap, load, area, converged = history
         step = len(disp)
 
+    kwargs = dict(logger=logger, pentol=pentol, maxiter=maxiter, verbose=arguments.verbose, **optimizer_kwargs)
     if step == 0:
-        disp = []
-        gap = []
-        load = []
-        area = []
-        converged = np.array([], dtype=bool)
-
-        disp0 = -middle
+        opt = area_control.minimize_proxy(offset=-middle, **kwargs)
     elif step == 1:
-        disp0 = -top + 0.01 * (top - middle)
+        opt = area_control.minimize_proxy(offset=-top + 0.01 * (top - middle), **kwargs)
     else:
-        ref_area = np.log10(np.array(area + 1 / np.prod(surface.nb_grid_pts)))
-        darea = np.append(ref_area[1:] - ref_area[:-1], -ref_area[-1])
-        i = np.argmax(darea)
-        if i == step - 1:
-            disp0 = bot + 2 * (disp[-1] - bot)
-        else:
-            disp0 = (disp[i] + disp[i + 1]) / 2
-
-    opt = system.minimize_proxy(offset=disp0, logger=logger, pentol=pentol,
-                                maxiter=maxiter, verbose=arguments.verbose)
+        pixel_area = 1 / np.prod(surface.nb_grid_pts)
+        log_max_area, log_min_area = np.log(np.array(area_control.contact_areas[:2]) + pixel_area)
+        target_area = np.exp(log_min_area + (step - 1) / (nsteps - 1) * (log_max_area - log_min_area)) - pixel_area
+        opt = area_control.minimize_proxy(contact_area=target_area, **kwargs)
+    disp0 = opt.offset
     c = opt.active_set
     f = opt.jac
     u = opt.x[:f.shape[0], :f.shape[1]]
-    disp = np.append(disp, [disp0])
-    gap = np.append(gap, [np.mean(u) - middle - disp0])
+    disp += [disp0]
+    gap += [np.mean(u) - middle - disp0]
     current_load = f.sum() / np.prod(surface.physical_sizes)
-    load = np.append(load, [current_load])
+    load += [current_load]
     current_area = (f > 0).sum() / np.prod(surface.nb_grid_pts)
-    area = np.append(area, [current_area])
-    converged = np.append(converged, np.array([opt.success], dtype=bool))
+    area += [current_area]
+    converged += [opt.success]
     logger.pr('disp = {}, area = {}, load = {}, converged = {}'
               .format(disp0, current_area, current_load, opt.success))
 
-    # Sort by area
-    disp, gap, load, area, converged = np.transpose(sorted(zip(disp, gap, load,
-                                                               area, converged),
-                                                           key=lambda x: x[3]))
-    converged = np.array(converged, dtype=bool)
-
     return c, u, f, disp0, current_load, current_area, (disp, gap, load, area, converged)
 
 
+def step_kwargs(step, nsteps):
+    """
+    Tolerances and initial displacements for a calculation step. Without
+    continuation, every step is solved from scratch to the final tolerance.
+    """
+    if continuation is None:
+        return dict(pentol=arguments.pentol)
+    kwargs = continuation.tolerances(step, nsteps, pentol)
+    if system.disp is not None:
+        kwargs['initial_displacements'] = system.disp
+    logger.pr('tolerances loosened by factor {}'.format(continuation.factor(step, nsteps)))
+    return kwargs
+
+
+def record_step(step, converged):
+    """Record whether the solver reached the tolerances of a step"""
+    if continuation is not None:
+        continuation.record(step, converged)
+
+
 def dump(txt, surface, u, f, offset=0):
     mean_elastic = np.mean(u)
     mean_rigid = np.mean(surface[...]) + offset
@@ -179,20 +193,15 @@ def dump(txt, surface, u, f, offset=0):
 
 def dump_nc(container):
     if container is not None:
-        frame = container.get_next_frame()
-        frame.displacements = u
-        frame.forces = f
-        frame.displacement = disp0
-        frame.load = load
-        frame.area = area
+        writer.write_frame(container, displacements=u, forces=f, displacement=disp0, load=load, area=area)
 
 
 def save_contact(fn, surface, substrate, pressure, macro=None):
     macrostr = ''
     if macro is not None:
         macrostr = '\n'.join(['{} = {}'.format(x, y) for x, y in macro])
-    np.savetxt(fn, pressure, fmt='%i', header=versionstr + '\n' + commandline + '\n' + macrostr +
-               'Contact map follows. Values are boolean.')
+    writer.savetxt(fn, pressure, fmt='%i', header=versionstr + '\n' + commandline + '\n' + macrostr +
+                   'Contact map follows. Values are boolean.')
 
 
 def save_pressure(fn, surface, substrate, pressure, macro=None):
@@ -204,7 +213,7 @@ def save_pressure(fn, surface, substrate, pressure, macro=None):
     macrostr = ''
     if macro is not None:
         macrostr = '\n'.join(['{} = {}'.format(x, y) for x, y in macro])
-    np.savetxt(fn, pressure, header=versionstr + '\n' + commandline + '\n' + macrostr + unitstr)
+    writer.savetxt(fn, pressure, header=versionstr + '\n' + commandline + '\n' + macrostr + unitstr)
 
 
 def save_gap(fn, surface, gap, macro=None):
@@ -216,7 +225,7 @@ def save_gap(fn, surface, gap, macro=None):
     macrostr = ''
     if macro is not None:
         macrostr = '\n'.join(['{} = {}'.format(x, y) for x, y in macro])
-    np.savetxt(fn, gap, header=versionstr + '\n' + commandline + '\n' + macrostr + unitstr)
+    writer.savetxt(fn, gap, header=versionstr + '\n' + commandline + '\n' + macrostr + unitstr)
 
 
 # Parse command line arguments
@@ -288,6 +297,11 @@ parser.add_argument('--height-unit', dest='height_unit', type=str,
 parser.add_argument('--pentol', dest='pentol', type=float,
                     help='tolerance for penetration of surface PENTOL',
                     metavar='PENTOL')
+parser.add_argument('--continuation', dest='continuation', type=float,
+                    help='start every step from the solution of the previous '
+                         'one and solve all but the last step to tolerances '
+                         'that are loosened by up to a factor LOOSENING',
+                    metavar='LOOSENING')
 parser.add_argument('--contact-fn', dest='contact_fn', type=str,
                     help='filename for contact map CONTACTFN',
                     metavar='CONTACTFN')
@@ -329,6 +343,7 @@ logger.pr('size_unit = {}'.format(arguments.size_unit))
 logger.pr('height_fac = {}'.format(arguments.height_fac))
 logger.pr('height_unit = {}'.format(arguments.height_unit))
 logger.pr('pentol = {}'.format(arguments.pentol))
+logger.pr('continuation = {}'.format(arguments.continuation))
 logger.pr('contact-fn = {}'.format(arguments.contact_fn))
 logger.pr('pressure-fn = {}'.format(arguments.pressure_fn))
 logger.pr('displ-fn = {}'.format(arguments.displ_fn))
@@ -403,144 +418,173 @@ if arguments.hardness is not None:
 else:
     system = make_system(substrate, surface)
 
+# Tolerance continuation: Only the last step is solved to the final tolerance.
+continuation = None
+if arguments.continuation is not None:
+    continuation = ToleranceContinuation(arguments.continuation, outputs=[-1])
+    pentol = arguments.pentol
+    if pentol is None:
+        # Same heuristics as in the constrained conjugate gradient solver
+        pentol = surface.rms_height_from_area() / (10 * np.mean(surface.nb_grid_pts))
+        if pentol == 0:
+            pentol = None
+
 ###
 
+# Output is written on a background thread while the next step is computed
+writer = AsyncWriter()
+
 # Create a NetCDF container to dump displacements and forces to.
 container = None
 if arguments.netcdf_fn is not None:
     container = NetCDFContainer(arguments.netcdf_fn, mode='w', double=True)
     container.set_shape(surface.nb_grid_pts)
 
-if arguments.pressure is not None or arguments.pressure_from_fn is not None:
-    if arguments.displacement is not None:
-        raise ValueError('Please specify either displacement or pressure '
-                         'range, not both.')
-
-    # Run computation for a linear range of pressures
-    if arguments.pressure is not None:
-        pressure = arguments.pressure.split(',')
-        if len(pressure) == 1:
-            pressure = [float(pressure[0])]
-        elif len(pressure) == 3:
-            pressure = np.linspace(float(pressure[0]), float(pressure[1]), int(pressure[2]))
+try:
+    if arguments.pressure is not None or arguments.pressure_from_fn is not None:
+        if arguments.displacement is not None:
+            raise ValueError('Please specify either displacement or pressure '
+                             'range, not both.')
+
+        # Run computation for a linear range of pressures
+        if arguments.pressure is not None:
+            pressure = arguments.pressure.split(',')
+            if len(pressure) == 1:
+                pressure = [float(pressure[0])]
+            elif len(pressure) == 3:
+                pressure = np.linspace(float(pressure[0]), float(pressure[1]), int(pressure[2]))
+            else:
+                print('Please specify either single pressure value or 3-tuple for '
+                      'pressure range.')
+                sys.exit(999)
+        elif arguments.pressure_from_fn is not None:
+            pressure = np.ravel(np.loadtxt(arguments.pressure_from_fn))
+
+        # Additional log file for load and area
+        txt = Logger(arguments.log_fn)
+
+        for i, _pressure in enumerate(pressure):
+            suffix = '.{}'.format(i)
+            if len(pressure) == 1:
+                suffix = ''
+            external_force = _pressure * np.prod(surface.physical_sizes)
+            logger.pr(f'external_force = {external_force}')
+            opt = system.minimize_proxy(logger=logger,
+                                        external_force=external_force,
+                                        maxiter=arguments.maxiter,
+                                        verbose=arguments.verbose,
+                                        **step_kwargs(i, len(pressure)))
+            record_step(i, opt.success)
+            c = opt.active_set
+            f = opt.jac
+            u = opt.x[:f.shape[0], :f.shape[1]]
+            logger.pr(f'displacement = {opt.offset}')
+            logger.pr(f'pressure = {f.sum() / np.prod(surface.physical_sizes)} ({_pressure})')
+            logger.pr(f'energy = {opt.fun}')
+            logger.pr(f'fractional contact area = {(f > 0).sum() / np.prod(surface.nb_grid_pts)}')
+
+            area = (f > 0).sum() / np.prod(surface.nb_grid_pts)
+            load = _pressure
+            disp0 = opt.offset
+            dump_nc(container)
+            macro = dump(txt, surface, u, f, opt.offset)
+
+            if arguments.contact_fn is not None:
+                save_contact(arguments.contact_fn + suffix, surface, substrate, c, macro=macro)
+            if arguments.pressure_fn is not None:
+                save_pressure(arguments.pressure_fn + suffix, surface, substrate, f / surface.area_per_pt, macro=macro)
+            if arguments.displ_fn is not None:
+                save_gap(arguments.displ_fn + suffix, surface, u, macro=macro)
+            if arguments.gap_fn is not None:
+                save_gap(arguments.gap_fn + suffix, surface, u - surface[...] - opt.offset, macro=macro)
+
+    elif arguments.displacement is not None:
+        # Run computation for a linear range of displacements
+
+        displacement = arguments.displacement.split(',')
+        if len(displacement) == 1:
+            displacement = [float(displacement[0])]
+        elif len(displacement) == 3:
+            displacement = np.linspace(*[float(x) for x in displacement])
         else:
-            print('Please specify either single pressure value or 3-tuple for '
-                  'pressure range.')
+            print('Please specify either single displacement value or 3-tuple for '
+                  'displacement range.')
             sys.exit(999)
-    elif arguments.pressure_from_fn is not None:
-        pressure = np.ravel(np.loadtxt(arguments.pressure_from_fn))
-
-    # Additional log file for load and area
-    txt = Logger(arguments.log_fn)
-
-    for i, _pressure in enumerate(pressure):
-        suffix = '.{}'.format(i)
-        if len(pressure) == 1:
-            suffix = ''
-        external_force = _pressure * np.prod(surface.physical_sizes)
-        logger.pr(f'external_force = {external_force}')
-        opt = system.minimize_proxy(logger=logger,
-                                    external_force=external_force,
-                                    pentol=arguments.pentol,
-                                    maxiter=arguments.maxiter,
-                                    verbose=arguments.verbose)
-        c = opt.active_set
-        f = opt.jac
-        u = opt.x[:f.shape[0], :f.shape[1]]
-        logger.pr(f'displacement = {opt.offset}')
-        logger.pr(f'pressure = {f.sum() / np.prod(surface.physical_sizes)} ({_pressure})')
-        logger.pr(f'energy = {opt.fun}')
-        logger.pr(f'fractional contact area = {(f > 0).sum() / np.prod(surface.nb_grid_pts)}')
-
-        area = (f > 0).sum() / np.prod(surface.nb_grid_pts)
-        load = _pressure
-        disp0 = opt.offset
-        dump_nc(container)
-        macro = dump(txt, surface, u, f, opt.offset)
-
-        if arguments.contact_fn is not None:
-            save_contact(arguments.contact_fn + suffix, surface, substrate, c, macro=macro)
-        if arguments.pressure_fn is not None:
-            save_pressure(arguments.pressure_fn + suffix, surface, substrate, f / surface.area_per_pt, macro=macro)
-        if arguments.displ_fn is not None:
-            save_gap(arguments.displ_fn + suffix, surface, u, macro=macro)
-        if arguments.gap_fn is not None:
-            save_gap(arguments.gap_fn + suffix, surface, u - surface[...] - opt.offset, macro=macro)
-
-elif arguments.displacement is not None:
-    # Run computation for a linear range of displacements
-
-    displacement = arguments.displacement.split(',')
-    if len(displacement) == 1:
-        displacement = [float(displacement[0])]
-    elif len(displacement) == 3:
-        displacement = np.linspace(*[float(x) for x in displacement])
-    else:
-        print('Please specify either single displacement value or 3-tuple for '
-              'displacement range.')
-        sys.exit(999)
 
-    # Additional log file for load and area
-    txt = Logger(arguments.log_fn)
+        # Additional log file for load and area
+        txt = Logger(arguments.log_fn)
+
+        for i, _displacement in enumerate(displacement):
+            suffix = '.{}'.format(i)
+            if len(displacement) == 1:
+                suffix = ''
+            opt = system.minimize_proxy(offset=_displacement, logger=logger,
+                                        maxiter=arguments.maxiter, kind='ref',
+                                        verbose=arguments.verbose,
+                                        **step_kwargs(i, len(displacement)))
+            record_step(i, opt.success)
+            c = opt.active_set
+            f = opt.jac
+            u = opt.x[:f.shape[0], :f.shape[1]]
+            logger.pr('displacement = {} ({})'.format(opt.offset, _displacement))
+            logger.pr('pressure = {}'.format(f.sum() / np.prod(surface.physical_sizes)))
+            logger.pr('energy = {}'.format(opt.fun))
+            logger.pr('fractional contact area = {}'
+                      .format((f > 0).sum() / np.prod(surface.nb_grid_pts)))
+
+            dump_nc(container)
+            macro = dump(txt, surface, u, f, opt.offset)
+
+            if arguments.contact_fn is not None:
+                save_contact(arguments.contact_fn + suffix, surface, substrate, c, macro=macro)
+            if arguments.pressure_fn is not None:
+                save_pressure(arguments.pressure_fn + suffix, surface, substrate, f / surface.area_per_pt, macro=macro)
+            if arguments.displ_fn is not None:
+                save_gap(arguments.displ_fn + suffix, surface, u, macro=macro)
+            if arguments.gap_fn is not None:
+                save_gap(arguments.gap_fn + suffix, surface, u - surface[...] - opt.offset, macro=macro)
 
-    for i, _displacement in enumerate(displacement):
-        suffix = '.{}'.format(i)
-        if len(displacement) == 1:
-            suffix = ''
-        opt = system.minimize_proxy(offset=_displacement, logger=logger,
-                                    pentol=arguments.pentol,
-                                    maxiter=arguments.maxiter, kind='ref',
-                                    verbose=arguments.verbose)
-        c = opt.active_set
-        f = opt.jac
-        u = opt.x[:f.shape[0], :f.shape[1]]
-        logger.pr('displacement = {} ({})'.format(opt.offset, _displacement))
-        logger.pr('pressure = {}'.format(f.sum() / np.prod(surface.physical_sizes)))
-        logger.pr('energy = {}'.format(opt.fun))
-        logger.pr('fractional contact area = {}'
-                  .format((f > 0).sum() / np.prod(surface.nb_grid_pts)))
-
-        dump_nc(container)
-        macro = dump(txt, surface, u, f, opt.offset)
-
-        if arguments.contact_fn is not None:
-            save_contact(arguments.contact_fn + suffix, surface, substrate, c, macro=macro)
-        if arguments.pressure_fn is not None:
-            save_pressure(arguments.pressure_fn + suffix, surface, substrate, f / surface.area_per_pt, macro=macro)
-        if arguments.displ_fn is not None:
-            save_gap(arguments.displ_fn + suffix, surface, u, macro=macro)
-        if arguments.gap_fn is not None:
-            save_gap(arguments.gap_fn + suffix, surface, u - surface[...] - opt.offset, macro=macro)
-
-else:
-    # Run computation automatically such that area is equally spaced on
-    # a log scale. This is the default when no other command line options are
-    # given.
-
-    # Additional log file for load and area
-    txt = Logger(arguments.log_fn)
-
-    history = None
-    for i in range(nsteps):
-        suffix = '.{}'.format(i)
-        if nsteps == 1:
-            suffix = ''
-
-        c, u, f, disp0, load, area, history = \
-            next_step(system, surface, history, pentol=arguments.pentol,
-                      maxiter=arguments.maxiter, logger=logger)
-
-        dump_nc(container)
-        macro = dump(txt, surface, u, f, disp0)
-
-        if arguments.contact_fn is not None:
-            save_contact(arguments.contact_fn + suffix, surface, substrate, c, macro=macro)
-        if arguments.pressure_fn is not None:
-            save_pressure(arguments.pressure_fn + suffix, surface, substrate, f / surface.area_per_pt, macro=macro)
-        if arguments.displ_fn is not None:
-            save_gap(arguments.displ_fn + suffix, surface, u, macro=macro)
-        if arguments.gap_fn is not None:
-            save_gap(arguments.gap_fn + suffix, surface, u - surface[...] - disp0, macro=macro)
-
-if container is not None:
-    container.close()
+    else:
+        # Run computation automatically such that area is equally spaced on
+        # a log scale. This is the default when no other command line options are
+        # given.
+
+        # Additional log file for load and area
+        txt = Logger(arguments.log_fn)
+
+        area_control = ContactAreaControl(system)
+        history = None
+        for i in range(nsteps):
+            suffix = '.{}'.format(i)
+            if nsteps == 1:
+                suffix = ''
+
+            kwargs = step_kwargs(i, nsteps)
+            c, u, f, disp0, load, area, history = \
+                next_step(system, surface, nsteps, area_control, history, pentol=kwargs.pop('pentol'),
+                          maxiter=arguments.maxiter, logger=logger,
+                          optimizer_kwargs=kwargs)
+            # The last entry of the history records the convergence of each step
+            record_step(i, history[-1][-1])
+
+            dump_nc(container)
+            macro = dump(txt, surface, u, f, disp0)
+
+            if arguments.contact_fn is not None:
+                save_contact(arguments.contact_fn + suffix, surface, substrate, c, macro=macro)
+            if arguments.pressure_fn is not None:
+                save_pressure(arguments.pressure_fn + suffix, surface, substrate, f / surface.area_per_pt, macro=macro)
+            if arguments.displ_fn is not None:
+                save_gap(arguments.displ_fn + suffix, surface, u, macro=macro)
+            if arguments.gap_fn is not None:
+                save_gap(arguments.gap_fn + suffix, surface, u - surface[...] - disp0, macro=macro)
+
+    if continuation is not None:
+        logger.pr('solved to final tolerance = {}'.format(continuation.at_final_tolerance))
+finally:
+    # Pending output is written even if the calculation fails
+    try:
+        writer.close()
+    finally:
+        if container is not None:
+            container.close()
@@ -0,0 +1,66 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Number of iterations of the fixed-point loops with simple and Anderson mixing:
+the Greenwood-Tripp reference solution and the plastic overrelaxation of the
+constrained conjugate gradient solver (at the configurations of the tests).
+"""
+
+import time
+
+import numpy as np
+
+from SurfaceTopography import Topography
+
+from ContactMechanics import PeriodicFFTElasticHalfSpace
+from ContactMechanics.Optimization import constrained_conjugate_gradients
+import ContactMechanics.ReferenceSolutions.GreenwoodTripp as GT
+
+print('Greenwood-Tripp')
+print('d       mixing     nit    time')
+μ = 24.0425586841
+for d in [0.5, 1.0, 2.0]:
+    for mixing in ['simple', 'anderson']:
+        iterations = []
+        start = time.time()
+        GT.GreenwoodTripp(d, μ, mixing=mixing, callback=lambda it, p: iterations.append(it))
+        print(f'{d:<7} {mixing:<10} {iterations[-1]:<6} {time.time() - start:.2f} s')
+
+print()
+print('Plastic overrelaxation (force control)')
+print('hardness  force    mixing     nit    time')
+nx, ny = 64, 64
+x, y = np.mgrid[:nx, :ny] / nx
+topography = Topography(0.01 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y) - 2), physical_sizes=(1., 1.))
+substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1.0, physical_sizes=(1., 1.))
+for hardness in [0.001, 0.01, 0.1]:
+    for nb_pts in [100, 500, 2000]:
+        external_force = nb_pts * hardness * topography.area_per_pt
+        for mixing in ['simple', 'anderson']:
+            start = time.time()
+            sol = constrained_conjugate_gradients(
+                substrate, topography, hardness=hardness * topography.area_per_pt, external_force=external_force,
+                plastic_solver='mix', mixing=mixing, pentol=1e-6, maxiter=5000)
+            print(f'{hardness:<9} {external_force:<8.2g} {mixing:<10} {sol.nit:<6} {time.time() - start:.2f} s')
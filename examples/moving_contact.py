@@ -32,11 +32,7 @@ import numpy as np
 
 from ContactMechanics import PeriodicFFTElasticHalfSpace
 from SurfaceTopography import read_topography
-from SurfaceTopography.UniformLineScanAndTopography import \
-    TranslatedTopography, \
-    CompoundTopography
-from ContactMechanics import make_system
-# from PyCo.Tools import compute_rms_height
+from ContactMechanics.SlidingContact import SlidingContact
 from ContactMechanics.IO.NetCDF import NetCDFContainer
 
 ###
@@ -63,22 +59,13 @@ print('RMS heights of surfaces = {} {}'.format(surface1.rms_height_from_area(),
 # This is the grid nb_grid_pts of the two surfaces.
 nx, ny = surface1.nb_grid_pts
 
-# TranslatedSurface knows how to translate a surface into some direction.
-translated_surface1 = TranslatedTopography(surface1)
-
-# This is the compound of the two surfaces, effectively creating a surface
-# that is the difference between the two profiles.
-compound_surface = CompoundTopography(translated_surface1, surface2)
-
 # Periodic substrate and hard-wall interactions.
 substrate = PeriodicFFTElasticHalfSpace((nx, ny), E_s, (sx, sx))
 
-# This creates a "System" object that knows about substrate, interaction and
-# surface.
-system = make_system(substrate, compound_surface)
-
-# Initial displacement field.
-disp = np.zeros(surface1.shape)
+# SlidingContact translates surface1 over surface2 (by Fourier phase shifts,
+# hence also by fractions of a pixel). The contact problem is solved for the
+# compound of the two surfaces, i.e. the sum of the profiles.
+sliding = SlidingContact(substrate, surface1, surface2)
 
 # Dump some information to this NetCDF file. Inspect the NetCDF with the
 # 'ncdump' command.
@@ -88,38 +75,34 @@ container.set_shape(surface2)
 # This creates a field called 'surface2' inside the NetCDF file.
 container.surface2 = surface2.heights()
 
-# Loop over nd displacement steps.
+# Loop over nd displacement steps (in units of pixels along x). Every step
+# starts from the forces of the previous step.
 nd = 3
 step_size = 24
-for i, c in zip(range(0, step_size * nd, step_size), ['r', 'g', 'b', 'y']):
-    print(i)
-    xshift = i
-    # Set the offset of the translated surface, i.e. the translation vector
-    # with respect to the untranslated surface.
-    translated_surface1.set_offset(xshift, 0)
-
+translations = [(i * sx / nx, 0) for i in range(0, step_size * nd, step_size)]
+for opt, c in zip(sliding.steps(translations, offset=-0.012), ['r', 'g', 'b', 'y']):
     # Solve the contact problem for a constant relative displacement (offset).
-    opt = system.minimize_proxy(offset=-0.012, initial_displacements=disp)
     # Alternative: Solve it with external force as boundary conditions
-    # opt = system.minimize_proxy(external_force=0.01, disp0=disp)
+    # sliding.steps(translations, external_force=0.01)
     disp = opt.x  # This is the displacement field
     forces = opt.jac  # These are the forces/pressures
     offset = opt.offset  # The relative displacement of the two surfaces
 
     # Note: Either force or offset printed in screen should correspond to what
     # you have specified above.
-    print('Total force: {}, Offset: {}'.format(forces.sum(), offset))
+    print('Translation: {}, Total force: {}, Offset: {}'.format(opt.translation, forces.sum(), offset))
 
-    # Dump the information to the NetCDF file.
+    # Dump the information to the NetCDF file. (SlidingContact.run writes
+    # the frames without user intervention.)
     frame = container.get_next_frame()
-    frame.translated_surface1 = translated_surface1.heights()
+    frame.compound_surface = sliding.topography.heights()
     frame.displacements = disp
-    frame.forces = disp
+    frame.forces = forces
 
     # Reconstruct the deformed surfaces for plotting. Note that here we assume
     # that the two moduli are the same and half of the displacement is
     # carried by the top and the other half by the bottom surface.
-    top_surface = -translated_surface1[:, :] + disp / 2 - offset
+    top_surface = -(sliding.topography.heights() - surface2.heights()) + disp / 2 - offset
     bottom_surface = surface2[:, :] - disp / 2
 
     plt.plot(np.arange(nx), top_surface[:, 150], c + '-')
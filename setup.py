@@ -59,5 +59,8 @@ setup(
         'NuMPI>=0.3.0',
         'muFFT>=0.18.1',
         'SurfaceTopography>=1.0'
-    ]
+    ],
+    extras_require={
+        'numba': ['numba']
+    }
 )
@@ -72,6 +72,20 @@ class ReferenceSolutionsTest(unittest.TestCase):
         # plt.yscale('log')
         # plt.show()
 
+    def test_anderson_mixing(self):
+        μ = 24.0425586841
+        nb_iterations = {}
+        solutions = {}
+        for mixing in ['simple', 'anderson']:
+            iterations = []
+            solutions[mixing] = GT.GreenwoodTripp(1.0, μ, mixing=mixing,
+                                                  callback=lambda it, p: iterations.append(it))
+            nb_iterations[mixing] = iterations[-1]
+
+        self.assertLess(nb_iterations['anderson'], nb_iterations['simple'])
+        for x1, x2 in zip(solutions['simple'], solutions['anderson']):
+            np.testing.assert_allclose(x1, x2, atol=1e-5)
+
     def test_Hertz_selfconsistency(self):
         Es, R, F = np.random.random(3) * 100
         self.assertAlmostEqual(Hz.normal_load(Hz.penetration(F, R, Es), R, Es),
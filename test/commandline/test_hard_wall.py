@@ -62,3 +62,21 @@ def test_hardwall_plastic(env, tmp_dir):
         # plt.hist(pressures.reshape(-1))
         # plt.axvline(hardness)
         # plt.show(block=True)
+
+
+def test_hardwall_continuation(env, tmp_dir):
+    nx, ny = 64, 64
+    x, y = np.mgrid[:nx, :ny] / nx
+    topography = Topography(np.cos(2 * np.pi * x) * np.cos(2 * np.pi * y), physical_sizes=(1., 1.))
+
+    topo_fn = f'{tmp_dir}/cosine.nc'
+    topography.to_netcdf(topo_fn)
+
+    log_fns = [f'{tmp_dir}/plain.out', f'{tmp_dir}/continuation.out']
+    for log_fn, extra_args in zip(log_fns, [[], ["--continuation", "100"]]):
+        call = ["hard_wall.py", topo_fn, "--pressure", "0.01,0.1,4", "--log-fn", log_fn] + extra_args
+        assert subprocess.check_call(call, env=env, cwd=tmp_dir) == 0
+
+    plain, continuation = (np.loadtxt(log_fn) for log_fn in log_fns)
+    # The last step is solved to the final tolerance
+    np.testing.assert_allclose(continuation[-1], plain[-1], rtol=1e-3)
@@ -0,0 +1,127 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+from SurfaceTopography import make_sphere
+
+from ContactMechanics import make_system
+from ContactMechanics.Interactions import Dugdale, Exponential, LennardJones93
+from ContactMechanics.Systems import SmoothContactSystem
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+@pytest.mark.parametrize('potential', [Exponential(0.7, 0.5), LennardJones93(0.7, 0.5), Dugdale(0.7, 0.5)])
+def test_potential_derivatives(potential):
+    # Avoid the kink of the Dugdale potential
+    gap = np.linspace(-0.4, 3, 1001)
+    gap = gap[np.abs(gap - 0.5) > 1e-3]
+    h = 1e-6
+
+    out = tuple(np.empty_like(gap) for i in range(3))
+    energy, gradient, curvature = potential.evaluate(gap, gradient=True, curvature=True, out=out)
+    assert all(a is b for a, b in zip((energy, gradient, curvature), out))
+
+    np.testing.assert_allclose((potential.evaluate(gap + h)[0] - potential.evaluate(gap - h)[0]) / (2 * h),
+                               gradient, atol=1e-6 * np.abs(gradient).max())
+    np.testing.assert_allclose((potential.evaluate(gap + h, potential=False, gradient=True)[1] -
+                                potential.evaluate(gap - h, potential=False, gradient=True)[1]) / (2 * h),
+                               curvature, atol=1e-4 * np.abs(curvature).max())
+
+    # Quantities do not depend on which other quantities are requested
+    _, gradient_only, _ = potential.evaluate(gap, potential=False, gradient=True)
+    np.testing.assert_allclose(gradient_only, gradient)
+    _, _, curvature_only = potential.evaluate(gap, potential=False, curvature=True)
+    np.testing.assert_allclose(curvature_only, curvature)
+
+    # Energy per area in contact equals the work of adhesion
+    np.testing.assert_allclose(potential.evaluate(np.zeros(1))[0], -potential.work_of_adhesion)
+
+
+@pytest.mark.parametrize('substrate', ['periodic', 'free'])
+@pytest.mark.parametrize('potential', [Exponential(1e-4, 0.01), LennardJones93(1e-4, 0.01)])
+def test_objective_and_hessian_product(substrate, potential):
+    topography = make_sphere(0.3, (32, 32), (1., 1.), kind="paraboloid")
+    system = make_system(substrate, topography, young=1., interaction=potential)
+    assert isinstance(system, SmoothContactSystem)
+
+    offset = 0.002
+    fun = system.objective(offset, gradient=True)
+    shape = system.substrate.nb_subdomain_grid_pts
+    rng = np.random.default_rng(0)
+    disp = 0.003 + 1e-3 * rng.random(shape).ravel()
+    direction = 1e-3 * rng.random(disp.shape)
+    h = 1e-4
+
+    energy_plus, gradient_plus = fun(disp + h * direction)
+    gradient_plus = gradient_plus.copy()
+    energy_minus, gradient_minus = fun(disp - h * direction)
+    gradient_minus = gradient_minus.copy()
+    energy, gradient = fun(disp)
+
+    np.testing.assert_allclose((energy_plus - energy_minus) / (2 * h), gradient @ direction, rtol=1e-6)
+    hessp = system.hessian_product(direction)
+    assert hessp.shape == direction.shape
+    np.testing.assert_allclose((gradient_plus - gradient_minus) / (2 * h), hessp, atol=1e-8 * np.abs(hessp).max())
+
+
+@pytest.mark.parametrize('substrate', ['periodic', 'free'])
+@pytest.mark.parametrize('potential', [Exponential(1e-9, 0.01), Dugdale(1e-9, 0.01)])
+def test_vanishing_adhesion(substrate, potential):
+    # Hard-wall potentials without adhesion reproduce non-adhesive contact
+    topography = make_sphere(0.3, (32, 32), (1., 1.), kind="paraboloid")
+    offset = 0.002
+
+    system = make_system(substrate, topography, young=1.)
+    result = system.minimize_proxy(offset=offset, pentol=1e-10)
+    assert result.success
+    normal_force = system.compute_normal_force()
+
+    system = make_system(substrate, topography, young=1., interaction=potential)
+    result = system.minimize_proxy(offset, options=dict(gtol=1e-14, ftol=1e-20))
+    assert result.success
+    np.testing.assert_allclose(system.compute_normal_force(), normal_force, rtol=1e-3)
+    assert system.compute_nb_contact_pts() > 0
+
+
+def test_soft_wall_adhesion():
+    topography = make_sphere(0.3, (32, 32), (1., 1.), kind="paraboloid")
+    offset = 0.002
+
+    forces = []
+    for work_of_adhesion in [1e-6, 1e-5]:
+        system = make_system('periodic', topography, young=1.,
+                             interaction=LennardJones93(work_of_adhesion, 0.001))
+        result = system.minimize_proxy(offset, options=dict(gtol=1e-14, ftol=1e-20, maxiter=5000))
+        assert result.success, result.message
+        forces += [system.compute_normal_force()]
+        # The repulsive core limits the penetration
+        assert system.gap.min() > -0.001
+    # Adhesion reduces the repulsive force
+    assert forces[1] < forces[0]
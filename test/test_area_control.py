@@ -0,0 +1,92 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+Tests for contact calculations at prescribed contact areas
+"""
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+
+from SurfaceTopography import Topography
+from SurfaceTopography.Generation import fourier_synthesis
+
+from ContactMechanics import PeriodicFFTElasticHalfSpace, make_system, make_plastic_system
+from ContactMechanics.Tools.AreaControl import ContactAreaControl
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+@pytest.fixture
+def topography():
+    nx, ny = 64, 64
+    x, y = np.mgrid[:nx, :ny] / nx
+    return Topography(np.cos(2 * np.pi * x) * np.cos(4 * np.pi * y) + 0.5 * np.sin(6 * np.pi * x),
+                      physical_sizes=(1., 1.), periodic=True)
+
+
+def test_target_contact_areas():
+    np.random.seed(1)
+    topography = fourier_synthesis((128, 128), (1., 1.), 0.8, rms_slope=0.1, short_cutoff=4 / 128)
+    substrate = PeriodicFFTElasticHalfSpace(topography.nb_grid_pts, 1., topography.physical_sizes)
+    control = ContactAreaControl(make_system(substrate, topography), rtol=0.05)
+    nb_solves = []
+    for contact_area in np.logspace(-2, -0.5, 6):
+        nb_solves_before = control.nb_solves
+        result = control.minimize_proxy(contact_area=contact_area)
+        nb_solves += [control.nb_solves - nb_solves_before]
+        assert result.success
+        assert abs(result.contact_area / contact_area - 1) <= 0.05
+        assert result.contact_area == (result.jac > 0).sum() / np.prod(topography.nb_grid_pts)
+        assert result.offset == control.offsets[-1]
+    # Later targets profit from earlier calculations
+    assert max(nb_solves[1:]) <= 3
+    # Contact area increases with offset
+    order = np.argsort(control.offsets)
+    assert np.all(np.diff(np.array(control.contact_areas)[order]) >= 0)
+
+    # A previously reached area is recalculated at the same offset
+    offset = result.offset
+    result = control.minimize_proxy(contact_area=contact_area)
+    assert result.offset == offset
+
+    with pytest.raises(ValueError):
+        control.minimize_proxy(offset=0.5, contact_area=0.1)
+
+
+def test_plastic_displacements_are_restored(topography):
+    substrate = PeriodicFFTElasticHalfSpace(topography.nb_grid_pts, 1., topography.physical_sizes)
+    system = make_plastic_system(substrate, topography, hardness=0.5)
+    control = ContactAreaControl(system)
+    result = control.minimize_proxy(contact_area=0.2)
+    assert control.nb_solves > 1
+    plastic_displ = system.surface.plastic_displ.copy()
+
+    # The plastic displacements are those of a single calculation
+    system.surface.plastic_displ[...] = 0
+    system.minimize_proxy(offset=result.offset)
+    np.testing.assert_allclose(system.surface.plastic_displ, plastic_displ)
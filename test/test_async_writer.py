@@ -0,0 +1,97 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Tests for the background writer
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+
+from ContactMechanics.IO import AsyncWriter, NetCDFContainer
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+def test_write(tmp_path):
+    nx, ny = 8, 6
+    fn = str(tmp_path / 'frames.nc')
+    container = NetCDFContainer(fn, mode='w', double=True)
+    container.set_shape((nx, ny))
+    buffer = np.empty((nx, ny))
+    with AsyncWriter(max_pending=2, fsync=True) as writer:
+        for i in range(5):
+            # The writer copies, the buffer can be reused immediately
+            buffer[...] = i
+            writer.write_frame(container, offset=0.1 * i, forces=buffer)
+            writer.savetxt(str(tmp_path / f'forces.{i}'), buffer, header=f'frame {i}')
+        writer.flush()
+        assert len(container) == 5
+    container.close()
+
+    container = NetCDFContainer(fn)
+    assert len(container) == 5
+    for i, frame in enumerate(container):
+        np.testing.assert_allclose(frame.offset, 0.1 * i)
+        np.testing.assert_allclose(frame.forces, i)
+        np.testing.assert_allclose(np.loadtxt(tmp_path / f'forces.{i}'), i)
+    container.close()
+
+
+def test_backpressure():
+    release = threading.Event()
+    writer = AsyncWriter(max_pending=1)
+    # The first job blocks the writer thread, the second fills the queue
+    writer.submit(release.wait)
+    writer.submit(lambda: None)
+    blocked = threading.Thread(target=writer.submit, args=(lambda: None,))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+    release.set()
+    blocked.join()
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(lambda: None)
+
+
+def test_errors(tmp_path):
+    written = []
+    writer = AsyncWriter()
+    writer.savetxt(str(tmp_path / 'missing' / 'file.out'), np.zeros(3))
+    writer.submit(written.append, 1)
+    with pytest.raises(FileNotFoundError):
+        writer.flush()
+    # Jobs after the failure are skipped
+    assert written == []
+    with pytest.raises(FileNotFoundError):
+        writer.close()
+    with pytest.raises(ValueError):
+        AsyncWriter(max_pending=0)
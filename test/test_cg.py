@@ -21,3 +21,71 @@ def test_heuristic_pentol():
 
     system = make_system(surface=topo, substrate="periodic", young=1)
     system.minimize_proxy(offset=-0.5)
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'numba'])
+@pytest.mark.parametrize('hardness', [None, 0.02])
+@pytest.mark.parametrize('substrate', ['periodic', 'free'])
+def test_kernel_backends(backend, hardness, substrate):
+    if backend == 'numba':
+        pytest.importorskip('numba')
+    from ContactMechanics.Optimization import constrained_conjugate_gradients
+
+    nx, ny = (32, 32)
+    x, y = np.mgrid[:nx, :ny] / nx
+    topo = Topography(np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y), physical_sizes=(1, 1), periodic=True)
+    system = make_system(surface=topo, substrate=substrate, young=1)
+
+    kwargs = dict(offset=-1.5) if hardness is None else dict(external_force=0.05, hardness=hardness)
+    ref = constrained_conjugate_gradients(system.substrate, topo, backend='numpy', **kwargs)
+    sol = constrained_conjugate_gradients(system.substrate, topo, backend=backend, **kwargs)
+    assert ref.success and sol.success
+    assert sol.nit == ref.nit
+    np.testing.assert_allclose(sol.jac, ref.jac, atol=1e-10 * np.max(abs(ref.jac)))
+
+
+def test_kernel_project_forces():
+    from ContactMechanics.Optimization.Kernels import get_kernels
+
+    for backend in ['numpy', 'auto']:
+        kernels = get_kernels(backend)
+        f = np.array([[0.5, -0.2], [-1.5, -1.0]], order='F')
+        mask_tensile, mask_flowing, max_tensile, max_flowing = kernels.project_forces(f, 1.0, truncate=True)
+        np.testing.assert_array_equal(mask_tensile, [[True, False], [False, False]])
+        np.testing.assert_array_equal(mask_flowing, [[False, False], [True, True]])
+        assert max_tensile == 0.5
+        assert max_flowing == 0.5
+        np.testing.assert_array_equal(f, [[0, -0.2], [-1, -1]])
+
+
+def test_unknown_kernel_backend():
+    from ContactMechanics.Optimization.Kernels import get_kernels
+    with pytest.raises(ValueError):
+        get_kernels('fortran')
+
+
+@pytest.mark.parametrize('hardness', [None, 0.02])
+@pytest.mark.parametrize('substrate', ['periodic', 'free'])
+def test_nonblocking_diagnostics(hardness, substrate):
+    from ContactMechanics.Optimization import constrained_conjugate_gradients
+
+    nx, ny = (32, 32)
+    x, y = np.mgrid[:nx, :ny] / nx
+    topo = Topography(np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y), physical_sizes=(1, 1), periodic=True)
+    system = make_system(surface=topo, substrate=substrate, young=1)
+
+    kwargs = dict(offset=-1.5) if hardness is None else dict(external_force=0.05, hardness=hardness)
+    ref_iterations = []
+    ref = constrained_conjugate_gradients(system.substrate, topo,
+                                          callback=lambda it, f, d: ref_iterations.append(it), **kwargs)
+    iterations = []
+    sol = constrained_conjugate_gradients(system.substrate, topo, nonblocking=True,
+                                          callback=lambda it, f, d: iterations.append(it), **kwargs)
+    assert ref.success and sol.success
+    # The lagged convergence decision returns the same iterate
+    assert sol.nit == ref.nit
+    assert iterations == ref_iterations
+    np.testing.assert_array_equal(sol.jac, ref.jac)
+    np.testing.assert_array_equal(sol.active_set, ref.active_set)
+    assert sol.offset == ref.offset
+    assert sol.maxcv == ref.maxcv
@@ -0,0 +1,91 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import numpy as np
+import pytest
+
+from SurfaceTopography import make_sphere, Topography
+
+from ContactMechanics import PeriodicFFTElasticHalfSpace, make_system
+from ContactMechanics.Tools.ContactMorphology import ContactIslands
+
+
+@pytest.mark.parametrize('periodic', [True, False])
+def test_islands_of_stripes(periodic):
+    # Stripes touching both boundaries along the first axis, which are
+    # connected only through the periodic images
+    mask = np.zeros((8, 6), dtype=bool)
+    mask[:2, 1] = mask[-2:, 1] = True
+    mask[:, 4] = True
+    mask[3, 2] = True
+    islands = ContactIslands(mask, periodic=periodic, physical_sizes=(4., 3.))
+    if periodic:
+        assert islands.nb_islands == 3
+        np.testing.assert_allclose(sorted(islands.areas), [0.25, 1., 2.])
+        # Island wrapping around the boundary has 4 pixels
+        assert islands.labels[0, 1] == islands.labels[-1, 1]
+        np.testing.assert_allclose(sorted(islands.perimeters), [2., 5., 8.])
+    else:
+        assert islands.nb_islands == 4
+        np.testing.assert_allclose(sorted(islands.areas), [0.25, 0.5, 0.5, 2.])
+        assert islands.labels[0, 1] != islands.labels[-1, 1]
+        np.testing.assert_allclose(sorted(islands.perimeters), [2., 3., 3., 9.])
+    assert set(np.unique(islands.labels)) == set(range(islands.nb_islands + 1))
+    counts, bin_edges = islands.size_distribution(bins=[0, 1, 3])
+    np.testing.assert_array_equal(counts, [islands.nb_islands - 2, 2] if periodic else [3, 1])
+
+
+def test_domain_decomposition(comm):
+    nx, ny = 64, 48
+    rng = np.random.default_rng(1)
+    mask = rng.random((nx, ny)) < 0.5
+
+    reference = ContactIslands(mask, periodic=True)
+
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1., physical_sizes=(nx, ny), fft='mpi', communicator=comm)
+    islands = ContactIslands(mask[substrate.subdomain_slices], periodic=True,
+                             nb_domain_grid_pts=(nx, ny),
+                             subdomain_locations=substrate.subdomain_locations,
+                             communicator=comm)
+    assert islands.nb_islands == reference.nb_islands
+    np.testing.assert_array_equal(np.sort(islands.areas), np.sort(reference.areas))
+    np.testing.assert_array_equal(np.sort(islands.perimeters), np.sort(reference.perimeters))
+    # Labels are a permutation of the serial labels
+    local_reference = reference.labels[substrate.subdomain_slices]
+    pairs = np.unique(np.stack([local_reference.ravel(), islands.labels.ravel()]), axis=1)
+    assert len(np.unique(pairs[0])) == len(np.unique(pairs[1])) == pairs.shape[1]
+
+
+def test_contact_islands_of_system():
+    nx, ny = 64, 64
+    sphere = make_sphere(1., (nx, ny), (1., 1.), kind="paraboloid")
+    # Move the apex to the corner such that the contact wraps around
+    topography = Topography(np.roll(sphere.heights(), (nx // 2, ny // 2), axis=(0, 1)), (1., 1.), periodic=True)
+    system = make_system(substrate='periodic', surface=topography, young=1.)
+    system.minimize_proxy(offset=0.005)
+
+    islands = system.compute_contact_islands()
+    assert islands.nb_islands == 1
+    np.testing.assert_allclose(islands.areas, system.compute_contact_area())
+    assert islands.perimeters[0] > 0
@@ -0,0 +1,115 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+from SurfaceTopography import PlasticTopography, Topography
+
+from ContactMechanics import PeriodicFFTElasticHalfSpace, make_plastic_system, make_system
+from ContactMechanics.CyclicLoading import CyclicLoading
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+def make_sphere_system(nx=64, hardness=0.03):
+    x = (np.arange(nx) - nx / 2) / nx
+    topography = Topography(-(x.reshape(-1, 1) ** 2 + x.reshape(1, -1) ** 2) / 2, (1., 1.), periodic=True)
+    substrate = PeriodicFFTElasticHalfSpace((nx, nx), 1., (1., 1.))
+    return make_plastic_system(substrate, PlasticTopography(topography, hardness=hardness))
+
+
+def test_masked_plastic_update():
+    system = make_sphere_system()
+    system.minimize_proxy(offset=0.005, pentol=1e-10)
+    initial_plastic_displ = system.surface.plastic_displ.copy()
+    undeformed_heights = system.surface.parent_topography.heights()
+
+    result = system.minimize_proxy(offset=0.01, pentol=1e-10)
+    assert result.success
+    assert np.count_nonzero(result.plastic) > 0
+    gap = system.disp[system.comp_slice] - (undeformed_heights + initial_plastic_displ) - system.offset
+    np.testing.assert_allclose(system.surface.plastic_displ,
+                               initial_plastic_displ + np.where(result.plastic, gap, 0.), atol=1e-15)
+    # Heights have been invalidated
+    np.testing.assert_allclose(system._heights(system.offset),
+                               undeformed_heights + system.surface.plastic_displ + system.offset, atol=1e-15)
+
+
+def test_shakedown():
+    system = make_sphere_system()
+    cycles = CyclicLoading(system)
+    path = np.concatenate([np.linspace(0, 0.01, 6), np.linspace(0.01, 0, 6)[1:]])
+
+    plastic_displ = []
+    for i in range(3):
+        summary, = cycles.run(path, pentol=1e-10)
+        plastic_displ += [system.surface.plastic_displ.copy()]
+    assert cycles.nb_cycles == 3
+
+    first, *later = cycles.cycles
+    # Plastic flow and dissipation in the first cycle only
+    assert first['residual_depth'] > 0
+    assert first['hysteresis'] > 0
+    for summary in later:
+        assert abs(summary['hysteresis']) < 1e-6 * first['hysteresis']
+        assert abs(summary['residual_depth'] - first['residual_depth']) < 1e-6 * first['residual_depth']
+        # Changes are confined to the contact area
+        assert 0 < summary['nb_changed'] < np.prod(system.substrate.nb_grid_pts) / 10
+
+    # Unloading to zero offset lifts the plastically deformed surface
+    for summary in cycles.cycles:
+        assert len(summary['normal_forces']) == len(path)
+        assert summary['contact_areas'][-1] == 0
+        assert summary['normal_forces'][-1] == 0
+
+    # Reconstruction of the history
+    for i in range(3):
+        np.testing.assert_array_equal(cycles.plastic_displacement(i), plastic_displ[i])
+    np.testing.assert_array_equal(cycles.plastic_displacement(), system.surface.plastic_displ)
+
+
+def test_force_control():
+    system = make_sphere_system()
+    cycles = CyclicLoading(system)
+    summary, = cycles.run([1e-4, 5e-4, 1e-4], control='force', pentol=1e-10)
+    np.testing.assert_allclose(summary['normal_forces'], [1e-4, 5e-4, 1e-4], rtol=1e-6)
+    assert summary['plastic_areas'][1] > 0
+    # Plastic deformation is permanent
+    assert summary['plastic_areas'][2] == summary['plastic_areas'][1]
+    assert summary['offsets'][2] > summary['offsets'][0]
+
+
+def test_elastic_system():
+    x = np.arange(16) / 16
+    system = make_system(PeriodicFFTElasticHalfSpace((16, 16), 1., (1., 1.)),
+                         Topography(np.sin(2 * np.pi * x).reshape(-1, 1) * np.ones(16), (1., 1.)))
+    with pytest.raises(ValueError):
+        CyclicLoading(system)
+    with pytest.raises(ValueError):
+        CyclicLoading(make_sphere_system()).run([0.01], control='displacement')
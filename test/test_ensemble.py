@@ -0,0 +1,122 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+Tests for contact mechanics of ensembles of topographies
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+
+from SurfaceTopography.Generation import fourier_synthesis
+
+from ContactMechanics.Ensemble import Ensemble, RunningStatistics
+from ContactMechanics.PlasticSystemSpecialisations import PhaseHardness
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+pressures = [0.01, 0.05]
+
+
+def realizations(nb_members):
+    for seed in range(nb_members):
+        np.random.seed(seed)
+        yield fourier_synthesis((32, 32), (1., 1.), 0.8, rms_slope=0.1, short_cutoff=4 / 32)
+
+
+@pytest.fixture(scope='module')
+def reference():
+    results = np.array([topography.contact_mechanics(pressures=pressures)[:4] for topography in realizations(4)])
+    return dict(zip(['mean_pressure', 'total_contact_area', 'mean_displacement', 'mean_gap'],
+                    np.moveaxis(results, 1, 0)))
+
+
+def check_statistics(statistics, reference, nb_members=4):
+    for name, values in reference.items():
+        assert statistics[name].count == nb_members
+        np.testing.assert_allclose(statistics[name].mean, values[:nb_members].mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(statistics[name].variance, values[:nb_members].var(axis=0, ddof=1),
+                                   rtol=1e-8, atol=1e-20)
+
+
+def test_running_statistics():
+    values = np.random.random((10, 3))
+    statistics = RunningStatistics()
+    for value in values:
+        statistics.update(value)
+    np.testing.assert_allclose(statistics.mean, values.mean(axis=0))
+    np.testing.assert_allclose(statistics.variance, values.var(axis=0, ddof=1))
+    np.testing.assert_allclose(statistics.standard_error, values.std(axis=0, ddof=1) / np.sqrt(10))
+
+
+@pytest.mark.parametrize('nb_workers', [None, 2])
+def test_ensemble(reference, nb_workers):
+    ensemble = Ensemble(pressures=pressures)
+    statistics = ensemble.run(realizations(4), nb_workers=nb_workers)
+    assert ensemble.nb_members == 4
+    check_statistics(statistics, reference)
+
+
+def test_resume(reference, tmp_path):
+    checkpoint = str(tmp_path / 'ensemble')
+    Ensemble(pressures=pressures, checkpoint=checkpoint).run(realizations(2))
+    # One file per member and one that identifies the calculation
+    assert sorted(fn.endswith('.npz') for fn in os.listdir(checkpoint)) == [False, True, True]
+
+    computed = []
+    ensemble = Ensemble(pressures=pressures, checkpoint=checkpoint)
+    assert ensemble.nb_members == 2
+    statistics = ensemble.run(realizations(4), callback=lambda key, values, converged: computed.append(key))
+    # Only the members missing from the checkpoint are computed
+    assert len(computed) == 2
+    check_statistics(statistics, reference)
+
+    with pytest.raises(ValueError):
+        Ensemble(pressures=[0.1], checkpoint=checkpoint)
+
+
+def test_checkpoint_phase_hardness(tmp_path):
+    checkpoint = str(tmp_path / 'ensemble')
+    phases = np.arange(32 * 32).reshape(32, 32) % 2
+    Ensemble(pressures=pressures, hardness=PhaseHardness(phases, [1., 2.]), checkpoint=checkpoint)
+    # Identical phase maps identify the same calculation...
+    Ensemble(pressures=pressures, hardness=PhaseHardness(phases.copy(), [1., 2.]), checkpoint=checkpoint)
+    # ...different phase maps do not
+    with pytest.raises(ValueError):
+        Ensemble(pressures=pressures, hardness=PhaseHardness(1 - phases, [1., 2.]), checkpoint=checkpoint)
+
+
+def test_directory(reference, tmp_path):
+    for i, topography in enumerate(realizations(3)):
+        topography.to_netcdf(os.path.join(tmp_path, f'topography-{i}.nc'))
+    statistics = Ensemble(pressures=pressures).run(str(tmp_path))
+    check_statistics(statistics, {name: values[:3] for name, values in reference.items()}, nb_members=3)
+
+    with pytest.raises(ValueError):
+        Ensemble(pressures=pressures, offsets=[0.1])
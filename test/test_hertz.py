@@ -207,3 +207,40 @@ def test_constrained_conjugate_gradients(nb_grid_pts, comm):
         except ValueError as err:
             msg = str(err) + msg
             raise ValueError(msg)
+
+
+@pytest.mark.parametrize("control", ["offsets", "external_forces"])
+def test_lockstep_constrained_conjugate_gradients(control, comm):
+    from ContactMechanics.Optimization import constrained_conjugate_gradients, \
+        lockstep_constrained_conjugate_gradients
+
+    r_s = 20.0
+    E_s = 102.
+    nx, ny = 128, 127
+    sx = 5.0
+
+    substrate = FreeFFTElasticHalfSpace((nx, ny), E_s, (sx, sx),
+                                        fft='mpi',
+                                        communicator=comm)
+    surface = make_sphere(
+        r_s, (nx, ny), (sx, sx),
+        nb_subdomain_grid_pts=substrate.topography_nb_subdomain_grid_pts,
+        subdomain_locations=substrate.topography_subdomain_locations,
+        communicator=substrate.communicator)
+
+    values = [0.05, 0.1, 0.2] if control == "offsets" else [1.0, 5.0, 15.0]
+    results = lockstep_constrained_conjugate_gradients(substrate, surface, **{control: values})
+    assert len(results) == len(values)
+
+    reduction = Reduction(comm)
+    for value, result in zip(values, results):
+        assert result.success
+        ref = constrained_conjugate_gradients(substrate, surface, **{control[:-1]: value})
+        npt.assert_allclose(result.jac, ref.jac, atol=1e-10 * reduction.max(ref.jac))
+        npt.assert_allclose(result.offset, ref.offset, rtol=1e-10)
+        npt.assert_allclose(result.fun, ref.fun, rtol=1e-10)
+        if control == "offsets":
+            npt.assert_allclose(reduction.sum(result.jac), Hz.normal_load(value, r_s, E_s), rtol=1e-2)
+        else:
+            npt.assert_allclose(reduction.sum(result.jac), value, rtol=1e-7)
+            npt.assert_allclose(result.offset, Hz.penetration(value, r_s, E_s), rtol=1e-2)
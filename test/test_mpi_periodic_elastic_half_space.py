@@ -422,3 +422,24 @@ def test_multipleSineWaves_evaluate(comm, pnp, nx, ny, basenpoints):
     np.testing.assert_allclose(computed_force,
                                refForce[substrate.subdomain_slices], atol=1e-7,
                                rtol=1e-10)
+
+
+@pytest.mark.parametrize("nx, ny", [(64, 33),
+                                    (65, 32)])
+@pytest.mark.parametrize("nb_fields", [1, 3])
+def test_batched_evaluate(comm, nx, ny, nb_fields, basenpoints):
+    nx += basenpoints
+    ny += basenpoints
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1.0, (2., 1.),
+                                            fft='mpi', communicator=comm)
+    np.random.seed(1)
+    forces = np.random.random((nb_fields, nx, ny))[(slice(None),) + substrate.subdomain_slices]
+
+    disp = substrate.evaluate_disp(forces)
+    assert disp.shape == forces.shape
+    for f, u in zip(forces, disp):
+        np.testing.assert_allclose(u, substrate.evaluate_disp(f.copy()), atol=1e-12)
+
+    new_forces = substrate.evaluate_force(disp)
+    for u, f in zip(disp, new_forces):
+        np.testing.assert_allclose(f, substrate.evaluate_force(u.copy()), atol=1e-12)
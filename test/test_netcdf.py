@@ -0,0 +1,216 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Tests for the NetCDF container
+"""
+
+import netCDF4
+import numpy as np
+import pytest
+
+from ContactMechanics.IO import NetCDF
+from ContactMechanics.IO.NetCDF import NetCDFContainer
+
+
+def test_parallel_fields(comm, tmp_path):
+    if comm.size > 1 and not netCDF4.__has_parallel4_support__:
+        pytest.skip('netCDF4 has no support for parallel (MPI-IO) access')
+    nx, ny = 13, 7
+    fn = str(tmp_path / 'parallel.nc')
+    if comm.size > 1:
+        fn = comm.bcast(fn, root=0)
+    # Decomposition along x
+    location = comm.rank * nx // comm.size
+    nb_grid_pts = (comm.rank + 1) * nx // comm.size - location
+    x, y = np.mgrid[location:location + nb_grid_pts, :ny]
+    heights = np.sin(x) * np.cos(y)
+
+    container = NetCDFContainer(fn, mode='w', double=True, communicator=comm, subdomain_locations=(location, 0),
+                                nb_subdomain_grid_pts=(nb_grid_pts, ny))
+    container.set_shape((nx, ny))
+    container.set_rigid_surface(heights)
+    for i in range(3):
+        frame = container.get_next_frame()
+        frame.offset = 0.1 * i
+        frame.pressure = i * heights
+        frame.contact = heights > 0
+    container.close()
+
+    # Parallel read
+    container = NetCDFContainer(fn, communicator=comm, subdomain_locations=(location, 0),
+                                nb_subdomain_grid_pts=(nb_grid_pts, ny))
+    assert len(container) == 3
+    np.testing.assert_allclose(container.get_rigid_surface(), heights)
+    for i, frame in enumerate(container):
+        np.testing.assert_allclose(frame.offset, 0.1 * i)
+        np.testing.assert_allclose(frame.pressure, i * heights)
+        np.testing.assert_array_equal(frame.contact, heights > 0)
+    container.close()
+
+    # Serial read of the full grid
+    if comm.rank == 0:
+        container = NetCDFContainer(fn)
+        x, y = np.mgrid[:nx, :ny]
+        assert container.get_size() == (nx, ny)
+        np.testing.assert_allclose(container[-1].pressure, 2 * np.sin(x) * np.cos(y))
+        container.close()
+
+
+def test_parallel_requires_subdomain(comm, tmp_path):
+    if comm.size == 1:
+        pytest.skip('Serial files do not require a decomposition')
+    with pytest.raises(ValueError):
+        NetCDFContainer(str(tmp_path / 'parallel.nc'), mode='w', communicator=comm)
+
+
+def test_storage(tmp_path):
+    nx, ny = 64, 48
+    x, y = np.mgrid[:nx, :ny] / nx
+    displacement = np.cos(2 * np.pi * x) * np.sin(2 * np.pi * y)
+    pressure = np.where(displacement > 0.8, displacement, 0)
+
+    fn = str(tmp_path / 'compressed.nc')
+    container = NetCDFContainer(fn, mode='w', double=True, storage=dict(complevel=4))
+    container.set_shape((nx, ny))
+    container.set_storage('displacement', chunk_shape=(16, 100), complevel=9)
+    for i in range(2):
+        frame = container.get_next_frame()
+        frame.offset = 0.1 * i
+        frame.pressure = pressure
+        frame.displacement = displacement
+    with pytest.raises(RuntimeError):
+        container.set_storage('pressure', complevel=1)
+    with pytest.raises(ValueError):
+        container.set_storage('gap', chunk_shape=(16,))
+    with pytest.raises(ValueError):
+        container.set_storage('gap', complevel=10)
+    container.close()
+
+    with netCDF4.Dataset(fn) as dataset:
+        variables = dataset.variables
+        assert variables['pressure'].filters()['zlib']
+        assert variables['pressure'].filters()['complevel'] == 4
+        assert variables['pressure'].chunking() == [1, nx, ny]
+        assert variables['displacement'].filters()['complevel'] == 9
+        assert variables['displacement'].chunking() == [1, 16, ny]
+        assert variables['offset'].filters()['zlib'] is False
+
+    container = NetCDFContainer(fn)
+    np.testing.assert_array_equal(container[1].pressure, pressure)
+    np.testing.assert_array_equal(container[1].displacement, displacement)
+    container.close()
+
+
+@pytest.mark.skipif(not NetCDF.__have_quantization__, reason='netCDF4 has no support for quantization')
+def test_quantization(tmp_path):
+    nx, ny = 64, 48
+    x, y = np.mgrid[:nx, :ny] / nx
+    displacement = np.cos(2 * np.pi * x) * np.sin(2 * np.pi * y)
+
+    fn = str(tmp_path / 'quantized.nc')
+    container = NetCDFContainer(fn, mode='w', double=True)
+    container.set_shape((nx, ny))
+    container.set_storage('displacement', complevel=9, significant_digits=3)
+    container.get_next_frame().displacement = displacement
+    container.close()
+
+    container = NetCDFContainer(fn)
+    np.testing.assert_allclose(container[0].displacement, displacement, atol=1e-3)
+    container.close()
+
+
+def test_quantization_unsupported(tmp_path, monkeypatch):
+    monkeypatch.setattr(NetCDF, '__have_quantization__', False)
+    container = NetCDFContainer(str(tmp_path / 'quantized.nc'), mode='w', double=True)
+    container.set_shape((8, 8))
+    with pytest.raises(RuntimeError):
+        container.set_storage('displacement', significant_digits=3)
+    container.close()
+
+
+def test_frame_access(tmp_path):
+    nx, ny, nb_frames = 16, 12, 6
+    x, y = np.mgrid[:nx, :ny]
+    fn = str(tmp_path / 'frames.nc')
+    container = NetCDFContainer(fn, mode='w', double=True)
+    container.set_shape((nx, ny))
+    for i in range(nb_frames):
+        frame = container.get_next_frame()
+        frame.offset = 0.1 * i
+        frame.pressure = i * x + y
+    container.close()
+
+    container = NetCDFContainer(fn, cache_size=2)
+    # Lazy fields
+    pressure = container[3].lazy('pressure')
+    assert pressure.shape == (nx, ny)
+    assert pressure.ndim == 2
+    assert len(pressure) == nx
+    assert len(container._frame_cache) == 0
+    np.testing.assert_allclose(pressure[2:5, ::3], (3 * x + y)[2:5, ::3])
+    np.testing.assert_allclose(pressure[-1], 3 * (nx - 1) + y[0])
+    np.testing.assert_allclose(np.asarray(pressure), 3 * x + y)
+    assert len(container._frame_cache) == 1
+
+    # Frame cache
+    first = container[3].pressure
+    assert container[3].pressure is first
+    assert not first.flags.writeable
+    np.testing.assert_allclose(pressure[2:5, ::3], (3 * x + y)[2:5, ::3])
+    for i in range(nb_frames):
+        np.testing.assert_allclose(container[i].pressure, i * x + y)
+        np.testing.assert_allclose(container[i].offset, 0.1 * i)
+    assert len(container._frame_cache) == 2
+    assert container[3].pressure is not first
+    container.close()
+
+    # Without a cache, every access returns a fresh, writable array
+    container = NetCDFContainer(fn)
+    pressure = container[3].pressure
+    pressure += 1
+    np.testing.assert_allclose(container[3].pressure, 3 * x + y)
+    assert len(container._frame_cache) == 0
+    container.close()
+
+    container = NetCDFContainer(fn)
+
+    # Bulk reads
+    np.testing.assert_allclose(container.read_frames('offset'), 0.1 * np.arange(nb_frames))
+    values = container.read_frames('pressure', frames=slice(1, 5, 2), window=(slice(3, 6), 4))
+    np.testing.assert_allclose(values, [(i * x + y)[3:6, 4] for i in [1, 3]])
+    values = container.read_frames('pressure', frames=[0, -1])
+    np.testing.assert_allclose(values, [y, (nb_frames - 1) * x + y])
+    container.close()
+
+
+def test_frame_cache_invalidation(tmp_path):
+    container = NetCDFContainer(str(tmp_path / 'frames.nc'), mode='w', double=True, cache_size=4)
+    container.set_shape((4, 4))
+    frame = container.get_next_frame()
+    frame.pressure = np.zeros((4, 4))
+    np.testing.assert_allclose(frame.pressure, 0)
+    frame.pressure = np.ones((4, 4))
+    np.testing.assert_allclose(frame.pressure, 1)
+    container.close()
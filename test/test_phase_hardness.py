@@ -0,0 +1,160 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+
+"""
+Tests for per-pixel (multi-phase) hardness
+"""
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+from NuMPI.Tools import Reduction
+
+from SurfaceTopography import PlasticTopography, Topography
+
+import ContactMechanics  # noqa: F401
+from ContactMechanics import PeriodicFFTElasticHalfSpace, FreeFFTElasticHalfSpace, make_plastic_system
+from ContactMechanics.PlasticSystemSpecialisations import PhaseHardness
+
+
+def sphere(nx, ny):
+    x = (np.arange(nx).reshape(-1, 1) - nx / 2) / nx
+    y = (np.arange(ny).reshape(1, -1) - ny / 2) / ny
+    return -(x ** 2 + y ** 2) / 2
+
+
+def two_phase_map(nx, ny):
+    """Soft and hard stripes along the x-direction"""
+    return np.where((np.arange(nx) // 4) % 2 == 0, 0.02, 0.05).reshape(-1, 1) * np.ones(ny)
+
+
+def test_storage():
+    hardness = np.array([[1.5, 2.5, 1.5], [2.5, 2.5, 0.5]])
+    phase_hardness = PhaseHardness.from_array(hardness)
+    assert phase_hardness.nb_phases == 3
+    assert phase_hardness.phases.dtype == np.uint8
+    assert phase_hardness.shape == hardness.shape
+    assert np.ndim(phase_hardness) == 2
+    np.testing.assert_array_equal(np.asarray(phase_hardness), hardness)
+
+    # Scaling (e.g. to force units) only touches the lookup table
+    scaled = 2 * phase_hardness
+    assert scaled.phases is phase_hardness.phases
+    np.testing.assert_array_equal(np.asarray(scaled * 0.5), hardness)
+
+    # Hardness maps are validated by the factory
+    topography = Topography(np.zeros((2, 3)), (1., 1.), periodic=True)
+    substrate = PeriodicFFTElasticHalfSpace((2, 3), 1., (1., 1.))
+    system = make_plastic_system(substrate, topography, hardness=phase_hardness)
+    assert system.surface.hardness is phase_hardness
+    system = make_plastic_system(substrate, PlasticTopography(topography, 1.), hardness=phase_hardness)
+    assert system.surface.hardness is phase_hardness
+    with pytest.raises(ValueError):
+        make_plastic_system(substrate, topography, hardness=PhaseHardness(np.zeros((2, 3), dtype=int), [-1]))
+    with pytest.raises(ValueError):
+        make_plastic_system(substrate, topography, hardness=-hardness)
+
+    with pytest.raises(ValueError):
+        PhaseHardness(np.array([[0, 2]]), [1., 2.])
+    with pytest.raises(ValueError):
+        PhaseHardness(np.array([[0., 1.]]), [1., 2.])
+    with pytest.raises(ValueError):
+        PhaseHardness(np.array([[0, 1]]), 1.)
+
+
+@pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                    reason="tests only serial funcionalities, please execute with pytest")
+@pytest.mark.parametrize('substrate_class', [PeriodicFFTElasticHalfSpace, FreeFFTElasticHalfSpace])
+@pytest.mark.parametrize('plastic_solver', ['bcg', 'mix'])
+def test_uniform_map(substrate_class, plastic_solver):
+    nx, ny = 32, 32
+    results = []
+    for hardness in [0.03, np.full((nx, ny), 0.03)]:
+        topography = Topography(sphere(nx, ny), (1., 1.), periodic=substrate_class is PeriodicFFTElasticHalfSpace)
+        system = make_plastic_system(substrate_class((nx, ny), 1., (1., 1.)), topography, hardness=hardness)
+        result = system.minimize_proxy(external_force=1e-3, pentol=1e-10, plastic_solver=plastic_solver)
+        assert result.success
+        results += [(result.jac, system.surface.plastic_displ)]
+    assert isinstance(system.surface.hardness, PhaseHardness)
+    np.testing.assert_allclose(results[1][0], results[0][0], atol=1e-14)
+    np.testing.assert_allclose(results[1][1], results[0][1], atol=1e-14)
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'auto'])
+def test_two_phase_decomposition(comm, backend):
+    nx, ny = 64, 48
+    hardness = two_phase_map(nx, ny)
+    pnp = Reduction(comm)
+
+    # Reference on a single process
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1., (1., 1.), communicator=MPI.COMM_SELF)
+    reference = make_plastic_system(substrate, Topography(sphere(nx, ny), (1., 1.), periodic=True),
+                                    hardness=hardness, communicator=MPI.COMM_SELF)
+    reference_result = reference.minimize_proxy(external_force=2e-3, pentol=1e-10, backend=backend)
+    assert reference_result.success
+
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1., (1., 1.), fft='mpi', communicator=comm)
+    topography = Topography(sphere(nx, ny), (1., 1.), periodic=True, decomposition='domain',
+                            subdomain_locations=substrate.topography_subdomain_locations,
+                            nb_subdomain_grid_pts=substrate.topography_nb_subdomain_grid_pts,
+                            communicator=comm)
+    # The global hardness map is cut to the local subdomain
+    system = make_plastic_system(substrate, topography, hardness=hardness, communicator=comm)
+    np.testing.assert_array_equal(np.asarray(system.surface.hardness), hardness[topography.subdomain_slices])
+    result = system.minimize_proxy(external_force=2e-3, pentol=1e-10, backend=backend)
+    assert result.success
+
+    # Pressures do not exceed the local hardness, both phases flow
+    pressures = result.jac / system.surface.area_per_pt
+    local_hardness = hardness[topography.subdomain_slices]
+    assert pnp.max(pressures - local_hardness) < 1e-12
+    flowing = pressures > local_hardness - 1e-12
+    for phase_hardness in [0.02, 0.05]:
+        assert pnp.sum(np.logical_and(flowing, local_hardness == phase_hardness)) > 0
+    assert pnp.sum(np.logical_and(flowing, np.logical_not(result.plastic))) == 0
+    np.testing.assert_allclose(pnp.sum(result.jac), 2e-3)
+
+    np.testing.assert_allclose(system.surface.plastic_displ,
+                               reference.surface.plastic_displ[topography.subdomain_slices], atol=1e-10)
+    np.testing.assert_allclose(result.jac, reference_result.jac[topography.subdomain_slices], atol=1e-10)
+
+
+@pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                    reason="tests only serial funcionalities, please execute with pytest")
+def test_pipeline():
+    nx, ny = 32, 32
+    topography = Topography(sphere(nx, ny), (1., 1.), periodic=True)
+    hardness = two_phase_map(nx, ny)
+    mean_pressure, total_contact_area, mean_displacement, mean_gap, converged = \
+        topography.contact_mechanics(pressures=[1e-4, 1e-3], hardness=hardness)
+    assert converged.all()
+    mean_pressure2, total_contact_area2, mean_displacement2, mean_gap2, converged2 = \
+        topography.contact_mechanics(pressures=[1e-4, 1e-3], hardness=PhaseHardness.from_array(hardness))
+    np.testing.assert_allclose(mean_displacement2, mean_displacement)
+    # Softest phase flows at high load; this reduces the contact stiffness
+    mean_pressure3, total_contact_area3, mean_displacement3, mean_gap3, converged3 = \
+        topography.contact_mechanics(pressures=[1e-4, 1e-3], hardness=0.05)
+    assert mean_displacement[-1] > mean_displacement3[-1]
@@ -0,0 +1,289 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Tests for the contact mechanics pipeline function
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+
+from SurfaceTopography import Topography
+from SurfaceTopography.Generation import fourier_synthesis
+
+import ContactMechanics  # noqa: F401
+from ContactMechanics import PeriodicFFTElasticHalfSpace, make_plastic_system
+from ContactMechanics.IO.NetCDF import NetCDFContainer
+from ContactMechanics.PipelineFunction import _next_contact_step
+from ContactMechanics.Tools.Continuation import ToleranceContinuation
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+@pytest.fixture
+def topography():
+    nx, ny = 64, 64
+    x, y = np.mgrid[:nx, :ny] / nx
+    return Topography(np.cos(2 * np.pi * x) * np.cos(4 * np.pi * y) + 0.5 * np.sin(6 * np.pi * x),
+                      physical_sizes=(1., 1.), periodic=True)
+
+
+def test_tolerance_continuation_schedule():
+    continuation = ToleranceContinuation(loosening=100, outputs=[0, -1])
+    factors = [continuation.factor(i, 5) for i in range(5)]
+    np.testing.assert_allclose(factors, [1, 100 ** 0.75, 10, 100 ** 0.25, 1])
+    tolerances = continuation.tolerances(2, 5, 1e-3, forcetol=1e-4, thermotol=1e-5)
+    np.testing.assert_allclose([tolerances['pentol'], tolerances['forcetol'], tolerances['thermotol']],
+                               [1e-2, 1e-3, 1e-4])
+    with pytest.raises(ValueError):
+        ToleranceContinuation(loosening=0.1)
+
+    # Only steps that ran at the final tolerances and converged count
+    for i in range(5):
+        continuation.tolerances(i, 5, 1e-3)
+    continuation.record(0, False)
+    for i in range(1, 4):
+        continuation.record(i, True)
+    np.testing.assert_array_equal(continuation.at_final_tolerance, [False] * 5)
+    continuation.record(4, True)
+    np.testing.assert_array_equal(continuation.at_final_tolerance, [False] * 4 + [True])
+
+
+def test_tolerance_continuation(topography):
+    pressures = np.linspace(0.01, 0.2, 6)
+    mean_pressure, total_contact_area, mean_displacement, mean_gap, converged = \
+        topography.contact_mechanics(pressures=pressures)
+    continuation = ToleranceContinuation(loosening=100, outputs=[-1])
+    mean_pressure2, total_contact_area2, mean_displacement2, mean_gap2, converged2 = \
+        topography.contact_mechanics(pressures=pressures, continuation=continuation)
+
+    assert converged.all() and converged2.all()
+    np.testing.assert_array_equal(continuation.at_final_tolerance, [False] * 5 + [True])
+
+    # A final step that stops at `maxiter` has not reached the final tolerances
+    continuation = ToleranceContinuation(loosening=100, outputs=[-1])
+    converged = topography.contact_mechanics(pressures=pressures, maxiter=2, continuation=continuation)[-1]
+    assert not converged[-1]
+    np.testing.assert_array_equal(continuation.at_final_tolerance, [False] * 6)
+    # Seed steps are only approximate, the final step is not
+    np.testing.assert_allclose(total_contact_area2, total_contact_area, rtol=0.05)
+    np.testing.assert_allclose(total_contact_area2[-1], total_contact_area[-1], rtol=1e-3)
+    np.testing.assert_allclose(mean_displacement2[-1], mean_displacement[-1], rtol=1e-4)
+
+
+@pytest.mark.parametrize('steps', [dict(offsets=[0.5, 0.8, 1.1, 1.4]), dict(pressures=[0.01, 0.05, 0.1, 0.2])])
+def test_parallel_steps(topography, steps):
+    def record(fields):
+        def callback(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure,
+                     total_contact_area):
+            fields.append((mean_pressure, pressure_xy))
+        return callback
+
+    reference_fields = []
+    reference = topography.contact_mechanics(results_callback=record(reference_fields), **steps)
+    for parallel in [dict(nb_workers=1), dict(nb_workers=2), dict(executor=ThreadPoolExecutor(2))]:
+        fields = []
+        results = topography.contact_mechanics(results_callback=record(fields), **parallel, **steps)
+        for value, reference_value in zip(results, reference):
+            np.testing.assert_array_equal(value, reference_value)
+        # Fields are reported in order
+        assert len(fields) == len(reference_fields)
+        for (mean_pressure, pressure_xy), (reference_mean_pressure, reference_pressure_xy) in \
+                zip(fields, reference_fields):
+            assert mean_pressure == reference_mean_pressure
+            np.testing.assert_array_equal(pressure_xy, reference_pressure_xy)
+
+
+def test_parallel_plastic_steps(topography):
+    pressures = [0.2, 0.01]
+    results1 = topography.contact_mechanics(pressures=pressures, hardness=0.5, nb_workers=1)
+    results2 = topography.contact_mechanics(pressures=pressures, hardness=0.5, nb_workers=2)
+    for value1, value2 in zip(results1, results2):
+        np.testing.assert_array_equal(value1, value2)
+    # Every step starts from the undeformed topography
+    single = topography.contact_mechanics(pressures=pressures[1:], hardness=0.5)
+    np.testing.assert_allclose(results1[2][1], single[2][0])
+
+
+def test_parallel_steps_errors(topography):
+    with pytest.raises(ValueError):
+        topography.contact_mechanics(nsteps=4, nb_workers=2)
+    with pytest.raises(ValueError):
+        topography.contact_mechanics(pressures=[0.1], nb_workers=2, continuation=ToleranceContinuation())
+    with pytest.raises(ValueError):
+        topography.contact_mechanics(pressures=[0.1], nb_workers=2, executor=ThreadPoolExecutor(2))
+
+
+@pytest.mark.parametrize('steps', [dict(nsteps=4), dict(pressures=[0.01, 0.05, 0.1])])
+def test_contact_mechanics_steps(topography, steps):
+    fields = []
+
+    def callback(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure,
+                 total_contact_area):
+        fields.append((displacement_xy, gap_xy, pressure_xy, contacting_points_xy))
+
+    mean_pressure, total_contact_area, mean_displacement, mean_gap, converged = \
+        topography.contact_mechanics(results_callback=callback, **steps)
+
+    results = list(topography.contact_mechanics_steps(**steps))
+    assert [step.index for step in results] == list(range(len(mean_pressure)))
+    np.testing.assert_array_equal([step.mean_pressure for step in results], mean_pressure)
+    np.testing.assert_array_equal([step.total_contact_area for step in results], total_contact_area)
+    np.testing.assert_array_equal([step.mean_displacement for step in results], mean_displacement)
+    np.testing.assert_array_equal([step.mean_gap for step in results], mean_gap)
+    np.testing.assert_array_equal([step.converged for step in results], converged)
+    for step, (displacement_xy, gap_xy, pressure_xy, contacting_points_xy) in zip(results, fields):
+        # Fields are only computed on access
+        assert 'pressure' not in vars(step)
+        np.testing.assert_array_equal(step.displacement, displacement_xy)
+        np.testing.assert_array_equal(step.gap, gap_xy)
+        np.testing.assert_array_equal(step.pressure, pressure_xy)
+        np.testing.assert_array_equal(step.contact, contacting_points_xy)
+        assert step.pressure is step.pressure
+
+
+def test_contact_mechanics_steps_errors(topography):
+    # Arguments are checked before the first step is computed
+    with pytest.raises(ValueError):
+        topography.contact_mechanics_steps()
+    with pytest.raises(ValueError):
+        topography.contact_mechanics_steps(nsteps=4, pressures=[0.1])
+
+
+@pytest.fixture
+def random_topography():
+    np.random.seed(1)
+    return fourier_synthesis((128, 128), (1., 1.), 0.8, rms_slope=0.1, short_cutoff=4 / 128)
+
+
+def test_target_contact_areas(random_topography):
+    contact_areas = [0.01, 0.05, 0.2]
+    mean_pressure, total_contact_area, mean_displacement, mean_gap, converged = \
+        random_topography.contact_mechanics(contact_areas=contact_areas)
+    assert converged.all()
+    np.testing.assert_allclose(total_contact_area, contact_areas, rtol=0.05)
+    assert np.all(np.diff(mean_pressure) > 0)
+
+
+def test_log_spaced_contact_areas(random_topography):
+    nsteps = 8
+    mean_pressure, total_contact_area, mean_displacement, mean_gap, converged = \
+        random_topography.contact_mechanics(nsteps=nsteps)
+    assert len(total_contact_area) == nsteps and converged.all()
+    # Areas beyond the first two steps are equally spaced on a log scale
+    # between the areas of the first two steps
+    pixel_area = 1 / np.prod(random_topography.nb_grid_pts)
+    log_areas = np.log(total_contact_area + pixel_area)
+    np.testing.assert_allclose(log_areas[2:], np.linspace(log_areas[1], log_areas[0], nsteps)[1:-1],
+                               atol=np.log(1.05))
+
+    with pytest.raises(ValueError):
+        random_topography.contact_mechanics(nsteps=nsteps, contact_areas=[0.1])
+    with pytest.raises(ValueError):
+        random_topography.contact_mechanics(contact_areas=[0.1], nb_workers=2)
+
+
+@pytest.mark.parametrize('parallel', [dict(), dict(nb_workers=1)])
+def test_output(topography, tmp_path, parallel):
+    fields = []
+
+    def callback(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure,
+                 total_contact_area):
+        fields.append((gap_xy, pressure_xy, contacting_points_xy))
+
+    fn = str(tmp_path / 'steps.nc')
+    offsets = [0.5, 0.8, 1.1]
+    results = topography.contact_mechanics(offsets=offsets, results_callback=callback, output=fn,
+                                           output_fields=('gap', 'pressure', 'contact'), **parallel)
+
+    container = NetCDFContainer(fn)
+    assert len(container) == len(offsets)
+    np.testing.assert_array_equal(container.get_rigid_surface(), topography.heights())
+    for name, values in zip(['mean_pressure', 'total_contact_area', 'mean_displacement', 'mean_gap', 'converged'],
+                            results):
+        np.testing.assert_array_equal(container[name], values)
+    for frame, (gap_xy, pressure_xy, contacting_points_xy) in zip(container, fields):
+        np.testing.assert_array_equal(frame.gap, gap_xy)
+        np.testing.assert_array_equal(frame.pressure, pressure_xy)
+        np.testing.assert_array_equal(frame.contact, contacting_points_xy)
+    assert 'displacement' not in container._data.variables
+    container.close()
+
+
+def test_output_append(topography, tmp_path):
+    fn = str(tmp_path / 'steps.nc')
+    container = NetCDFContainer(fn, mode='w', double=True)
+    topography.contact_mechanics(offsets=[0.5], output=container, output_fields=())
+    topography.contact_mechanics(offsets=[0.8, 1.1], output=container, output_fields=())
+    container.close()
+
+    container = NetCDFContainer(fn)
+    np.testing.assert_array_equal(container.mean_displacement, [0.5, 0.8, 1.1])
+    container.close()
+
+    with pytest.raises(ValueError):
+        topography.contact_mechanics(offsets=[0.5], output=fn, output_fields=('forces',))
+    with pytest.raises(ValueError):
+        topography.contact_mechanics(offsets=[0.5], output=container, output_storage=dict(complevel=4))
+
+
+def test_output_storage(topography, tmp_path):
+    fn = str(tmp_path / 'steps.nc')
+    topography.contact_mechanics(offsets=[0.5, 0.8], output=fn, output_fields=('pressure', 'contact'),
+                                 output_storage=dict(complevel=4))
+    container = NetCDFContainer(fn)
+    variable = container._data.variables['pressure']
+    assert variable.chunking() == [1] + list(topography.nb_grid_pts)
+    assert variable.filters()['complevel'] == 4
+    assert container[1].contact.dtype == bool
+    np.testing.assert_array_equal(container[1].contact, container[1].pressure > 0)
+    assert container.read_frames('contact').dtype == bool
+    assert container[0].lazy('contact')[:2].dtype == bool
+    container.close()
+
+
+def test_next_step_resets_plastic_displacements(topography):
+    def plastic_system():
+        substrate = PeriodicFFTElasticHalfSpace(topography.nb_grid_pts, 1., topography.physical_sizes)
+        return make_plastic_system(substrate, topography, hardness=0.5)
+
+    reference_system = plastic_system()
+    reference, _ = _next_contact_step(reference_system, 4, pentol=1e-10, maxiter=1000)
+
+    # Previous calculation at the offset of the first step leaves plastic
+    # displacements and heights cached at this offset
+    system = plastic_system()
+    offset = -np.mean(topography.heights())
+    result = system.minimize_proxy(offset=offset, pentol=1e-10)
+    system.compute_gap(result.x, offset)
+    assert np.any(system.surface.plastic_displ != 0)
+    step, _ = _next_contact_step(system, 4, pentol=1e-10, maxiter=1000)
+    np.testing.assert_allclose(step.mean_pressure, reference.mean_pressure)
+    np.testing.assert_allclose(system.surface.plastic_displ, reference_system.surface.plastic_displ)
@@ -36,6 +36,7 @@ from ContactMechanics import PeriodicFFTElasticHalfSpace
 from ContactMechanics.PlasticSystemSpecialisations import \
     PlasticNonSmoothContactSystem
 from ContactMechanics.Factory import make_plastic_system
+from ContactMechanics.Optimization import constrained_conjugate_gradients
 
 FIXTURE_DIR = os.path.join(
     os.path.dirname(os.path.realpath(__file__)),
@@ -206,3 +207,96 @@ def test_automatic_offsets(comm_self):
         '10.1016/j.triboint.2005.11.008',  # Almqvist et al. 2007
         '10.1038/s41467-018-02981-y'  # Weber et al. 2018
     }, 'Contact mechanics calculation returned wrong list of references'
+
+
+def test_bound_constrained_matches_mixing(comm_self):
+    # The bound-constrained CG and the overrelaxation must find the same
+    # plastic solution
+    nx, ny = 64, 64
+
+    sx = 0.005  # mm
+    sy = 0.005  # mm
+
+    x = np.arange(0, nx).reshape(-1, 1) * sx / nx - sx / 2
+    y = np.arange(0, ny).reshape(1, -1) * sy / ny - sy / 2
+
+    topography = Topography(- np.sqrt(x ** 2 + y ** 2) * 0.05,
+                            physical_sizes=(sx, sy))
+
+    Es = 230000  # MPa
+    hardness = 6000  # MPa
+
+    results = {}
+    for plastic_solver in ['mix', 'bcg']:
+        system = make_plastic_system(
+            substrate="free",
+            surface=PlasticTopography(topography=topography, hardness=hardness),
+            young=Es,
+            communicator=comm_self)
+        sol = system.minimize_proxy(external_force=0.06, pentol=1e-10, maxiter=1000, plastic_solver=plastic_solver)
+        assert sol.success, 'Minimization did not succeed'
+        np.testing.assert_allclose(sol.jac.sum(), 0.06, rtol=1e-5)
+        assert np.max(sol.jac) <= hardness * system.area_per_pt * (1 + 1e-12), 'Maximum force exceeded hardness'
+        results[plastic_solver] = sol
+
+    np.testing.assert_allclose(results['bcg'].offset, results['mix'].offset, rtol=1e-4)
+    np.testing.assert_allclose(results['bcg'].jac, results['mix'].jac, atol=1e-3 * hardness * system.area_per_pt)
+    assert results['bcg'].nit <= results['mix'].nit
+
+
+def test_bound_constrained_fully_plastic(comm_self):
+    # Deep indentation at low hardness leaves (almost) no pixels between the
+    # bounds, i.e. the CG controlled area vanishes.
+    nx, ny = 128, 128
+    x = np.arange(0, nx).reshape(-1, 1) / nx - 0.5
+    y = np.arange(0, ny).reshape(1, -1) / ny - 0.5
+    topography = Topography(np.cos(2 * np.pi * x) * np.cos(2 * np.pi * y) * 0.01 - 0.01,
+                            physical_sizes=(1., 1.))
+
+    hardness = 1e-3
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1.0, physical_sizes=(1., 1.), communicator=comm_self)
+    system = PlasticNonSmoothContactSystem(substrate, PlasticTopography(topography, hardness))
+    sol = system.minimize_proxy(offset=0.005, pentol=1e-8, maxiter=100)
+    assert sol.success, 'Minimization did not succeed'
+    np.testing.assert_array_less(sol.jac, hardness * system.area_per_pt * (1 + 1e-12))
+    # Bearing area
+    assert np.count_nonzero(sol.jac > 0) == np.count_nonzero(topography.heights() + 0.005 > sol.x)
+
+
+def test_bearing_area_offset(comm):
+    # The bearing-area offset must put exactly the number of pixels required
+    # to carry the load into contact, independent of the domain decomposition
+    from ContactMechanics.Optimization.ConstrainedConjugateGradients import \
+        _bearing_area_offset
+    reduction = Reduction(comm)
+    np.random.seed(7)
+    global_gap = np.random.normal(size=1000)
+    global_gap[:200] = np.round(global_gap[:200], 1)  # introduce ties
+    local_gap = np.array_split(global_gap, comm.size)[comm.rank]
+    for external_force in [0., 0.5, 250., 333.3, 999.5, 1200.]:
+        k = min(int(np.ceil(external_force)), global_gap.size)
+        kth_gap = np.sort(global_gap)[k - 1] if k > 0 else -np.inf
+        expected_nb_contact = np.sum(global_gap <= kth_gap)
+        for hardness in [1., np.ones_like(local_gap)]:
+            offset = _bearing_area_offset(local_gap, hardness, external_force,
+                                          reduction)
+            assert np.sum(global_gap < offset) == expected_nb_contact
+
+
+def test_anderson_mixing(comm_self):
+    # Anderson mixing must converge to the same solution as simple mixing
+    nx, ny = 64, 64
+    x, y = np.mgrid[:nx, :ny] / nx
+    topography = Topography(0.01 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y) - 2), physical_sizes=(1., 1.))
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1.0, physical_sizes=(1., 1.), communicator=comm_self)
+    hardness = 0.1 * topography.area_per_pt
+
+    results = {}
+    for mixing in ['simple', 'anderson']:
+        results[mixing] = constrained_conjugate_gradients(
+            substrate, topography, hardness=hardness, external_force=500 * hardness, plastic_solver='mix',
+            mixing=mixing, pentol=1e-6, maxiter=1000)
+        assert results[mixing].success
+
+    np.testing.assert_allclose(results['anderson'].jac, results['simple'].jac, atol=1e-3 * hardness)
+    np.testing.assert_allclose(results['anderson'].offset, results['simple'].offset, rtol=1e-4)
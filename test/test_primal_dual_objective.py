@@ -225,3 +225,77 @@ def test_scipy_friendly_interface_nonperiodic(s):
     _ccg = res.x
 
     np.testing.assert_allclose(_lbfgsb, _ccg, atol=1e-6)
+
+
+def test_reshape_bounds():
+    nx, ny = 8, 6
+    surface = make_sphere(10., (nx, ny), (1., 1.), kind="paraboloid")
+    substrate = Solid.FreeFFTElasticHalfSpace((nx, ny), young=1., physical_sizes=(1., 1.))
+    system = NonSmoothContactSystem(substrate, surface)
+
+    assert system._reshape_bounds() is None
+
+    # Masked lower bounds (outside of the topography) are unbounded
+    lbounds = system._lbounds_from_heights(0.1)
+    bnds = system._reshape_bounds(lbounds)
+    assert isinstance(bnds, optim.Bounds)
+    assert bnds.lb.shape == bnds.ub.shape == (4 * nx * ny,)
+    np.testing.assert_array_equal(bnds.lb, lbounds.filled(-np.inf).ravel())
+    assert np.all(bnds.ub == np.inf)
+
+    ubounds = np.ones(substrate.nb_subdomain_grid_pts)
+    bnds = system._reshape_bounds(ubounds=ubounds)
+    assert np.all(bnds.lb == -np.inf)
+    np.testing.assert_array_equal(bnds.ub, 1)
+
+
+def test_heights():
+    nx, ny = 32, 32
+    surface = make_sphere(10., (nx, ny), (1., 1.), kind="paraboloid")
+    substrate = Solid.PeriodicFFTElasticHalfSpace((nx, ny), young=1., physical_sizes=(1., 1.))
+    system = NonSmoothContactSystem(substrate, surface)
+
+    offset = 0.01
+    heights = system._heights(offset)
+    np.testing.assert_allclose(heights, surface.heights() + offset)
+    assert not heights.flags.writeable
+
+    # Objectives evaluate the heights once, not at every function evaluation
+    nb_calls = []
+    surface_heights = surface.heights
+
+    def counting_heights():
+        nb_calls.append(1)
+        return surface_heights()
+
+    surface.heights = counting_heights
+    press = np.random.random((nx, ny))
+    for objective in (system.dual_objective(offset), system.primal_objective(offset), system.objective(offset)):
+        nb_calls.clear()
+        objective(press.reshape(-1))
+        objective(press.reshape(-1))
+        assert len(nb_calls) == 0
+    surface.heights = surface_heights
+
+    # Fused evaluation of the dual objective
+    energy, gap = system.evaluate_dual(press, offset, forces=True)
+    disp = substrate.evaluate_disp(-press)
+    np.testing.assert_allclose(energy, np.sum(press * disp) / 2 - np.sum(press * (surface.heights() + offset)))
+    np.testing.assert_allclose(gap, disp - surface.heights() - offset)
+
+    # Changes of the topography are seen outside of objectives
+    system.surface = make_sphere(20., (nx, ny), (1., 1.), kind="paraboloid")
+    np.testing.assert_allclose(system._heights(offset), system.surface.heights() + offset)
+
+
+def test_heights_plastic_displacements():
+    nx, ny = 32, 32
+    topography = make_sphere(10., (nx, ny), (1., 1.), kind="paraboloid")
+    substrate = Solid.PeriodicFFTElasticHalfSpace((nx, ny), young=1., physical_sizes=(1., 1.))
+    system = Solid.make_plastic_system(substrate, topography, hardness=1.)
+
+    offset = 0.01
+    system._heights(offset)
+    # Plastic displacements set by the user are never missed
+    system.surface.plastic_displ = np.full((nx, ny), 0.005)
+    np.testing.assert_allclose(system._heights(offset), topography.heights() + 0.005 + offset)
@@ -0,0 +1,173 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+Tests for the cache of contact mechanics results
+"""
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+
+from SurfaceTopography import Topography
+
+import ContactMechanics  # noqa: F401
+from ContactMechanics.Tools.Continuation import ToleranceContinuation
+from ContactMechanics.PlasticSystemSpecialisations import PhaseHardness
+from ContactMechanics.Tools.ResultCache import CacheKey, DirectoryCache, MemoryCache, hardness_key
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+@pytest.fixture
+def topography():
+    nx, ny = 32, 32
+    x, y = np.mgrid[:nx, :ny] / nx
+    return Topography(np.cos(2 * np.pi * x) * np.cos(4 * np.pi * y) + 0.5 * np.sin(6 * np.pi * x),
+                      physical_sizes=(1., 1.), periodic=True)
+
+
+@pytest.fixture(params=['memory', 'directory'])
+def make_cache(request, tmp_path):
+    def make(max_size=None):
+        if request.param == 'memory':
+            return MemoryCache(max_size=max_size)
+        return DirectoryCache(str(tmp_path / 'cache'), max_size=max_size)
+    return make
+
+
+def test_hardness_key():
+    def key(hardness):
+        return CacheKey(hardness_key(hardness)).hexdigest()
+
+    phases = np.array([[0, 1], [1, 0]])
+    assert key(None) == key(0) == key(-1.)
+    assert key(1.) != key(None)
+    assert key(PhaseHardness(phases, [1., 2.])) == key(PhaseHardness(phases.copy(), [1., 2.]))
+    assert key(PhaseHardness(phases, [1., 2.])) != key(PhaseHardness(1 - phases, [1., 2.]))
+    assert key(PhaseHardness(phases, [1., 2.])) != key(PhaseHardness(phases, [1., 3.]))
+
+
+def test_eviction(make_cache):
+    cache = make_cache(max_size=3 * 8000 + 1000)
+    for i in range(3):
+        cache.put(f'key{i}', dict(values=np.full(1000, i, dtype=float)))
+    assert len(cache) == 3
+    # Use the first entry, such that the second one is evicted first
+    np.testing.assert_array_equal(cache.get('key0')['values'], 0)
+    cache.put('key3', dict(values=np.zeros(1000)))
+    assert len(cache) == 3
+    assert cache.get('key1') is None
+    for key in ['key0', 'key2', 'key3']:
+        assert cache.get(key) is not None
+    assert cache.hits == 4 and cache.misses == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_cached_contact_mechanics(topography, make_cache):
+    cache = make_cache()
+    offsets = [0.5, 0.8, 1.1]
+    reference = topography.contact_mechanics(offsets=offsets)
+    results = topography.contact_mechanics(offsets=offsets, cache=cache)
+    for value, reference_value in zip(results, reference):
+        np.testing.assert_array_equal(value, reference_value)
+    assert cache.misses == 3 and len(cache) == 3
+
+    # Second call is served from the cache
+    results = topography.contact_mechanics(offsets=offsets, cache=cache)
+    for value, reference_value in zip(results, reference):
+        np.testing.assert_array_equal(value, reference_value)
+    assert cache.hits == 3 and cache.misses == 3
+
+    # Overlapping offsets are reused, only new ones are computed
+    results = topography.contact_mechanics(offsets=[1.1, 1.4, 0.5], cache=cache)
+    np.testing.assert_array_equal(results[0][[0, 2]], reference[0][[2, 0]])
+    assert cache.hits == 5 and cache.misses == 4 and len(cache) == 4
+
+    # Different parameters lead to different entries
+    topography.contact_mechanics(offsets=offsets, cache=cache, maxiter=99)
+    assert cache.misses == 7
+
+
+def test_cached_fields(topography, make_cache):
+    cache = make_cache()
+    pressures = [0.01, 0.1]
+
+    def record(fields):
+        def callback(displacement_xy, gap_xy, pressure_xy, contacting_points_xy, mean_displacement, mean_pressure,
+                     total_contact_area):
+            fields.append((pressure_xy, contacting_points_xy, mean_pressure))
+        return callback
+
+    reference_fields = []
+    topography.contact_mechanics(pressures=pressures, results_callback=record(reference_fields))
+    # Entries without fields are recomputed if fields are requested
+    topography.contact_mechanics(pressures=pressures, cache=cache)
+    for i in range(2):
+        fields = []
+        topography.contact_mechanics(pressures=pressures, cache=cache, results_callback=record(fields))
+        for (pressure_xy, contacting_points_xy, mean_pressure), (reference_pressure_xy,
+                                                                 reference_contacting_points_xy,
+                                                                 reference_mean_pressure) in \
+                zip(fields, reference_fields):
+            np.testing.assert_array_equal(pressure_xy, reference_pressure_xy)
+            np.testing.assert_array_equal(contacting_points_xy, reference_contacting_points_xy)
+            assert mean_pressure == reference_mean_pressure
+    assert cache.misses == 2 and cache.hits == 4 and len(cache) == 2
+
+
+def test_cached_history_dependent_steps(topography):
+    cache = MemoryCache()
+    # Sequential plastic steps depend on the previous steps
+    pressures = [0.2, 0.01]
+    reference = topography.contact_mechanics(pressures=pressures, hardness=0.5)
+    results = topography.contact_mechanics(pressures=pressures, hardness=0.5, cache=cache)
+    for value, reference_value in zip(results, reference):
+        np.testing.assert_array_equal(value, reference_value)
+    # The second step is not reused without the first one
+    results = topography.contact_mechanics(pressures=pressures[1:], hardness=0.5, cache=cache)
+    assert cache.misses == 3
+    assert results[2][0] != reference[2][1]
+    # A prefix of a cached sequence is reused
+    topography.contact_mechanics(pressures=pressures[:1], hardness=0.5, cache=cache)
+    assert cache.misses == 3
+
+    with pytest.raises(ValueError):
+        topography.contact_mechanics(pressures=pressures, cache=cache, continuation=ToleranceContinuation())
+
+
+def test_cached_nsteps(topography):
+    cache = MemoryCache()
+    topography.contact_mechanics(nsteps=6, cache=cache)
+    # Target areas depend on the number of steps, entries must not be shared
+    reference = topography.contact_mechanics(nsteps=4)
+    results = topography.contact_mechanics(nsteps=4, cache=cache)
+    for value, reference_value in zip(results, reference):
+        np.testing.assert_array_equal(value, reference_value)
+    assert cache.misses == 10
+    topography.contact_mechanics(nsteps=4, cache=cache)
+    assert cache.misses == 10
@@ -0,0 +1,110 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+from SurfaceTopography import Topography
+
+from ContactMechanics import FreeFFTElasticHalfSpace, PeriodicFFTElasticHalfSpace, make_system
+from ContactMechanics.IO.NetCDF import NetCDFContainer
+from ContactMechanics.SlidingContact import SlidingContact
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+def make_topographies(nx, ny):
+    rng = np.random.default_rng(1)
+    x = np.arange(nx).reshape(-1, 1) / nx
+    y = np.arange(ny).reshape(1, -1) / ny
+    moving = Topography(0.01 * np.cos(2 * np.pi * x) * np.cos(2 * np.pi * y) +
+                        0.001 * rng.standard_normal((nx, ny)), (1., 1.), periodic=True)
+    stationary = Topography(0.005 * np.sin(4 * np.pi * x) * np.ones_like(y), (1., 1.), periodic=True)
+    return moving, stationary
+
+
+def test_translation():
+    nx, ny = 32, 24
+    moving, stationary = make_topographies(nx, ny)
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1., physical_sizes=(1., 1.))
+    sliding = SlidingContact(substrate, moving, stationary)
+
+    np.testing.assert_allclose(sliding.topography.heights(), moving.heights() + stationary.heights(), atol=1e-15)
+    sliding.translate((3 / nx, -2 / ny))
+    np.testing.assert_allclose(sliding.topography.heights(),
+                               np.roll(moving.heights(), (3, -2), axis=(0, 1)) + stationary.heights(), atol=1e-15)
+
+    # Sub-pixel translation of a single harmonic
+    x = np.arange(nx).reshape(-1, 1) / nx
+    y = np.arange(ny).reshape(1, -1) / ny
+    harmonic = Topography(np.cos(2 * np.pi * x) * np.sin(4 * np.pi * y), (1., 1.), periodic=True)
+    sliding = SlidingContact(substrate, harmonic)
+    sliding.translate((0.013, 0.3 / ny))
+    np.testing.assert_allclose(sliding.topography.heights(),
+                               np.cos(2 * np.pi * (x - 0.013)) * np.sin(4 * np.pi * (y - 0.3 / ny)), atol=1e-12)
+
+
+def test_nonperiodic_substrate():
+    moving, stationary = make_topographies(16, 16)
+    with pytest.raises(ValueError):
+        SlidingContact(FreeFFTElasticHalfSpace((16, 16), 1., physical_sizes=(1., 1.)), moving)
+
+
+def test_sliding(tmp_path):
+    nx, ny = 32, 32
+    moving, stationary = make_topographies(nx, ny)
+    substrate = PeriodicFFTElasticHalfSpace((nx, ny), 1., physical_sizes=(1., 1.))
+    sliding = SlidingContact(substrate, moving, stationary)
+
+    offset = 0.005
+    translations = np.stack([np.linspace(0, 0.05, 6), np.zeros(6)], axis=1)
+    container = NetCDFContainer(str(tmp_path / 'sliding.nc'), mode='w', double=True)
+    container.set_shape((nx, ny))
+    normal_forces, contact_areas = sliding.run(translations, offset=offset, container=container,
+                                               fields=('forces', 'heights'), pentol=1e-10)
+    container.close()
+
+    # Reference: independent contact calculations from scratch
+    for (tx, ty), normal_force, contact_area in zip(translations, normal_forces, contact_areas):
+        sliding.translate((tx, ty))
+        system = make_system(PeriodicFFTElasticHalfSpace((nx, ny), 1., physical_sizes=(1., 1.)),
+                             Topography(sliding.topography.heights().copy(), (1., 1.), periodic=True))
+        result = system.minimize_proxy(offset=offset, pentol=1e-10)
+        np.testing.assert_allclose(normal_force, result.jac.sum(), rtol=1e-6)
+        np.testing.assert_allclose(contact_area, system.compute_contact_area())
+
+    container = NetCDFContainer(str(tmp_path / 'sliding.nc'))
+    assert len(container) == len(translations)
+    for frame, (tx, ty), normal_force in zip(container, translations, normal_forces):
+        np.testing.assert_allclose(frame.translation_x, tx)
+        np.testing.assert_allclose(frame.normal_force, normal_force)
+        np.testing.assert_allclose(frame.forces.sum(), normal_force)
+        assert frame.heights.shape == (nx, ny)
+    container.close()
+
+    with pytest.raises(ValueError):
+        sliding.run(translations, offset=offset, fields=('pressures',))
@@ -0,0 +1,100 @@
+#
+# Copyright 2022 Lars Pastewka
+#
+# ### MIT license
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import numpy as np
+import pytest
+
+from NuMPI import MPI
+from SurfaceTopography import make_sphere
+
+from ContactMechanics import make_system
+from ContactMechanics.Optimization import get_solver, register_solver, registered_solvers
+from ContactMechanics.Optimization import Registry
+
+pytestmark = pytest.mark.skipif(MPI.COMM_WORLD.Get_size() > 1,
+                                reason="tests only serial funcionalities, "
+                                       "please execute with pytest")
+
+
+def test_auto_selection():
+    assert get_solver('auto').name == 'dual-ccg-without-restart'
+    for requirement in ['mpi', 'hardness', 'force_control', 'nonperiodic']:
+        assert get_solver('auto', **{requirement: True}).name == 'polonsky-keer'
+
+    with pytest.raises(ValueError):
+        get_solver('no-such-solver')
+    with pytest.raises(ValueError):
+        get_solver('dual-l-bfgs-b', force_control=True)
+
+
+@pytest.mark.parametrize('solver', ['dual-ccg-without-restart', 'dual-l-bfgs-b', 'primal-ccg-without-restart'])
+def test_normalized_results(solver):
+    nx, ny = 64, 64
+    topography = make_sphere(0.3, (nx, ny), (1., 1.), kind="paraboloid")
+    system = make_system(substrate='periodic', surface=topography, young=1.)
+
+    offset = 0.002
+    reference = system.solve(offset=offset, solver='polonsky-keer', pentol=1e-10)
+    assert reference.success
+    assert reference.solver == 'polonsky-keer'
+
+    result = system.solve(offset=offset, solver=solver)
+    assert result.success
+    assert result.solver == solver
+    assert result.offset == offset
+    for key in ['disp', 'forces', 'gap']:
+        assert result[key].shape == (nx, ny)
+    np.testing.assert_allclose(result.gap, result.disp - topography.heights() - offset)
+    np.testing.assert_allclose(result.forces.sum(), reference.forces.sum(), rtol=0.05)
+    np.testing.assert_allclose(result.forces, reference.forces, atol=0.05 * reference.forces.max())
+
+    result = system.solve(offset=offset)
+    assert result.solver == 'dual-ccg-without-restart'
+    np.testing.assert_allclose(result.forces, reference.forces, atol=1e-3 * reference.forces.max())
+
+
+def test_automatic_selection_force_control():
+    topography = make_sphere(0.3, (32, 32), (1., 1.), kind="paraboloid")
+    system = make_system(substrate='free', surface=topography, young=1.)
+    result = system.solve(external_force=1e-5)
+    assert result.success
+    assert result.solver == 'polonsky-keer'
+    np.testing.assert_allclose(result.forces.sum(), 1e-5)
+
+
+def test_register_solver():
+    def flat_punch(system, offset=None, external_force=None):
+        return 'flat-punch'
+
+    try:
+        solver = register_solver('flat-punch', flat_punch, force_control=True, priority=10)
+        assert registered_solvers()['flat-punch'] is solver
+        assert get_solver('auto', force_control=True) is solver
+        assert get_solver('auto', nonperiodic=True).name == 'polonsky-keer'
+
+        topography = make_sphere(0.3, (32, 32), (1., 1.), kind="paraboloid")
+        system = make_system(substrate='periodic', surface=topography, young=1.)
+        assert system.solve(external_force=1e-5) == 'flat-punch'
+    finally:
+        del Registry._solvers['flat-punch']